@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration of the ASGI application.
+
+    gunicorn app.asgi:application -c python:app.gunicorn_asgi
+
+or `python manage.py serve --asgi`. The settings of app.gunicorn_wsgi
+with uvicorn workers. Each worker is one event loop plus the ASYNC_VIEWS
+thread pool, so a handful of workers per host is enough; keep workers
+times threads within what the database accepts. Uvicorn workers have
+no post_request hook, so only GUNICORN_MAX_REQUESTS recycles them.
+"""
+import multiprocessing
+import os
+
+from app.gunicorn_wsgi import *  # noqa: F401,F403
+
+worker_class = 'uvicorn.workers.UvicornWorker'
+threads = 1
+workers = int(os.environ.get('GUNICORN_WORKERS') or 0) or min(
+    multiprocessing.cpu_count(), 4
+)
@@ -0,0 +1,64 @@
+"""
+Gunicorn configuration of the WSGI application.
+
+    gunicorn app.wsgi:application -c python:app.gunicorn_wsgi
+
+or `python manage.py serve`. Preforks (2 x CPUs) + 1 sync workers, or
+CPUs + 1 gthread workers with GUNICORN_THREADS, from a preloaded and
+warmed up master (see core.prefork). Workers are recycled after
+GUNICORN_MAX_REQUESTS requests or above GUNICORN_MAX_RSS_MB.
+"""
+import os
+import tempfile
+import time
+
+from core import prefork
+
+BOOT_STARTED = time.monotonic()
+
+# Workers add up their metrics through files here (see core.metrics).
+os.environ.setdefault('METRICS_DIR', tempfile.mkdtemp(prefix='metrics-'))
+
+
+def _flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+workers = int(os.environ.get('GUNICORN_WORKERS') or 0) or (
+    prefork.default_workers(threads)
+)
+preload_app = _flag('GUNICORN_PRELOAD', '1')
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get(
+    'GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10
+))
+max_rss_mb = int(os.environ.get('GUNICORN_MAX_RSS_MB', 512))
+backlog = int(os.environ.get('GUNICORN_BACKLOG', 2048))
+# Workers busy past it are killed. Large article imports run as jobs in
+# processes of their own (articleupsert/jobs.py), not in requests.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+reload = _flag('GUNICORN_RELOAD', '0')
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    prefork.on_ready(server, BOOT_STARTED)
+
+
+def post_worker_init(worker):
+    prefork.on_worker_init(worker)
+
+
+def post_request(worker, req, environ, resp):
+    prefork.check_memory(worker, max_rss_mb * 1024)
+
+
+def worker_exit(server, worker):
+    prefork.on_worker_exit(server, worker)
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 #    'drf_writable_nested',
     'user',
     'article',
+    'articleupsert',
     'django_filters',
     'corsheaders',
     'product',
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -63,7 +65,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'app.urls'
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'app.urls')
 
 TEMPLATES = [
     {
@@ -87,13 +89,34 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_POOL=1 checks connections out of an in-process pool per worker
+# process; otherwise connections persist for DB_CONN_MAX_AGE seconds.
+DB_POOL = os.environ.get('DB_POOL', '0').lower() in ('1', 'true', 'yes')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.db.backends.pooled_postgresql' if DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60))
+        ),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'HEALTH_CHECK_INTERVAL': float(
+                os.environ.get('DB_POOL_HEALTH_CHECK_INTERVAL', 30)
+            ),
+            'MAX_LIFETIME': float(
+                os.environ.get('DB_POOL_MAX_LIFETIME', 3600)
+            ),
+        },
     }
 }
 
@@ -148,7 +171,126 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# CACHE_URL=redis://[:password@]host:6379/0 shares the cache between
+# processes and hosts through any Redis protocol server. The default
+# memory:// keeps it in each process, for local runs and tests.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.backend.RedisCache',
+        'LOCATION': os.environ.get('CACHE_URL', 'memory://'),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', ''),
+        'OPTIONS': {
+            'POOL_SIZE': int(os.environ.get('CACHE_POOL_SIZE', 10)),
+            'SOCKET_TIMEOUT': float(
+                os.environ.get('CACHE_SOCKET_TIMEOUT', 1)
+            ),
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+# Model versions and single flight recomputes (core/cache/).
+CACHE_LAYER = {
+    'ALIAS': 'default',
+    'LOCK_TIMEOUT': int(os.environ.get('CACHE_LOCK_TIMEOUT', 10)),
+    'WAIT_TIMEOUT': float(os.environ.get('CACHE_WAIT_TIMEOUT', 5)),
+}
+
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_CACHE_MAX_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_CACHE_TTL', 300)),
+    'SHARED_CACHE': os.environ.get('TOKEN_CACHE_ALIAS', 'default') or None,
+}
+
+RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+}
+
+IMAGE_DERIVATIVES = {
+    'SIZES': {
+        'thumbnail': (150, 150),
+        'medium': (600, 600),
+    },
+    'FORMAT': 'WEBP',
+    'WORKERS': int(os.environ.get('IMAGE_WORKERS', 2)),
+}
+
+IMAGE_UPLOADS = {
+    'MAX_REQUEST_BYTES': int(
+        os.environ.get('UPLOAD_MAX_REQUEST_BYTES', 100 * 1024 * 1024)
+    ),
+    'MAX_FILE_BYTES': int(
+        os.environ.get('UPLOAD_MAX_FILE_BYTES', 20 * 1024 * 1024)
+    ),
+    'MAX_FILES': 20,
+}
+
+# Uploads of at least ASYNC_MIN_BYTES are imported by a job in its own
+# process rather than within the request and the worker timeout (see
+# articleupsert/jobs.py).
+ARTICLE_IMPORT = {
+    'ASYNC_MIN_BYTES': int(
+        os.environ.get('IMPORT_ASYNC_MIN_BYTES', 1024 * 1024)
+    ),
+    'DIRECTORY': 'imports',
+}
+
+# Seconds incremental export tokens are moved back by, longer than any
+# write transaction (see article/export.py).
+CATALOG_EXPORT = {
+    'OVERLAP': int(os.environ.get('EXPORT_OVERLAP', 300)),
+}
+
+ARTICLE_FACETS = {
+    'MATERIALIZED': os.environ.get(
+        'ARTICLE_FACETS_MATERIALIZED', '0'
+    ).lower() in ('1', 'true', 'yes'),
+}
+
+# Must match the text search config of the core_article search trigger.
+ARTICLE_SEARCH = {
+    'CONFIG': 'english',
+    'MAX_RESULTS': int(os.environ.get('SEARCH_MAX_RESULTS', 100)),
+}
+
+ARTICLE_STREAMING = {
+    'CHUNK_SIZE': int(os.environ.get('ARTICLE_STREAM_CHUNK_SIZE', 1000)),
+}
+
+# Threads serving the async read views of the ASGI application, at most
+# one database connection each.
+ASYNC_VIEWS = {
+    'THREADS': int(os.environ.get(
+        'ASYNC_VIEW_THREADS', DATABASES['default']['POOL']['MAX_SIZE']
+    )),
+    'SPOOL_MAX_MEMORY': 1024 * 1024,
+}
+
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', '1').lower() in (
+        '1', 'true', 'yes'
+    ),
+    'TOKEN': os.environ.get('METRICS_TOKEN') or None,
+    'SLOW_REQUEST_MS': int(os.environ.get('METRICS_SLOW_REQUEST_MS', 1000)),
+    'SAMPLE_RATE': float(os.environ.get('METRICS_SAMPLE_RATE', 0.05)),
+    'MAX_SAMPLES': 50,
+    # Shared by the processes of a server, see core/metrics.py.
+    'DIRECTORY': os.environ.get('METRICS_DIR') or None,
+}
+
+# Pre-rendered OpenAPI schema (core/schema.py). Without a VERSION, such as
+# a release tag, the schema is cached by a hash of the sources.
+SCHEMA_CACHE = {
+    'DIRECTORY': os.environ.get('SCHEMA_CACHE_DIR', str(BASE_DIR / 'schema')),
+    'VERSION': os.environ.get('APP_VERSION') or None,
 }
 
 SPECTACULAR_SETTINGS = {
@@ -0,0 +1,48 @@
+"""
+Settings of API only processes.
+
+    DJANGO_SETTINGS_MODULE=app.settings_api python manage.py serve
+
+app.settings without the admin, the multi step form, the OpenAPI schema
+views and the template machinery (browsable API, messages, crispy
+forms), none of which API workers or one-shot commands like wait_for_db
+use. Serves app.urls_api. Compare their boot with
+
+    python manage.py profile_startup --profiles app.settings,app.settings_api
+"""
+import os
+
+from app.settings import *  # noqa: F401,F403
+from app.settings import (
+    ASYNC_VIEWS,
+    INSTALLED_APPS,
+    MIDDLEWARE,
+    REST_FRAMEWORK,
+)
+
+EXCLUDED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.messages',
+    'drf_spectacular',
+    'formtools',
+    'crispy_forms',
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in EXCLUDED_APPS]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware != 'django.contrib.messages.middleware.MessageMiddleware'
+]
+
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'app.urls_api')
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': ['core.renderers.FastJSONRenderer'],
+}
+
+ASYNC_VIEWS = {**ASYNC_VIEWS, 'BASE_URLCONF': 'app.urls_api'}
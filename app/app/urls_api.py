@@ -0,0 +1,22 @@
+"""
+URL configuration of the api.
+
+Served on its own by API only processes (app.settings_api) and included
+by app.urls next to the admin, schema and form pages.
+"""
+from django.urls import path, include
+from django.conf.urls.static import static
+from django.conf import settings
+
+urlpatterns = [
+    path('api/user/', include('user.urls')),
+    path('api/article/', include('article.urls')),
+    path('api/articleupsert/', include('articleupsert.urls')),
+    path('metrics/', include('core.urls')),
+]
+
+if settings.DEBUG:
+    urlpatterns += static(
+        settings.MEDIA_URL,
+        document_root=settings.MEDIA_ROOT,
+    )
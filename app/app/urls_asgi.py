@@ -0,0 +1,18 @@
+"""
+URL configuration of the ASGI application.
+
+The routes of ASYNC_VIEWS BASE_URLCONF (app.urls, or app.urls_api with
+the api settings), with the article api served by async views (see
+article.urls_asgi). app.asgi selects it through DJANGO_ROOT_URLCONF.
+"""
+from importlib import import_module
+
+from django.urls import path, include
+
+from core.async_views import get_setting
+
+urlpatterns = [
+    path('api/article/', include('article.urls_asgi'))
+    if getattr(pattern, 'namespace', None) == 'article' else pattern
+    for pattern in import_module(get_setting('BASE_URLCONF')).urlpatterns
+]
@@ -0,0 +1,115 @@
+"""
+Per-user versioned response caching for the article api.
+
+Every user has a version number that is bumped whenever one of their
+articles, categories, attribute variants or images change. Cached
+responses and ETags are keyed on that version, so a bump invalidates
+all of a user's cached reads at once without tracking individual keys.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache.singleflight import get_or_compute
+from core.cache.versions import bump_version, get_version
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'KEY_PREFIX': 'article-api:',
+}
+
+
+def get_setting(name):
+    """ Return a RESPONSE_CACHE setting, falling back to the default."""
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[get_setting('ALIAS')]
+
+
+def _version_key(user_id):
+    return f'{get_setting("KEY_PREFIX")}version:{user_id}'
+
+
+def get_user_version(user_id):
+    """ Return the current cache version of a user's catalog."""
+    return get_version(_version_key(user_id), get_cache())
+
+
+def bump_user_version(user_id):
+    """ Invalidate every cached response of a user."""
+    if user_id is None:
+        return
+    bump_version(_version_key(user_id), get_cache())
+
+
+def _matches(etag, header):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in [value.strip() for value in header.split(',')]
+
+
+class CachedResponseMixin:
+    """ Serve list from the cache with ETag support.
+
+    Responses are cached per user, action, object and query string and
+    a request whose If-None-Match matches gets a 304 without touching
+    the database. Viewsets with a detail route can route retrieve
+    through cached_response as well.
+    """
+
+    def get_response_cache_key(self, request):
+        params = sorted(
+            (key, value)
+            for key in request.query_params
+            for value in request.query_params.getlist(key)
+        )
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        version = get_user_version(request.user.pk)
+        raw = (
+            f'{self.basename}:{self.action}:{lookup}:{request.user.pk}:'
+            f'{version}:{params}'
+        )
+        digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+        return f'{get_setting("KEY_PREFIX")}response:{digest}', f'"{digest}"'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if getattr(request.accepted_renderer, 'format', None) != 'json':
+            return handler(request, *args, **kwargs)
+
+        key, etag = self.get_response_cache_key(request)
+        if _matches(etag, request.META.get('HTTP_IF_NONE_MATCH')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = None
+
+            def render():
+                nonlocal response
+                response = handler(request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    return response.data
+
+            # One request renders a missing page, concurrent ones wait.
+            data = get_or_compute(
+                key, render, get_setting('TIMEOUT'), get_cache(),
+            )
+            if response is None:
+                response = Response(data)
+            elif response.status_code != status.HTTP_200_OK:
+                return response
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
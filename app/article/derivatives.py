@@ -0,0 +1,186 @@
+"""
+Resized image derivatives for article images.
+
+Uploads are stored as full-size originals. Once the upload transaction
+commits, a small worker pool renders the configured sizes (WebP by
+default) next to the original and records their storage paths on the
+model, so list responses can point clients at small thumbnails.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from article.caching import bump_user_version
+from article.export import touch_articles
+from core.models import Article, ArticleImage
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SIZES': {
+        'thumbnail': (150, 150),
+        'medium': (600, 600),
+    },
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+    'WORKERS': 2,
+    'ASYNC': True,
+}
+
+EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+    'PNG': 'png',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_setting(name):
+    """ Return an IMAGE_DERIVATIVES setting, falling back to the default."""
+    return getattr(settings, 'IMAGE_DERIVATIVES', {}).get(name, DEFAULTS[name])
+
+
+def get_executor():
+    """ Return the shared worker pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_setting('WORKERS'),
+                thread_name_prefix='image-derivatives',
+            )
+        return _executor
+
+
+def variant_path(name, variant, fmt):
+    """ Return the storage path of a variant of the file called name."""
+    stem = os.path.splitext(name)[0]
+    return f'{stem}_{variant}.{EXTENSIONS.get(fmt, fmt.lower())}'
+
+
+def render_variants(field_file):
+    """ Render every configured size of field_file into its storage.
+
+    Returns a dict mapping variant name to storage path.
+    """
+    # Pillow is only imported by processes that render images.
+    from PIL import Image, ImageOps
+
+    fmt = get_setting('FORMAT')
+    quality = get_setting('QUALITY')
+    storage = field_file.storage
+    variants = {}
+    with storage.open(field_file.name, 'rb') as original:
+        with Image.open(original) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.mode else 'RGB')
+            for variant, size in get_setting('SIZES').items():
+                resized = image.copy()
+                resized.thumbnail(tuple(size), Image.LANCZOS)
+                if fmt == 'JPEG' and resized.mode == 'RGBA':
+                    resized = resized.convert('RGB')
+                buffer = io.BytesIO()
+                resized.save(buffer, format=fmt, quality=quality)
+                path = variant_path(field_file.name, variant, fmt)
+                if storage.exists(path):
+                    storage.delete(path)
+                variants[variant] = storage.save(
+                    path, ContentFile(buffer.getvalue())
+                )
+    return variants
+
+
+def generate(model, pk, field_name, store_field):
+    """ Render and record the derivatives of one stored image."""
+    instance = model._default_manager.filter(pk=pk).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return
+    try:
+        variants = render_variants(field_file)
+    except (OSError, ValueError):
+        logger.exception('Could not render variants of %s', field_file)
+        return
+    # Only record them while the rendered file is still the current one,
+    # a job for a replaced image may finish after the job for its
+    # replacement.
+    written = model._default_manager.filter(
+        pk=pk, **{field_name: field_file.name}
+    ).update(**{store_field: variants})
+    if not written:
+        for path in variants.values():
+            field_file.storage.delete(path)
+        return
+    # update() sends no signals, keep the response cache in sync.
+    if isinstance(instance, ArticleImage):
+        article = instance.article
+    else:
+        article = instance
+    touch_articles([article.pk])
+    bump_user_version(article.user_id)
+
+
+def _run_in_worker(*args):
+    """ Run generate in a pool thread with its own db connection."""
+    close_old_connections()
+    try:
+        generate(*args)
+    except Exception:
+        logger.exception('Image derivative job failed')
+    finally:
+        close_old_connections()
+
+
+def schedule(model, pk, field_name, store_field):
+    """ Generate derivatives once the current transaction commits."""
+    def submit():
+        if get_setting('ASYNC'):
+            get_executor().submit(
+                _run_in_worker, model, pk, field_name, store_field
+            )
+        else:
+            generate(model, pk, field_name, store_field)
+    transaction.on_commit(submit)
+
+
+def schedule_article_images(images):
+    """ Schedule derivatives for saved ArticleImage objects."""
+    for image in images:
+        schedule(ArticleImage, image.pk, 'image', 'variants')
+
+
+def schedule_article_image(article):
+    """ Schedule derivatives for the main image of an article."""
+    schedule(Article, article.pk, 'image', 'image_variants')
+
+
+def discard_variants(variants):
+    """ Delete the stored variants of a replaced image on commit."""
+    paths = list((variants or {}).values())
+
+    def delete():
+        for path in paths:
+            default_storage.delete(path)
+    if paths:
+        transaction.on_commit(delete)
+
+
+def variant_urls(variants, request=None):
+    """ Map variant names to (absolute when possible) URLs."""
+    urls = {}
+    for variant, path in (variants or {}).items():
+        url = default_storage.url(path)
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
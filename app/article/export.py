@@ -0,0 +1,192 @@
+"""
+Streaming catalog export.
+
+Articles are read through QuerySet.iterator(), a named server side
+cursor on PostgreSQL, and rendered a chunk at a time by the row
+serializers, which fetch the categories, attributes and images of each
+chunk in one query per relation. Output is NDJSON (one article per
+line) or CSV in the layout the article import reads, optionally gzipped
+on the fly. Memory use does not depend on the number of articles.
+
+Incremental exports pass updated_since, the `started` time of the
+previous export. Article.updated_at is also bumped when links or images
+change (see touch_articles). Writers stamp updated_at before they
+commit, so `started` is moved back by OVERLAP seconds: a write still in
+flight when an export begins is exported again by the next one rather
+than skipped. OVERLAP must exceed the longest write transaction (an
+import chunk); rows within it are exported twice.
+
+Deleted articles leave no record, an incremental export can not report
+them. Reconcile deletions downstream with a full export (no
+updated_since), replacing the previous copy.
+"""
+import csv
+import io
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.text import compress_sequence
+from rest_framework.renderers import BaseRenderer
+
+from core.models import Article
+from core.renderers import dumps
+from article.readonly import row_serializer_for
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+FORMATS = (NDJSON, CSV)
+
+CSV_COLUMNS = [
+    'id', 'title', 'short_description', 'price', 'description', 'stock',
+    'variant', 'categories', 'attributes', 'image', 'images', 'updated_at',
+]
+LIST_SEPARATOR = '|'
+ATTRIBUTE_SEPARATOR = ':'
+
+DEFAULTS = {
+    'OVERLAP': 300,
+}
+
+
+def get_setting(name):
+    """ Return a CATALOG_EXPORT setting, falling back to the default."""
+    return getattr(settings, 'CATALOG_EXPORT', {}).get(name, DEFAULTS[name])
+
+
+def touch_articles(ids):
+    """ Mark articles as changed for incremental exports."""
+    ids = list(ids)
+    if ids:
+        Article.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+
+
+def parse_updated_since(value):
+    """ Return the aware datetime of an ISO date or datetime string.
+
+    Raises ValueError for anything else.
+    """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date/time: {value!r}')
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _csv_row(item):
+    return [
+        item['id'],
+        item['title'],
+        item['short_description'],
+        item['price'],
+        item['description'],
+        item['stock'],
+        item['variant'],
+        LIST_SEPARATOR.join(
+            category['name'] for category in item['categories']
+        ),
+        LIST_SEPARATOR.join(
+            ATTRIBUTE_SEPARATOR.join(
+                (attribute['type'], attribute['name'], attribute['price'])
+            )
+            for attribute in item['attributes']
+        ),
+        item['image'] or '',
+        LIST_SEPARATOR.join(image['image'] for image in item['images']),
+        item['updated_at'],
+    ]
+
+
+class ArticleExport:
+    """ Iterable of the encoded chunks of an article export
+
+    started is the time to pass as updated_since to the next
+    incremental export, OVERLAP seconds before the export began; rows
+    changed while exporting or shortly before are included again then.
+    """
+
+    def __init__(self, queryset, fmt=NDJSON, context=None,
+                 updated_since=None, chunk_size=None, compress=False):
+        if fmt not in FORMATS:
+            raise ValueError(f'Expected one of: {", ".join(FORMATS)}.')
+        self.started = timezone.now() - timedelta(
+            seconds=get_setting('OVERLAP')
+        )
+        if updated_since is not None:
+            queryset = queryset.filter(updated_at__gte=updated_since)
+        self.queryset = queryset.order_by('updated_at', 'id')
+        self.fmt = fmt
+        self.context = context or {}
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.count = 0
+
+    def _items(self):
+        from article.serializers import ArticleExportSerializer
+
+        reader = row_serializer_for(ArticleExportSerializer)
+        for chunk in reader.stream(
+            self.queryset, self.context, self.chunk_size,
+        ):
+            self.count += len(chunk)
+            yield chunk
+
+    def _ndjson(self):
+        for chunk in self._items():
+            yield b''.join(dumps(item) + b'\n' for item in chunk)
+
+    def _csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for chunk in self._items():
+            writer.writerows(_csv_row(item) for item in chunk)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def __iter__(self):
+        chunks = self._csv() if self.fmt == CSV else self._ndjson()
+        if self.compress:
+            chunks = compress_sequence(chunks)
+        return iter(chunks)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """ Content type of NDJSON exports, renders errors as one line"""
+    media_type = 'application/x-ndjson'
+    format = NDJSON
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return dumps(data) + b'\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """ Content type of CSV exports, renders errors as field,error rows"""
+    media_type = 'text/csv'
+    format = CSV
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['field', 'error'])
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        for field, errors in data.items():
+            if not isinstance(errors, (list, tuple)):
+                errors = [errors]
+            writer.writerows([field, error] for error in errors)
+        return buffer.getvalue().encode('utf-8')
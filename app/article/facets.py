@@ -0,0 +1,230 @@
+"""
+Facet counts for the article list.
+
+Counts of the filtered articles per category and per attribute variant
+come from one grouped aggregate over both through tables. For very large
+catalogs the ArticleFacetCount table can be materialized instead: it is
+kept in step from m2m_changed and serves unfiltered lists.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import CharField, Count, F, Value
+from rest_framework.exceptions import ValidationError
+
+from core.models import (
+    Article,
+    ArticleFacetCount,
+    AttributeVariants,
+    Category,
+)
+from article.serializers import (
+    AttributeVariantsSerializer,
+    CategorySerializer,
+)
+
+DEFAULTS = {
+    'MATERIALIZED': False,
+}
+
+# facet name -> (through model, through column, model, facet count column)
+FACETS = {
+    'categories': (
+        Article.categories.through, 'category', Category, 'category',
+    ),
+    'attributes': (
+        Article.attributes.through, 'attributevariants', AttributeVariants,
+        'attribute',
+    ),
+}
+
+SERIALIZERS = {
+    'categories': CategorySerializer,
+    'attributes': AttributeVariantsSerializer,
+}
+
+
+def get_setting(name):
+    """ Return an ARTICLE_FACETS setting, falling back to the default."""
+    return getattr(settings, 'ARTICLE_FACETS', {}).get(name, DEFAULTS[name])
+
+
+def requested_facets(value):
+    """ Return the facet names asked for by a facets= query parameter."""
+    if not value or value.lower() in ('0', 'false'):
+        return []
+    if value.lower() in ('1', 'true', 'all'):
+        return list(FACETS)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in FACETS]
+    if unknown:
+        raise ValidationError({'facets': [
+            f'Unknown facet {name!r}, expected one of {", ".join(FACETS)}.'
+            for name in unknown
+        ]})
+    return list(dict.fromkeys(names))
+
+
+def count_facets(articles, names):
+    """ Return {facet: {value id: count}} for an article queryset.
+
+    The counts of every facet come from a single UNION ALL of grouped
+    aggregates over the through tables.
+    """
+    ids = articles.order_by().values('pk')
+    queries = []
+    for name in names:
+        through, column, _, _ = FACETS[name]
+        queries.append(
+            through.objects.filter(article__in=ids)
+            .values(column)
+            .annotate(
+                facet=Value(name, output_field=CharField()),
+                count=Count('pk'),
+            )
+            .values_list('facet', column, 'count')
+            .order_by()
+        )
+    counts = {name: {} for name in names}
+    if not queries:
+        return counts
+    for name, value_id, count in queries[0].union(*queries[1:], all=True):
+        counts[name][value_id] = count
+    return counts
+
+
+def _materialized_counts(user, names):
+    counts = {name: {} for name in names}
+    rows = ArticleFacetCount.objects.filter(
+        user=user, count__gt=0,
+    ).values_list('category_id', 'attribute_id', 'count')
+    for category_id, attribute_id, count in rows:
+        if category_id is not None and 'categories' in counts:
+            counts['categories'][category_id] = count
+        elif attribute_id is not None and 'attributes' in counts:
+            counts['attributes'][attribute_id] = count
+    return counts
+
+
+def get_facets(articles, user, names, filtered=True, context=None):
+    """ Return the serialized facets of the articles, largest first.
+
+    Unfiltered lists are served from the materialized table when it is
+    enabled.
+    """
+    if get_setting('MATERIALIZED') and not filtered:
+        counts = _materialized_counts(user, names)
+    else:
+        counts = count_facets(articles, names)
+
+    facets = {}
+    for name in names:
+        values = counts[name]
+        objs = FACETS[name][2].objects.filter(pk__in=list(values))
+        data = SERIALIZERS[name](objs, many=True, context=context).data
+        for item in data:
+            item['count'] = values[item['id']]
+        facets[name] = sorted(
+            data, key=lambda item: (-item['count'], item['id'])
+        )
+    return facets
+
+
+def _adjust(name, links, sign):
+    """ Add sign to the count of every (user id, value id) link."""
+    field = FACETS[name][3]
+    groups = defaultdict(list)
+    for (user_id, value_id), amount in Counter(links).items():
+        groups[(user_id, amount)].append(value_id)
+    for (user_id, amount), value_ids in groups.items():
+        if sign > 0:
+            ArticleFacetCount.objects.bulk_create(
+                [
+                    ArticleFacetCount(
+                        user_id=user_id, **{f'{field}_id': value_id}
+                    )
+                    for value_id in value_ids
+                ],
+                ignore_conflicts=True,
+            )
+        ArticleFacetCount.objects.filter(
+            user_id=user_id, **{f'{field}__in': value_ids}
+        ).update(count=F('count') + sign * amount)
+
+
+def _links(instance, reverse, pk_set):
+    """ Return (user id, value id) pairs of links about to change."""
+    if not reverse:
+        return [(instance.user_id, value_id) for value_id in pk_set]
+    user_ids = Article.objects.filter(pk__in=pk_set).values_list(
+        'user_id', flat=True,
+    )
+    return [(user_id, instance.pk) for user_id in user_ids]
+
+
+def _linked(name, instance, reverse, pk_set=None):
+    """ Return (user id, value id) pairs of existing links."""
+    through, column, _, _ = FACETS[name]
+    if not reverse:
+        rows = through.objects.filter(article_id=instance.pk)
+        if pk_set is not None:
+            rows = rows.filter(**{f'{column}_id__in': pk_set})
+        return [
+            (instance.user_id, value_id)
+            for value_id in rows.values_list(f'{column}_id', flat=True)
+        ]
+    rows = through.objects.filter(**{f'{column}_id': instance.pk})
+    if pk_set is not None:
+        rows = rows.filter(article_id__in=pk_set)
+    return [
+        (user_id, instance.pk)
+        for user_id in rows.values_list('article__user_id', flat=True)
+    ]
+
+
+def facet_for_through(through):
+    return next(name for name, facet in FACETS.items() if facet[0] is through)
+
+
+def links_changed(through, instance, action, reverse, pk_set):
+    """ Keep the materialized counts in step with an m2m_changed action."""
+    if not get_setting('MATERIALIZED'):
+        return
+    name = facet_for_through(through)
+    if action == 'post_add' and pk_set:
+        _adjust(name, _links(instance, reverse, pk_set), 1)
+    elif action in ('pre_remove', 'pre_clear'):
+        # Only links that exist are removed, remember them for post_*.
+        instance._facet_links = _linked(
+            name, instance, reverse,
+            pk_set if action == 'pre_remove' else None,
+        )
+    elif action in ('post_remove', 'post_clear'):
+        _adjust(name, instance.__dict__.pop('_facet_links', []), -1)
+
+
+def article_deleted(article):
+    """ Drop the counts of an article whose links are about to cascade."""
+    if not get_setting('MATERIALIZED'):
+        return
+    for name in FACETS:
+        _adjust(name, _linked(name, article, reverse=False), -1)
+
+
+def refresh_facet_counts(user_id):
+    """ Recompute the materialized counts of a user from scratch."""
+    if not get_setting('MATERIALIZED'):
+        return
+    counts = count_facets(Article.objects.filter(user_id=user_id), FACETS)
+    ArticleFacetCount.objects.filter(user_id=user_id).delete()
+    ArticleFacetCount.objects.bulk_create(
+        [
+            ArticleFacetCount(
+                user_id=user_id, count=count,
+                **{f'{FACETS[name][3]}_id': value_id},
+            )
+            for name, values in counts.items()
+            for value_id, count in values.items()
+        ],
+        batch_size=1000,
+    )
@@ -0,0 +1,57 @@
+"""
+EXISTS based filtering of articles by their many to many relations.
+
+Filtering with categories__id__in joins the through table, so an
+article linked to several of the ids comes back once per link and the
+result needs a DISTINCT over wide rows. A correlated EXISTS per relation
+keeps every article unique and is served by the through table's
+(article_id, value_id) unique index.
+"""
+from django.db.models import Exists, OuterRef
+
+from core.models import Article
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+
+def _article_links(field_name):
+    """ Return the through rows of an article relation and their column."""
+    field = Article._meta.get_field(field_name)
+    links = field.remote_field.through.objects.filter(
+        **{f'{field.m2m_field_name()}_id': OuterRef('pk')}
+    )
+    return links, field.m2m_reverse_field_name()
+
+
+def related_conditions(field_name, ids, match=MATCH_ANY):
+    """ Return filter() conditions for articles linked to ids.
+
+    any-of is a single EXISTS over the through table, all-of needs one
+    EXISTS per id.
+    """
+    links, column = _article_links(field_name)
+    ids = list(dict.fromkeys(ids))
+    if match == MATCH_ALL:
+        return [
+            Exists(links.filter(**{f'{column}_id': pk})) for pk in ids
+        ]
+    return [Exists(links.filter(**{f'{column}_id__in': ids}))]
+
+
+def related_matching(field_name, **lookups):
+    """ Return an EXISTS condition on related objects matching lookups."""
+    links, column = _article_links(field_name)
+    return Exists(links.filter(**{
+        f'{column}__{lookup}': value for lookup, value in lookups.items()
+    }))
+
+
+def linked_to_articles(queryset):
+    """ Return the categories or variants of queryset used by an article."""
+    relation = queryset.model._meta.get_field('article')
+    column = relation.field.m2m_reverse_field_name()
+    return queryset.filter(Exists(
+        relation.through.objects.filter(**{f'{column}_id': OuterRef('pk')})
+    ))
@@ -0,0 +1,71 @@
+"""
+Django command exporting the article catalog.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Article
+from article.export import FORMATS, ArticleExport, parse_updated_since
+
+
+class Command(BaseCommand):
+    """ django command streaming articles as NDJSON or CSV"""
+    help = (
+        'Stream articles with their categories, attributes and images as '
+        'NDJSON or CSV in constant memory. Pass the reported start time '
+        'as --updated-since to the next run for incremental exports. '
+        'Deletions are only reconciled by full exports.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default=FORMATS[0])
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='Only export articles of this user id (repeatable)',
+        )
+        parser.add_argument(
+            '--updated-since',
+            help='Only export articles changed since this ISO date/time',
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='File to write, - for stdout (default)',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Gzip the output file',
+        )
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        updated_since = None
+        if options['updated_since']:
+            try:
+                updated_since = parse_updated_since(options['updated_since'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+        output = options['output']
+        if options['gzip'] and output == '-':
+            raise CommandError('--gzip needs an --output file.')
+
+        queryset = Article.objects.all()
+        if options['users']:
+            queryset = queryset.filter(user__in=options['users'])
+        body = ArticleExport(
+            queryset,
+            options['format'],
+            updated_since=updated_since,
+            chunk_size=options['chunk_size'],
+            compress=options['gzip'],
+        )
+
+        if output == '-':
+            for chunk in body:
+                self.stdout.write(chunk.decode('utf-8'), ending='')
+        else:
+            with open(output, 'wb') as fileobj:
+                for chunk in body:
+                    fileobj.write(chunk)
+
+        self.stderr.write(
+            f'Exported {body.count} articles. Next incremental export: '
+            f'--updated-since {body.started.isoformat()}'
+        )
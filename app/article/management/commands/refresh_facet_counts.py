@@ -0,0 +1,35 @@
+"""
+Django command rebuilding the materialized article facet counts.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from article.facets import get_setting, refresh_facet_counts
+
+
+class Command(BaseCommand):
+    """ django command refreshing ArticleFacetCount"""
+    help = (
+        'Recompute the materialized facet counts, e.g. after enabling '
+        'ARTICLE_FACETS["MATERIALIZED"] on an existing catalog.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='Only refresh this user id (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        if not get_setting('MATERIALIZED'):
+            raise CommandError('Materialized facet counts are disabled.')
+        user_ids = options['users'] or get_user_model().objects.values_list(
+            'pk', flat=True,
+        )
+        refreshed = 0
+        for user_id in user_ids:
+            refresh_facet_counts(user_id)
+            refreshed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed facet counts of {refreshed} users.'
+        ))
@@ -0,0 +1,235 @@
+"""
+Keyset (seek) pagination for the article api.
+"""
+import base64
+import json
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """ Paginate by seeking past the last row instead of using OFFSET.
+
+    Every page runs `WHERE (ordering) < (last row)` so deep pages cost
+    the same as the first one. The ordering is taken from the view's
+    `ordering` attribute and the primary key is appended as a tie
+    breaker. Totals are only counted when `?count=1` is passed.
+    """
+    ordering = ('-id',)
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_ordering(view)
+        values, reverse = self.decode_cursor(request, queryset.model)
+
+        self.count = None
+        if self.count_requested(request):
+            self.count = queryset.order_by().count()
+
+        ordering = self.keys
+        if reverse:
+            ordering = [_flip(key) for key in ordering]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(_seek(ordering, values))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else values is not None
+        self.first = rows[0] if rows else None
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_page_size(self, request):
+        """ Return the page size requested by the client, within limits."""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, view):
+        """ Return the ordering keys with a unique tie breaker."""
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        keys = list(ordering)
+        if not any(key.lstrip('-') == 'id' for key in keys):
+            keys.append('-id' if keys[-1].startswith('-') else 'id')
+        return keys
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param) in (
+            '1', 'true', 'True',
+        )
+
+    def decode_cursor(self, request, model=None):
+        """ Return (values, reverse) decoded from the cursor parameter.
+
+        Values are converted by the model fields they are ordered by, so
+        a tampered cursor is a 404 rather than a database error.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values = data['v']
+            reverse = bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        if model is not None:
+            try:
+                values = [
+                    _to_python(model, key.lstrip('-'), value)
+                    for key, value in zip(self.keys, values)
+                ]
+            except (ValidationError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, row, reverse=False):
+        """ Return an opaque cursor pointing just past row."""
+        values = [_json_value(_row_value(row, key.lstrip('-')))
+                  for key in self.keys]
+        data = {'v': values}
+        if reverse:
+            data['r'] = 1
+        raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.last)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.first is None:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(self.first, reverse=True),
+        )
+
+    def get_paginated_response(self, data):
+        content = [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ]
+        if self.count is not None:
+            content.insert(0, ('count', self.count))
+        content.append(('results', data))
+        return Response(OrderedDict(content))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to 1 to include the total count.',
+                'schema': {'type': 'integer', 'enum': [0, 1]},
+            },
+        ]
+
+
+def _flip(key):
+    return key[1:] if key.startswith('-') else f'-{key}'
+
+
+def _seek(ordering, values):
+    """ Build the row comparison `(k1, k2, ..) > (v1, v2, ..)` as a Q."""
+    condition = Q()
+    for index, key in enumerate(ordering):
+        name = key.lstrip('-')
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[index]})
+        for prev_key, prev_value in zip(ordering[:index], values):
+            step &= Q(**{prev_key.lstrip('-'): prev_value})
+        condition |= step
+    return condition
+
+
+def _to_python(model, name, value):
+    """ Convert a cursor value as the model field called name would."""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return value
+    if value is None and not field.null:
+        raise ValidationError('This field cannot be null.')
+    return field.to_python(value)
+
+
+def _row_value(row, name):
+    """ Read name from a model instance or a .values() row."""
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+def _json_value(value):
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
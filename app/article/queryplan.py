@@ -0,0 +1,135 @@
+"""
+Query planning for serializer driven querysets.
+
+Walks the nested fields of a serializer class and derives the
+select_related / prefetch_related lookups (with column trimmed
+Prefetch querysets) needed to serialize a page of objects in a fixed
+number of queries.
+"""
+from functools import lru_cache
+
+from django.db.models import ForeignKey, OneToOneField, Prefetch
+from rest_framework import serializers
+
+
+class QueryPlan:
+    """ Relations to load alongside a queryset for a serializer"""
+
+    def __init__(self, model, columns, select_related, prefetches):
+        self.model = model
+        self.columns = columns
+        self.select_related = select_related
+        self.prefetches = prefetches
+
+    def apply(self, queryset, trim=False):
+        """ Return queryset with the planned joins and prefetches.
+
+        When trim is set the top level rows are limited to the columns
+        the serializer reads, which is only safe for read only actions.
+        """
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetches:
+            queryset = queryset.prefetch_related(
+                *[prefetch.build() for prefetch in self.prefetches]
+            )
+        if trim and self.columns:
+            queryset = queryset.only(*self.columns)
+        return queryset
+
+
+class PlannedPrefetch:
+    """ A prefetch lookup whose queryset is rebuilt on every use"""
+
+    def __init__(self, lookup, plan, extra_columns=()):
+        self.lookup = lookup
+        self.plan = plan
+        self.extra_columns = extra_columns
+
+    def build(self):
+        """ Return a fresh Prefetch object for this lookup."""
+        queryset = self.plan.apply(self.plan.model._default_manager.all())
+        if self.plan.columns:
+            queryset = queryset.only(*self.plan.columns, *self.extra_columns)
+        return Prefetch(self.lookup, queryset=queryset)
+
+
+def _model_field(model, name):
+    """ Return the model field called name or None."""
+    try:
+        return model._meta.get_field(name)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=None)
+def plan_for_serializer(serializer_class):
+    """ Build (and cache) the query plan for a ModelSerializer class."""
+    return _build_plan(serializer_class())
+
+
+def _build_plan(serializer):
+    model = serializer.Meta.model
+    columns = {model._meta.pk.name}
+    select_related = []
+    prefetches = []
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            # Method fields named after a column usually read it.
+            model_field = _model_field(model, field.field_name)
+            if model_field is not None and model_field.concrete:
+                columns.add(field.field_name)
+            continue
+        source = field.source.split('.')[0]
+        model_field = _model_field(model, source)
+        if model_field is None:
+            continue
+
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            if not isinstance(child, serializers.ModelSerializer):
+                continue
+            extra = ()
+            remote = getattr(model_field, 'field', None)
+            if model_field.one_to_many and remote is not None:
+                # Reverse foreign keys are matched on the child's FK column.
+                extra = (remote.name,)
+            prefetches.append(
+                PlannedPrefetch(source, _build_plan(child), extra)
+            )
+        elif isinstance(field, serializers.ManyRelatedField):
+            related = model_field.related_model
+            prefetches.append(
+                PlannedPrefetch(
+                    source,
+                    QueryPlan(related, [related._meta.pk.name], [], []),
+                )
+            )
+        elif isinstance(field, serializers.ModelSerializer):
+            select_related.append(source)
+            columns.add(source)
+            child_plan = _build_plan(field)
+            select_related.extend(
+                f'{source}__{lookup}' for lookup in child_plan.select_related
+            )
+        elif model_field.concrete and not model_field.many_to_many:
+            columns.add(source)
+            # Primary key fields read the FK column, anything else needs
+            # the related row.
+            if (isinstance(model_field, (ForeignKey, OneToOneField))
+                    and isinstance(field, serializers.RelatedField)
+                    and not isinstance(
+                        field, serializers.PrimaryKeyRelatedField)):
+                select_related.append(source)
+
+    return QueryPlan(model, sorted(columns), select_related, prefetches)
+
+
+def optimize_queryset(queryset, serializer_class, trim=False):
+    """ Apply the serializer's query plan to queryset."""
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return queryset
+    return plan_for_serializer(serializer_class).apply(queryset, trim=trim)
@@ -0,0 +1,256 @@
+"""
+Read only serialization of .values() rows.
+
+A RowSerializer is compiled once from a ModelSerializer class: every
+field becomes an accessor reading a column of a .values() row, so list
+and detail pages skip model instances, OrderedDicts and the per field
+get_attribute/to_representation dispatch. Nested many=True serializers
+are loaded with one .values() query per relation and grouped by owner.
+The output matches what the ModelSerializer would render, field order
+included.
+"""
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from core.metrics import serializing
+
+DEFAULTS = {
+    'CHUNK_SIZE': 1000,
+}
+
+OWNER = '_owner'
+
+# Fields whose to_representation does not change values read from the
+# database.
+PASSTHROUGH = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+)
+
+
+def get_setting(name):
+    """ Return an ARTICLE_STREAMING setting, falling back to the default."""
+    return getattr(settings, 'ARTICLE_STREAMING', {}).get(
+        name, DEFAULTS[name]
+    )
+
+
+class Row(dict):
+    """ A .values() row that also allows attribute access
+
+    Lets SerializerMethodField methods written for model instances
+    (obj.variants) read rows.
+    """
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _column(getter, convert):
+    def get(row):
+        value = getter(row)
+        return None if value is None else convert(value)
+    return get
+
+
+class RowSerializer:
+    """ Renders .values() rows like a read only ModelSerializer"""
+
+    def __init__(self, serializer):
+        self.serializer_class = type(serializer)
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.attname
+        columns = {self.pk}
+        self.factories = []
+        self.relations = {}
+
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            name = field.field_name
+            model_field = self._model_field(field.source)
+
+            if isinstance(field, serializers.SerializerMethodField):
+                # Like the query plan, assume methods named after a column
+                # read it.
+                model_field = self._model_field(name)
+                if model_field is not None and model_field.concrete:
+                    columns.add(model_field.name)
+                self.factories.append((name, self._method(field.method_name)))
+            elif isinstance(field, serializers.ListSerializer):
+                if model_field is None or not isinstance(
+                    field.child, serializers.ModelSerializer
+                ):
+                    self._unsupported(field)
+                self.relations[name] = Relation(
+                    model_field, RowSerializer(field.child),
+                )
+                self.factories.append((name, self._relation(name)))
+            elif model_field is None or not model_field.concrete or (
+                model_field.many_to_many
+            ):
+                self._unsupported(field)
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                if field.pk_field is not None:
+                    self._unsupported(field)
+                columns.add(model_field.name)
+                self.factories.append(
+                    (name, self._static(itemgetter(model_field.name)))
+                )
+            elif isinstance(field, (
+                serializers.RelatedField, serializers.Serializer,
+            )):
+                self._unsupported(field)
+            elif isinstance(field, serializers.FileField):
+                columns.add(model_field.name)
+                self.factories.append((name, self._file(field, model_field)))
+            else:
+                columns.add(model_field.name)
+                getter = itemgetter(model_field.name)
+                if type(field) not in PASSTHROUGH:
+                    getter = _column(getter, field.to_representation)
+                self.factories.append((name, self._static(getter)))
+
+        self.columns = sorted(columns)
+
+    def _model_field(self, source):
+        if '.' in source or source == '*':
+            return None
+        try:
+            return self.model._meta.get_field(source)
+        except Exception:
+            return None
+
+    def _unsupported(self, field):
+        raise ImproperlyConfigured(
+            f'{self.serializer_class.__name__}.{field.field_name} '
+            f'({type(field).__name__}) cannot be read from rows.'
+        )
+
+    @staticmethod
+    def _static(getter):
+        return lambda context, related: getter
+
+    def _method(self, method_name):
+        def factory(context, related):
+            method = getattr(
+                self.serializer_class(context=context), method_name,
+            )
+            return lambda row: method(Row(row))
+        return factory
+
+    def _relation(self, name):
+        pk = self.pk
+
+        def factory(context, related):
+            groups = related[name]
+            return lambda row: groups.get(row[pk]) or []
+        return factory
+
+    @staticmethod
+    def _file(field, model_field):
+        getter = itemgetter(model_field.name)
+        storage = model_field.storage
+        use_url = getattr(
+            field, 'use_url', api_settings.UPLOADED_FILES_USE_URL,
+        )
+
+        def factory(context, related):
+            request = context.get('request')
+
+            def get(row):
+                value = getter(row)
+                if not value:
+                    return None
+                if not use_url:
+                    return value
+                url = storage.url(value)
+                if request is not None:
+                    return request.build_absolute_uri(url)
+                return url
+            return get
+        return factory
+
+    def values(self, queryset):
+        """ Return queryset as the .values() rows this serializer reads."""
+        return queryset.values(*self.columns)
+
+    def stream(self, queryset, context=None, chunk_size=None):
+        """ Yield the representation of queryset a chunk at a time.
+
+        Rows are read through a server side cursor where the database
+        has one and relations are loaded per chunk, so memory use does
+        not grow with the size of the queryset.
+        """
+        chunk_size = chunk_size or get_setting('CHUNK_SIZE')
+        rows = self.values(queryset).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield self.render(chunk, context)
+
+    def render(self, rows, context=None):
+        """ Return the representation of every row."""
+        context = context or {}
+        rows = list(rows)
+        related = {}
+        if self.relations:
+            ids = [row[self.pk] for row in rows]
+            related = {
+                name: relation.load(ids, context)
+                for name, relation in self.relations.items()
+            }
+        with serializing():
+            accessors = [
+                (name, factory(context, related))
+                for name, factory in self.factories
+            ]
+            return [
+                {name: get(row) for name, get in accessors} for row in rows
+            ]
+
+
+class Relation:
+    """ A many=True nested serializer loaded for a page of owners"""
+
+    def __init__(self, model_field, child):
+        self.child = child
+        if model_field.auto_created:
+            # Reverse foreign key or many to many.
+            self.query_name = model_field.field.name
+        else:
+            self.query_name = model_field.related_query_name()
+
+    def load(self, ids, context):
+        """ Return {owner pk: [representation]} for the owner ids."""
+        if not ids:
+            return {}
+        # Same join shape as prefetch_related, so rows come back in the
+        # order the ModelSerializer would list them.
+        queryset = self.child.model._default_manager.filter(
+            **{f'{self.query_name}__in': ids}
+        ).values(*self.child.columns, **{OWNER: F(self.query_name)})
+        rows = list(queryset)
+        groups = {}
+        for row, data in zip(rows, self.child.render(rows, context)):
+            groups.setdefault(row[OWNER], []).append(data)
+        return groups
+
+
+@lru_cache(maxsize=None)
+def row_serializer_for(serializer_class):
+    """ Compile (and cache) the RowSerializer of a ModelSerializer class."""
+    return RowSerializer(serializer_class())
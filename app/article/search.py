@@ -0,0 +1,203 @@
+"""
+Full-text search over article titles and descriptions.
+
+On PostgreSQL every article carries a weighted tsvector, kept up to date
+by a trigger and served by a GIN index (core migration 0003). Other
+databases, SQLite in tests, fall back to an inverted index of terms
+maintained in Python from model signals.
+"""
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+)
+from django.db import connection
+from django.db.models import F, Q, TextField, Value
+from django.db.models.functions import Concat
+
+from core.models import Article, ArticleSearchTerm
+
+DEFAULTS = {
+    'BACKEND': None,
+    'CONFIG': 'english',
+    'MAX_RESULTS': 100,
+    'HEADLINE_WORDS': 35,
+}
+
+# The weights ts_rank gives to the A, B and C labels of the trigger.
+FIELD_WEIGHTS = {
+    'title': 1.0,
+    'short_description': 0.4,
+    'description': 0.2,
+}
+
+STOPWORDS = frozenset((
+    'a an and are as at be but by for from has have in is it its of on or '
+    'that the this to was were will with'
+).split())
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = ArticleSearchTerm._meta.get_field('term').max_length
+
+
+def get_setting(name):
+    """ Return an ARTICLE_SEARCH setting, falling back to the default."""
+    return getattr(settings, 'ARTICLE_SEARCH', {}).get(name, DEFAULTS[name])
+
+
+def get_backend():
+    """ Return 'postgres' or 'python'."""
+    backend = get_setting('BACKEND')
+    if backend:
+        return backend
+    return 'postgres' if connection.vendor == 'postgresql' else 'python'
+
+
+def tokenize(text):
+    """ Return the index terms of text."""
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall((text or '').lower())
+        if token not in STOPWORDS
+    ]
+
+
+def _index_rows(rows):
+    """ Replace the index terms of (pk, title, short, description) rows."""
+    rows = list(rows)
+    ArticleSearchTerm.objects.filter(
+        article_id__in=[row[0] for row in rows]
+    ).delete()
+    terms = []
+    for pk, *texts in rows:
+        weights = defaultdict(float)
+        for weight, text in zip(FIELD_WEIGHTS.values(), texts):
+            for token in tokenize(text):
+                weights[token] += weight
+        terms.extend(
+            ArticleSearchTerm(article_id=pk, term=term, weight=weight)
+            for term, weight in weights.items()
+        )
+    ArticleSearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def index_articles(ids):
+    """ Refresh the Python index of articles written without signals."""
+    if get_backend() != 'python' or not ids:
+        return
+    _index_rows(
+        Article.objects.filter(pk__in=ids).values_list('pk', *FIELD_WEIGHTS)
+    )
+
+
+def index_article(article):
+    """ Refresh the Python index of a saved article."""
+    if get_backend() != 'python':
+        return
+    if set(FIELD_WEIGHTS) & article.get_deferred_fields():
+        index_articles([article.pk])
+        return
+    _index_rows([
+        (article.pk, *(getattr(article, field) for field in FIELD_WEIGHTS))
+    ])
+
+
+def search_articles(queryset, query, limit):
+    """ Return up to limit articles of queryset matching query.
+
+    Articles come best match first and carry a `rank` and a `headline`
+    with the matched words wrapped in <b></b>, like ts_headline. Ranks
+    are only comparable within one backend.
+    """
+    if get_backend() == 'postgres':
+        return _search_postgres(queryset, query, limit)
+    return _search_python(queryset, query, limit)
+
+
+def _search_postgres(queryset, query, limit):
+    config = get_setting('CONFIG')
+    search_query = SearchQuery(query, config=config, search_type='websearch')
+    document = Concat(
+        'title', Value(' '), 'short_description', Value(' '), 'description',
+        output_field=TextField(),
+    )
+    words = get_setting('HEADLINE_WORDS')
+    return list(
+        queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+            headline=SearchHeadline(
+                document, search_query, config=config,
+                max_words=words, min_words=min(15, words),
+            ),
+        ).order_by('-rank', '-id')[:limit]
+    )
+
+
+def _search_python(queryset, query, limit):
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    condition = Q()
+    for term in terms:
+        condition |= Q(term__startswith=term)
+    matches = ArticleSearchTerm.objects.filter(
+        condition, article__in=queryset.values('pk')
+    ).values_list('article_id', 'term', 'weight')
+
+    scores = defaultdict(float)
+    matched = defaultdict(set)
+    for article_id, indexed, weight in matches:
+        for term in terms:
+            if indexed.startswith(term):
+                scores[article_id] += weight
+                matched[article_id].add(term)
+    # Every term has to match, as with websearch_to_tsquery.
+    ranked = sorted(
+        (
+            (score, article_id) for article_id, score in scores.items()
+            if len(matched[article_id]) == len(terms)
+        ),
+        reverse=True,
+    )[:limit]
+    ids = [article_id for _, article_id in ranked]
+    articles = queryset.in_bulk(ids)
+    # The serializer's queryset may defer the description.
+    texts = {
+        pk: ' '.join(text or '' for text in texts)
+        for pk, *texts in Article.objects.filter(pk__in=ids).values_list(
+            'pk', *FIELD_WEIGHTS
+        )
+    }
+
+    results = []
+    for score, article_id in ranked:
+        article = articles[article_id]
+        article.rank = score
+        article.headline = headline(texts[article_id], terms)
+        results.append(article)
+    return results
+
+
+def headline(text, terms, max_words=None):
+    """ Return a fragment of text around the first match of terms."""
+    max_words = max_words or get_setting('HEADLINE_WORDS')
+    words = text.split()
+
+    def is_match(word):
+        return any(
+            token.startswith(term)
+            for token in tokenize(word) for term in terms
+        )
+
+    first = next(
+        (index for index, word in enumerate(words) if is_match(word)), 0
+    )
+    start = max(0, min(first - max_words // 3, len(words) - max_words))
+    return ' '.join(
+        f'<b>{word}</b>' if is_match(word) else word
+        for word in words[start:start + max_words]
+    )
@@ -1,6 +1,9 @@
 """
 Serializer for article api
 """
+from decimal import Decimal
+
+from django.core.files import File
 from rest_framework import serializers
 #from drf_writable_nested import WritableNestedModelSerializer
 
@@ -12,6 +15,16 @@ from core.models import (
     Attribute,
     AttributeValue
 )
+from core.bulk import bulk_insert
+from article.derivatives import (
+    discard_variants,
+    schedule_article_image,
+    schedule_article_images,
+    variant_urls,
+)
+from article.uploads import HeaderImageField
+
+CENTS = Decimal('0.01')
 
 class CategorySerializer(serializers.ModelSerializer):
     " Serializers for Category"
@@ -32,11 +45,16 @@ class AttributeVariantsSerializer(serializers.ModelSerializer):
 
 class ArticleImageSerializers(serializers.ModelSerializer):
     """ Serializer for article image"""
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = ArticleImage
         fields = '__all__'
 
+    def get_variants(self, obj):
+        """ URLs of the resized copies of the image"""
+        return variant_urls(obj.variants, self.context.get('request'))
+
 
 class AttributeVariantsWithoutSerializer(serializers.ModelSerializer):
     """ Serializer for uploading images to article"""
@@ -56,7 +74,7 @@ class ArticleSerializer(serializers.ModelSerializer):
 
     images = ArticleImageSerializers(many=True, required=False)
     uploaded_images = serializers.ListField(
-        child=serializers.ImageField(allow_empty_file=False, use_url=False),
+        child=HeaderImageField(allow_empty_file=False, use_url=False),
         write_only=True,
         required=False
     )
@@ -69,26 +87,87 @@ class ArticleSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
-    def _get_or_create_categories(self, categoires, article):
-        """ Handle getting or creating tags as needed"""
+    def _resolve_categories(self, categories):
+        """ Return categories for the payload, creating missing ones.
+
+        Runs one SELECT for the existing names and one bulk insert for the
+        missing ones however many categories are sent.
+        """
         auth_user = self.context['request'].user
-        for category in categoires:
-            category_obj , created = Category.objects.get_or_create(
-                user=auth_user,
-                **category
-            )
-            article.categories.add(category_obj)
+        names = list(dict.fromkeys(item['name'] for item in categories))
+        if not names:
+            return []
+        found = {}
+        for obj in Category.objects.filter(user=auth_user, name__in=names):
+            found.setdefault(obj.name, obj)
+        missing = [
+            Category(user=auth_user, name=name)
+            for name in names if name not in found
+        ]
+        for obj in bulk_insert(Category, missing):
+            found[obj.name] = obj
+        return [found[name] for name in names]
 
-    def _get_or_create_attributes(self, attributes, article):
-        """ Handle getting or creating tags as needed"""
+    def _attribute_key(self, type, name, price='0.00'):
+        return type, name, Decimal(price).quantize(CENTS)
+
+    def _resolve_attributes(self, attributes):
+        """ Return attribute variants for the payload, creating missing ones"""
         auth_user = self.context['request'].user
+        wanted = {}
         for attribute in attributes:
-            attribute_obj , created = AttributeVariants.objects.get_or_create(
-                user=auth_user,
-                article=article,
-                **attribute
-            )
-            article.attributes.add(attribute_obj)
+            wanted.setdefault(self._attribute_key(**attribute), attribute)
+        if not wanted:
+            return []
+        found = {}
+        existing = AttributeVariants.objects.filter(
+            user=auth_user,
+            name__in={name for _, name, _ in wanted},
+        )
+        for obj in existing:
+            key = self._attribute_key(obj.type, obj.name, obj.price)
+            found.setdefault(key, obj)
+        missing = [key for key in wanted if key not in found]
+        created = bulk_insert(AttributeVariants, [
+            AttributeVariants(user=auth_user, **wanted[key])
+            for key in missing
+        ])
+        found.update(zip(missing, created))
+        return [found[key] for key in wanted]
+
+    def _set_relations(self, article, categories, attributes, created=False):
+        """ Link the resolved categories and attributes to article.
+
+        New articles get a single add(*objs) per relation. Existing ones
+        only delete the links that went away and insert the new ones.
+        """
+        for field_name, objs in (
+            ('categories', categories),
+            ('attributes', attributes),
+        ):
+            if objs is None:
+                continue
+            manager = getattr(article, field_name)
+            if created:
+                manager.add(*objs)
+                continue
+            current = self._current_ids(article, field_name)
+            wanted = {obj.pk for obj in objs}
+            removed = current - wanted
+            if removed:
+                manager.remove(*removed)
+            added = [obj for obj in objs if obj.pk not in current]
+            if added:
+                manager.add(*added)
+
+    def _current_ids(self, article, field_name):
+        """ Return the linked ids, from the prefetch cache when loaded."""
+        cache = getattr(article, '_prefetched_objects_cache', {})
+        if field_name in cache:
+            return {obj.pk for obj in cache[field_name]}
+        return set(
+            getattr(article, field_name).values_list('pk', flat=True)
+        )
 
     def _get_or_create_images(self, images, article):
         """ Handle getting or creating tags as needed"""
@@ -101,6 +180,15 @@ class ArticleSerializer(serializers.ModelSerializer):
             ArticleImage.uploaded_images.add(attribute_obj)
 
 
+    def _add_images(self, article, uploaded_images):
+        """ Store uploaded images of article with a single bulk insert"""
+        images = bulk_insert(ArticleImage, [
+            ArticleImage(article=article, image=image)
+            for image in uploaded_images
+        ])
+        schedule_article_images(images)
+        return images
+
     def create(self, validated_data):
         """ Creat a article."""
         categories = validated_data.pop('categories' , [])
@@ -110,10 +198,13 @@ class ArticleSerializer(serializers.ModelSerializer):
 
 
         article = Article.objects.create(**validated_data)
-        self._get_or_create_categories(categories , article)
-        self._get_or_create_attributes(attributes , article)
-        for image in uploaded_images:
-            newArticleImage = ArticleImage.objects.create(article=article, image=image)
+        self._set_relations(
+            article,
+            self._resolve_categories(categories),
+            self._resolve_attributes(attributes),
+            created=True,
+        )
+        self._add_images(article, uploaded_images)
         return article
 
     def update(self, instance, validated_data):
@@ -123,31 +214,63 @@ class ArticleSerializer(serializers.ModelSerializer):
         uploaded_images = validated_data.pop('uploaded_images', None )
 
         if categories is not None:
-            instance.categories.clear()
-            self._get_or_create_categories(categories , instance)
-
+            categories = self._resolve_categories(categories)
         if attributes is not None:
-            instance.attributes.clear()
-            self._get_or_create_attributes(attributes , instance)
-
-        if uploaded_images is not None:
-            instance.uploaded_images.clear()
-            article_image_model_instance = [ArticleImage(article=instance, images=image) for image in uploaded_images]
-            uploaded_images.objects.bulk_create(
-                article_image_model_instance
-            )
+            attributes = self._resolve_attributes(attributes)
+        self._set_relations(instance, categories, attributes)
 
+        if uploaded_images:
+            self._add_images(instance, uploaded_images)
 
 
+
+        changed = []
         for attr , value in validated_data.items():
-            setattr(instance , attr , value)
-        instance.save()
+            if isinstance(value, File) or getattr(instance, attr) != value:
+                setattr(instance , attr , value)
+                changed.append(attr)
+        if 'image' in changed:
+            # The old thumbnails are gone until the new ones are rendered.
+            discard_variants(instance.image_variants)
+            instance.image_variants = {}
+            changed.append('image_variants')
+        # Skip the UPDATE (and its row lock) when no column changed.
+        if changed:
+            instance.save(update_fields=changed + ['updated_at'])
+        if 'image' in changed:
+            schedule_article_image(instance)
         return instance
 
 class ArticleDetailSerializer(ArticleSerializer):
     """ Extending detail page"""
+    image_variants = serializers.SerializerMethodField()
+
+    class Meta(ArticleSerializer.Meta):
+        fields = ArticleSerializer.Meta.fields + [
+            'description', 'image', 'attributes', 'image_variants',
+        ]
+
+    def get_image_variants(self, obj):
+        """ URLs of the resized copies of the article image"""
+        return variant_urls(obj.image_variants, self.context.get('request'))
+
+
+class ArticleSearchSerializer(ArticleSerializer):
+    """ Article search result with its rank and highlighted match"""
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
     class Meta(ArticleSerializer.Meta):
-        fields = ArticleSerializer.Meta.fields+['description', 'image' , 'attributes']
+        fields = ArticleSerializer.Meta.fields + ['rank', 'headline']
+
+
+class ArticleExportSerializer(ArticleDetailSerializer):
+    """ Article with its relations as written by the catalog export"""
+
+    class Meta(ArticleDetailSerializer.Meta):
+        fields = ArticleDetailSerializer.Meta.fields + [
+            'variant', 'updated_at',
+        ]
 
 
 class ArticleImageSerializer(serializers.ModelSerializer):
@@ -159,6 +282,14 @@ class ArticleImageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': 'True'}}
 
+    def update(self, instance, validated_data):
+        """ Replace the image and render its variants again."""
+        discard_variants(instance.image_variants)
+        instance.image_variants = {}
+        instance = super().update(instance, validated_data)
+        schedule_article_image(instance)
+        return instance
+
 
 
 
@@ -0,0 +1,99 @@
+"""
+Signal handlers invalidating cached article api responses
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.models import Article, ArticleImage, AttributeVariants, Category
+from article.caching import bump_user_version
+from article.export import touch_articles
+from article.facets import article_deleted, links_changed
+from article.search import FIELD_WEIGHTS, index_article
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=AttributeVariants)
+@receiver(post_delete, sender=AttributeVariants)
+def invalidate_owner(sender, instance, **kwargs):
+    """ Invalidate the cached responses of the object's owner."""
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=Article)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """ Keep the Python search index in step with article text."""
+    if update_fields is not None and not set(FIELD_WEIGHTS) & set(
+            update_fields):
+        return
+    index_article(instance)
+
+
+@receiver(post_save, sender=ArticleImage)
+@receiver(post_delete, sender=ArticleImage)
+def invalidate_image_owner(sender, instance, **kwargs):
+    """ Invalidate the cached responses of the image article's owner."""
+    user_id = Article.objects.filter(
+        pk=instance.article_id
+    ).values_list('user_id', flat=True).first()
+    bump_user_version(user_id)
+
+
+@receiver(m2m_changed, sender=Article.categories.through)
+@receiver(m2m_changed, sender=Article.attributes.through)
+def invalidate_links(sender, instance, action, **kwargs):
+    """ Invalidate when categories or attributes are (un)linked."""
+    if action.startswith('post_'):
+        bump_user_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Article.categories.through)
+@receiver(m2m_changed, sender=Article.attributes.through)
+def touch_linked_articles(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """ Mark articles whose categories or attributes changed."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_articles([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        touch_articles(pk_set)
+    elif action == 'pre_clear':
+        # The links are gone after the clear, read the articles first.
+        touch_articles(
+            instance.article_set.values_list('pk', flat=True)
+        )
+
+
+@receiver(post_save, sender=ArticleImage)
+@receiver(post_delete, sender=ArticleImage)
+def touch_image_article(sender, instance, **kwargs):
+    """ Mark the article of an added or removed image."""
+    touch_articles([instance.article_id])
+
+
+@receiver(m2m_changed, sender=Article.categories.through)
+@receiver(m2m_changed, sender=Article.attributes.through)
+def update_facet_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Keep the materialized facet counts in step with the links."""
+    links_changed(sender, instance, action, reverse, pk_set)
+
+
+@receiver(pre_delete, sender=Article)
+def drop_facet_counts(sender, instance, **kwargs):
+    """ Count down the facets of an article before its links cascade."""
+    article_deleted(instance)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_new_user(sender, instance, created, **kwargs):
+    """ Start new users on a fresh version in case their id is reused."""
+    if created:
+        bump_user_version(instance.pk)
@@ -5,14 +5,16 @@ import os
 import tempfile
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from PIL import Image
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Article
+from core.models import Article, AttributeVariants, Category
 
 from article.serializers import ArticleSerializer
 
@@ -71,7 +73,7 @@ class PrivateArticleAPITests(TestCase):
         articles = Article.objects.all().order_by('-id')
         serializer = ArticleSerializer(articles, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data , serializer.data)
+        self.assertEqual(res.data['results'] , serializer.data)
 
     def test_create_article(self):
         """ Test creating a Article"""
@@ -127,6 +129,134 @@ class PrivateArticleAPITests(TestCase):
             self.assertEqual(getattr(article, k), v)
         self.assertEqual(article.user, self.user)
 
+    def test_create_article_with_new_relations(self):
+        """ Test creating a article with new categories and attributes"""
+        payload = {
+            'title': 'Sample article',
+            'categories': [{'name': 'Men'}, {'name': 'Summer'}],
+            'attributes': [
+                {'type': 'Size', 'name': 'M', 'price': '1.00'},
+                {'type': 'Color', 'name': 'Red', 'price': '0.00'},
+            ],
+        }
+        res = self.client.post(ARTICLES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        article = Article.objects.get(id=res.data['id'])
+        self.assertEqual(article.categories.count(), 2)
+        self.assertEqual(article.attributes.count(), 2)
+        for category in article.categories.all():
+            self.assertEqual(category.user, self.user)
+
+    def test_create_article_with_existing_relations(self):
+        """ Test existing categories and attributes are reused"""
+        category = Category.objects.create(user=self.user, name='Men')
+        variant = AttributeVariants.objects.create(
+            user=self.user, type='Size', name='M', price=Decimal('1.00')
+        )
+        payload = {
+            'title': 'Sample article',
+            'categories': [{'name': 'Men'}, {'name': 'Women'}],
+            'attributes': [{'type': 'Size', 'name': 'M', 'price': '1.00'}],
+        }
+        res = self.client.post(ARTICLES_URL, payload, format='json')
+
+        article = Article.objects.get(id=res.data['id'])
+        self.assertIn(category, article.categories.all())
+        self.assertEqual(list(article.attributes.all()), [variant])
+        self.assertEqual(Category.objects.filter(user=self.user).count(), 2)
+
+    def test_create_article_relation_queries_batched(self):
+        """ Test nested relations do not cost queries per item"""
+        for i in range(10):
+            Category.objects.create(user=self.user, name=f'c{i}')
+            AttributeVariants.objects.create(
+                user=self.user, type='Size', name=f's{i}'
+            )
+
+        def payload(count):
+            return {
+                'title': 'Sample article',
+                'categories': [{'name': f'c{i}'} for i in range(count)],
+                'attributes': [
+                    {'type': 'Size', 'name': f's{i}'} for i in range(count)
+                ],
+            }
+        counts = []
+        for size in (1, 10):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(ARTICLES_URL, payload(size), format='json')
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_update_article_categories(self):
+        """ Test updating replaces the article categories"""
+        article = create_article(user=self.user)
+        old = Category.objects.create(user=self.user, name='Old')
+        keep = Category.objects.create(user=self.user, name='Keep')
+        article.categories.add(old, keep)
+
+        payload = {'categories': [{'name': 'Keep'}, {'name': 'New'}]}
+        res = self.client.patch(detail_url(article.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(article.categories.values_list('name', flat=True)),
+            ['Keep', 'New'],
+        )
+        self.assertTrue(Category.objects.filter(id=old.id).exists())
+
+    def test_update_keeps_unchanged_links(self):
+        """ Test unchanged category links are not deleted and reinserted"""
+        article = create_article(user=self.user)
+        keep = Category.objects.create(user=self.user, name='Keep')
+        old = Category.objects.create(user=self.user, name='Old')
+        article.categories.add(keep, old)
+        through = Article.categories.through
+        keep_link = through.objects.get(article=article, category=keep)
+
+        payload = {'categories': [{'name': 'Keep'}, {'name': 'New'}]}
+        self.client.patch(detail_url(article.id), payload, format='json')
+
+        self.assertTrue(through.objects.filter(id=keep_link.id).exists())
+        self.assertFalse(
+            through.objects.filter(article=article, category=old).exists()
+        )
+
+    def test_update_without_changes_skips_save(self):
+        """ Test a patch that changes nothing issues no UPDATE"""
+        article = create_article(user=self.user, title='Same')
+        category = Category.objects.create(user=self.user, name='Men')
+        article.categories.add(category)
+
+        payload = {'title': 'Same', 'categories': [{'name': 'Men'}]}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(
+                detail_url(article.id), payload, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))
+        ]
+        self.assertEqual(writes, [])
+
+    def test_update_saves_only_changed_fields(self):
+        """ Test the UPDATE only writes the columns that changed"""
+        article = create_article(user=self.user, title='Old title')
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.patch(detail_url(article.id), {'title': 'New'})
+
+        updates = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"title"', updates[0])
+        self.assertNotIn('"description"', updates[0])
 
 
 class ImageUploadTests(TestCase):
@@ -0,0 +1,232 @@
+"""
+Test the streaming catalog export.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Article, ArticleImage, AttributeVariants, Category
+
+EXPORT_URL = reverse('article:article-export')
+
+
+def detail_url(article_id):
+    """ create and return a article detail URL."""
+    return reverse('article:article-detail', args=[article_id])
+
+
+def lines(response):
+    """ Return the NDJSON records of a streamed response."""
+    body = b''.join(response.streaming_content)
+    return [json.loads(line) for line in body.splitlines()]
+
+
+class ExportTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.shirts = Category.objects.create(user=self.user, name='Shirts')
+        self.large = AttributeVariants.objects.create(
+            user=self.user, type='Size', name='L', price='2.50',
+        )
+        self.first = Article.objects.create(
+            user=self.user, title='First', price='9.99',
+        )
+        self.first.categories.add(self.shirts)
+        self.first.attributes.add(self.large)
+        ArticleImage.objects.create(article=self.first, image='uploads/a.jpg')
+        self.second = Article.objects.create(user=self.user, title='Second')
+
+    def age(self, *articles, days=1):
+        """ Move the updated_at of articles into the past."""
+        Article.objects.filter(pk__in=[a.pk for a in articles]).update(
+            updated_at=timezone.now() - timedelta(days=days),
+        )
+
+
+class ExportEndpointTests(ExportTestCase):
+    """ Test the export action of the article api"""
+
+    def test_ndjson_export(self):
+        """ Test every article is a line with its relations"""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123',
+        )
+        Article.objects.create(user=other, title='Hidden')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertIn('X-Export-Started', res)
+        records = {record['title']: record for record in lines(res)}
+        self.assertEqual(set(records), {'First', 'Second'})
+        first = records['First']
+        self.assertEqual(first['categories'], [
+            {'id': self.shirts.id, 'name': 'Shirts'},
+        ])
+        self.assertEqual(first['attributes'][0]['price'], '2.50')
+        self.assertTrue(first['images'][0]['image'].startswith('http://'))
+        self.assertIn('updated_at', first)
+
+    def test_csv_export(self):
+        """ Test the CSV layout flattens relations like the importer"""
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        body = b''.join(res.streaming_content).decode('utf-8')
+        rows = {row['title']: row for row in csv.DictReader(io.StringIO(body))}
+        self.assertEqual(rows['First']['categories'], 'Shirts')
+        self.assertEqual(rows['First']['attributes'], 'Size:L:2.50')
+        self.assertEqual(rows['First']['price'], '9.99')
+        self.assertEqual(rows['Second']['images'], '')
+
+    def test_updated_since(self):
+        """ Test incremental exports only hold changed articles"""
+        self.age(self.first, self.second, days=2)
+        since = timezone.now() - timedelta(days=1)
+        self.second.categories.add(self.shirts)
+
+        res = self.client.get(EXPORT_URL, {'updated_since': since.isoformat()})
+
+        self.assertEqual([r['title'] for r in lines(res)], ['Second'])
+
+    @override_settings(CATALOG_EXPORT={'OVERLAP': 60})
+    def test_write_committed_during_export_not_skipped(self):
+        """ Test rows stamped before an export began are in the next one"""
+        self.age(self.first, self.second, days=2)
+        began = timezone.now()
+        res = self.client.get(EXPORT_URL)
+        token = res['X-Export-Started']
+        # Stamped just before the export began, committed once it ran.
+        Article.objects.filter(pk=self.first.pk).update(
+            updated_at=began - timedelta(seconds=5),
+        )
+
+        res = self.client.get(EXPORT_URL, {'updated_since': token})
+
+        self.assertEqual([r['title'] for r in lines(res)], ['First'])
+
+    def test_invalid_updated_since(self):
+        """ Test a malformed updated_since is a bad request"""
+        res = self.client.get(EXPORT_URL, {'updated_since': 'yesterday'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_gzip(self):
+        """ Test the export is compressed when the client accepts gzip"""
+        plain = b''.join(self.client.get(EXPORT_URL).streaming_content)
+
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(b''.join(res.streaming_content)), plain,
+        )
+
+
+class UpdatedAtTests(ExportTestCase):
+    """ Test changes that mark articles as updated"""
+
+    def assertTouched(self, article):
+        article.refresh_from_db()
+        self.assertGreater(
+            article.updated_at, timezone.now() - timedelta(hours=1),
+        )
+
+    def test_api_update(self):
+        """ Test a partial update through the api"""
+        self.age(self.first)
+
+        self.client.patch(detail_url(self.first.id), {'title': 'New'})
+
+        self.assertTouched(self.first)
+
+    def test_reverse_links(self):
+        """ Test (un)linking from the category side"""
+        self.age(self.first, self.second)
+
+        self.shirts.article_set.add(self.second)
+        self.assertTouched(self.second)
+
+        self.age(self.first)
+        self.shirts.article_set.clear()
+        self.assertTouched(self.first)
+
+    def test_images(self):
+        """ Test adding and removing images"""
+        self.age(self.second)
+
+        ArticleImage.objects.create(article=self.second, image='b.jpg')
+
+        self.assertTouched(self.second)
+
+    def test_import_update(self):
+        """ Test the bulk importer marks relinked articles"""
+        self.age(self.second)
+        feed = io.BytesIO(
+            f'id,categories\n{self.second.id},Shirts\n'.encode('utf-8')
+        )
+        feed.name = 'feed.csv'
+
+        res = self.client.post(
+            reverse('articleupsert:article_upsert'), {'file': feed},
+            format='multipart',
+        )
+
+        self.assertEqual(res.data['updated'], 1)
+        self.assertTouched(self.second)
+
+
+class ExportCommandTests(ExportTestCase):
+    """ Test the export_articles command"""
+
+    def test_gzip_file(self):
+        """ Test exporting every article to a gzip file"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'articles.ndjson.gz')
+            err = io.StringIO()
+
+            call_command(
+                'export_articles', '--output', path, '--gzip', stderr=err,
+            )
+
+            with gzip.open(path) as fileobj:
+                records = [json.loads(line) for line in fileobj]
+        self.assertEqual(len(records), 2)
+        self.assertIn('Exported 2 articles', err.getvalue())
+        # Without a request image URLs are relative to the site.
+        first = next(r for r in records if r['title'] == 'First')
+        self.assertTrue(first['images'][0]['image'].startswith('/'))
+
+    def test_csv_stdout_incremental(self):
+        """ Test an incremental CSV export to stdout"""
+        self.age(self.first, days=3)
+        out = io.StringIO()
+
+        call_command(
+            'export_articles', '--format', 'csv', '--updated-since',
+            (timezone.now() - timedelta(days=1)).date().isoformat(),
+            '--user', str(self.user.id), stdout=out, stderr=io.StringIO(),
+        )
+
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([row['title'] for row in rows], ['Second'])
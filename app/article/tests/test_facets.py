@@ -0,0 +1,199 @@
+"""
+Test facet counts of the article list.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Article,
+    ArticleFacetCount,
+    AttributeVariants,
+    Category,
+)
+from article.facets import count_facets
+
+ARTICLES_URL = reverse('article:article-list')
+
+MATERIALIZED = {'MATERIALIZED': True}
+
+
+def counts(facet):
+    """ Return {id: count} of a serialized facet."""
+    return {item['id']: item['count'] for item in facet}
+
+
+class FacetTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.shirts = Category.objects.create(user=self.user, name='Shirts')
+        self.sale = Category.objects.create(user=self.user, name='Sale')
+        self.large = AttributeVariants.objects.create(
+            user=self.user, type='Size', name='L',
+        )
+
+    def create_article(self, categories=(), attributes=(), user=None):
+        article = Article.objects.create(user=user or self.user, title='a')
+        article.categories.add(*categories)
+        article.attributes.add(*attributes)
+        return article
+
+
+class LiveFacetTests(FacetTestCase):
+    """ Test facets computed over the filtered articles"""
+
+    def test_facets_not_returned_by_default(self):
+        """ Test the list has no facets unless asked for"""
+        res = self.client.get(ARTICLES_URL)
+
+        self.assertNotIn('facets', res.data)
+
+    def test_facets_count_all_matching_articles(self):
+        """ Test counts cover every article, not only the page"""
+        self.create_article([self.shirts, self.sale], [self.large])
+        self.create_article([self.shirts])
+        self.create_article([self.sale])
+
+        res = self.client.get(ARTICLES_URL, {'facets': '1', 'page_size': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            counts(res.data['facets']['categories']),
+            {self.shirts.id: 2, self.sale.id: 2},
+        )
+        self.assertEqual(
+            res.data['facets']['attributes'],
+            [{'id': self.large.id, 'type': 'Size', 'name': 'L',
+              'price': '0.00', 'count': 1}],
+        )
+
+    def test_facets_follow_filters(self):
+        """ Test counts only include articles matching the filters"""
+        self.create_article([self.shirts, self.sale])
+        self.create_article([self.shirts])
+        self.create_article([self.sale], [self.large])
+
+        res = self.client.get(ARTICLES_URL, {
+            'facets': 'categories', 'attributes': self.large.id,
+        })
+
+        self.assertEqual(list(res.data['facets']), ['categories'])
+        self.assertEqual(
+            counts(res.data['facets']['categories']), {self.sale.id: 1},
+        )
+
+    def test_facets_exclude_other_users(self):
+        """ Test other users' links are not counted"""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123',
+        )
+        self.create_article([self.shirts], user=other)
+
+        res = self.client.get(ARTICLES_URL, {'facets': '1'})
+
+        self.assertEqual(res.data['facets']['categories'], [])
+
+    def test_unknown_facet_rejected(self):
+        """ Test asking for an unknown facet is a bad request"""
+        res = self.client.get(ARTICLES_URL, {'facets': 'colour'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_counts_use_one_aggregate_query(self):
+        """ Test every facet is counted by a single query"""
+        for _ in range(3):
+            self.create_article([self.shirts, self.sale], [self.large])
+
+        with CaptureQueriesContext(connection) as queries:
+            result = count_facets(
+                Article.objects.filter(user=self.user),
+                ['categories', 'attributes'],
+            )
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(result['categories'][self.shirts.id], 3)
+        self.assertEqual(result['attributes'][self.large.id], 3)
+
+
+@override_settings(ARTICLE_FACETS=MATERIALIZED)
+class MaterializedFacetTests(FacetTestCase):
+    """ Test the facet table kept up to date from m2m_changed"""
+
+    def stored(self):
+        return {
+            (row.category_id, row.attribute_id): row.count
+            for row in ArticleFacetCount.objects.filter(user=self.user)
+            if row.count
+        }
+
+    def test_links_are_counted(self):
+        """ Test adding and removing links adjusts the counts"""
+        article = self.create_article([self.shirts, self.sale], [self.large])
+        self.create_article([self.shirts])
+
+        article.categories.remove(self.sale, self.shirts.id + 1000)
+
+        self.assertEqual(self.stored(), {
+            (self.shirts.id, None): 2,
+            (None, self.large.id): 1,
+        })
+
+    def test_clear_and_delete(self):
+        """ Test clearing links and deleting articles count down"""
+        first = self.create_article([self.shirts], [self.large])
+        second = self.create_article([self.shirts], [self.large])
+
+        first.categories.clear()
+        second.delete()
+
+        self.assertEqual(self.stored(), {(None, self.large.id): 1})
+
+    def test_reverse_links(self):
+        """ Test linking from the category side is counted"""
+        first = self.create_article()
+        second = self.create_article()
+
+        self.sale.article_set.add(first, second)
+        self.sale.article_set.remove(first)
+
+        self.assertEqual(self.stored(), {(self.sale.id, None): 1})
+
+    def test_unfiltered_list_served_from_table(self):
+        """ Test unfiltered lists read the materialized counts"""
+        self.create_article([self.shirts])
+        ArticleFacetCount.objects.filter(category=self.shirts).update(count=7)
+
+        res = self.client.get(ARTICLES_URL, {'facets': 'categories'})
+
+        self.assertEqual(
+            counts(res.data['facets']['categories']), {self.shirts.id: 7},
+        )
+
+    def test_refresh_command_rebuilds_counts(self):
+        """ Test the refresh command recomputes drifted counts"""
+        self.create_article([self.shirts], [self.large])
+        ArticleFacetCount.objects.all().delete()
+
+        call_command(
+            'refresh_facet_counts', '--user', str(self.user.id),
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(self.stored(), {
+            (self.shirts.id, None): 1,
+            (None, self.large.id): 1,
+        })
@@ -0,0 +1,158 @@
+"""
+Test EXISTS based relation filtering of the article api.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Article, AttributeVariants, Category
+from core.testing import QueryPlanTestMixin
+from article.filtering import related_conditions
+
+ARTICLES_URL = reverse('article:article-list')
+CATEGORIES_URL = reverse('article:category-list')
+
+# No full scans of either table and no DISTINCT over the articles.
+NO_SCANS = {'sqlite': ['DISTINCT', 'SCAN']}
+
+
+class RelationFilterTests(QueryPlanTestMixin, TestCase):
+    """ Test filtering articles by categories and attributes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.categories = [
+            Category.objects.create(user=self.user, name=f'c{i}')
+            for i in range(4)
+        ]
+        self.variant = AttributeVariants.objects.create(
+            user=self.user, type='Size', name='L',
+        )
+        # Article i is linked to the first i % 4 categories.
+        self.articles = []
+        for i in range(40):
+            article = Article.objects.create(user=self.user, title=f'a{i}')
+            article.categories.add(*self.categories[:i % 4])
+            if i % 2:
+                article.attributes.add(self.variant)
+            self.articles.append(article)
+
+    def ids(self, *categories):
+        return ','.join(str(category.id) for category in categories)
+
+    def expected(self, match):
+        first, second = self.categories[:2]
+        return sorted(
+            (
+                article.id for article in self.articles
+                if match(
+                    set(article.categories.all()) & {first, second}
+                )
+            ),
+            reverse=True,
+        )
+
+    def test_any_of_returns_each_article_once(self):
+        """ Test articles linked to several ids are not repeated"""
+        res = self.client.get(ARTICLES_URL, {
+            'categories': self.ids(*self.categories[:2]), 'page_size': 100,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, self.expected(bool))
+
+    def test_all_of_requires_every_id(self):
+        """ Test match=all only returns articles with every category"""
+        res = self.client.get(ARTICLES_URL, {
+            'categories': self.ids(*self.categories[:2]),
+            'match': 'all',
+            'page_size': 100,
+        })
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, self.expected(lambda linked: len(linked) == 2))
+
+    def test_relations_combine(self):
+        """ Test categories and attributes filters both apply"""
+        res = self.client.get(ARTICLES_URL, {
+            'categories': self.ids(self.categories[0]),
+            'attributes': str(self.variant.id),
+            'page_size': 100,
+        })
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, sorted(
+            (a.id for i, a in enumerate(self.articles) if i % 4 and i % 2),
+            reverse=True,
+        ))
+
+    def test_invalid_parameters_rejected(self):
+        """ Test malformed ids and match modes are bad requests"""
+        for params in ({'categories': '1,x'}, {'match': 'some'}):
+            res = self.client.get(ARTICLES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_query_uses_exists(self):
+        """ Test the list query filters with EXISTS instead of joins"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(ARTICLES_URL, {
+                'categories': self.ids(*self.categories[:2]),
+            })
+
+        sql = next(
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT "core_article"."id"')
+        )
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('JOIN "core_article_categories"', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_any_of_plan(self):
+        """ Test any-of probes the through table's unique index once"""
+        queryset = Article.objects.filter(user=self.user).filter(
+            *related_conditions('categories', [1, 2])
+        )
+
+        plan = self.assertPlan(
+            queryset,
+            contains={'sqlite': ['USING COVERING INDEX']},
+            excludes=NO_SCANS,
+        )
+        if connection.vendor == 'sqlite':
+            self.assertEqual(plan.count('CORRELATED SCALAR SUBQUERY'), 1)
+
+    def test_all_of_plan(self):
+        """ Test all-of runs one indexed probe per id"""
+        queryset = Article.objects.filter(user=self.user).filter(
+            *related_conditions('categories', [1, 2, 3], 'all')
+        )
+
+        plan = self.assertPlan(
+            queryset,
+            excludes=NO_SCANS,
+        )
+        if connection.vendor == 'sqlite':
+            self.assertEqual(plan.count('USING COVERING INDEX'), 3)
+
+    def test_assigned_only_without_distinct(self):
+        """ Test assigned_only categories come back once each"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(CATEGORIES_URL, {'assigned_only': 1})
+
+        names = [item['name'] for item in res.data['results']]
+        self.assertEqual(names, ['c2', 'c1', 'c0'])
+        self.assertFalse(any(
+            'DISTINCT' in query['sql'] for query in queries.captured_queries
+        ))
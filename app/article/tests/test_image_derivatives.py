@@ -0,0 +1,178 @@
+"""
+Test resized derivatives of article images.
+"""
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from article.derivatives import generate, render_variants
+from core.models import Article, ArticleImage
+
+ARTICLES_URL = reverse('article:article-list')
+DERIVATIVES = {
+    'SIZES': {'thumbnail': (20, 20)},
+    'FORMAT': 'WEBP',
+    'ASYNC': False,
+}
+
+
+def detail_url(article_id):
+    """ create and return a article detail URL."""
+    return reverse('article:article-detail', args=[article_id])
+
+
+def image_upload_url(article_id):
+    """ Cretae and return an Image uplaod Url"""
+    return reverse('article:article-upload-image', args=[article_id])
+
+
+def sample_image(suffix='.jpg', size=(100, 60)):
+    """ Return an open temporary JPEG file"""
+    image_file = tempfile.NamedTemporaryFile(suffix=suffix)
+    Image.new('RGB', size).save(image_file, format='JPEG')
+    image_file.seek(0)
+    return image_file
+
+
+@override_settings(IMAGE_DERIVATIVES=DERIVATIVES)
+class ImageDerivativeTests(TestCase):
+    """ Test generating thumbnails after upload"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.paths = []
+
+    def tearDown(self):
+        for path in self.paths:
+            if default_storage.exists(path):
+                default_storage.delete(path)
+
+    def _track(self, field_file, variants):
+        self.paths.append(field_file.name)
+        self.paths.extend(variants.values())
+
+    def test_upload_image_generates_variants_after_commit(self):
+        """ Test the article image thumbnail is rendered on commit"""
+        article = Article.objects.create(user=self.user, title='a')
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            with sample_image() as image_file:
+                res = self.client.post(
+                    image_upload_url(article.id),
+                    {'image': image_file},
+                    format='multipart',
+                )
+        article.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(article.image_variants, {})
+
+        for callback in callbacks:
+            callback()
+        article.refresh_from_db()
+        self._track(article.image, article.image_variants)
+
+        path = article.image_variants['thumbnail']
+        self.assertTrue(path.endswith('_thumbnail.webp'))
+        with default_storage.open(path) as variant:
+            with Image.open(variant) as image:
+                self.assertEqual(image.format, 'WEBP')
+                self.assertLessEqual(max(image.size), 20)
+
+    def test_uploaded_images_expose_variant_urls(self):
+        """ Test the detail response lists the thumbnail urls"""
+        with self.captureOnCommitCallbacks(execute=True):
+            with sample_image() as image_file:
+                res = self.client.post(
+                    ARTICLES_URL,
+                    {'title': 'a', 'uploaded_images': [image_file]},
+                    format='multipart',
+                )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        image = ArticleImage.objects.get(article_id=res.data['id'])
+        self._track(image.image, image.variants)
+
+        res = self.client.get(detail_url(res.data['id']))
+
+        urls = res.data['images'][0]['variants']
+        self.assertEqual(list(urls), ['thumbnail'])
+        self.assertTrue(urls['thumbnail'].startswith('http://testserver/'))
+        self.assertTrue(
+            os.path.basename(urls['thumbnail']).endswith('_thumbnail.webp')
+        )
+
+    def test_replacing_image_renders_new_variants(self):
+        """ Test a PATCH of the image replaces its thumbnails"""
+        article = Article.objects.create(user=self.user, title='a')
+        with self.captureOnCommitCallbacks(execute=True):
+            with sample_image() as image_file:
+                self.client.post(
+                    image_upload_url(article.id),
+                    {'image': image_file},
+                    format='multipart',
+                )
+        article.refresh_from_db()
+        self._track(article.image, article.image_variants)
+        old = article.image_variants['thumbnail']
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            with sample_image(size=(80, 80)) as image_file:
+                res = self.client.patch(
+                    detail_url(article.id),
+                    {'image': image_file},
+                    format='multipart',
+                )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_variants'], {})
+        for callback in callbacks:
+            callback()
+        article.refresh_from_db()
+        self._track(article.image, article.image_variants)
+
+        self.assertFalse(default_storage.exists(old))
+        self.assertNotEqual(article.image_variants['thumbnail'], old)
+        self.assertTrue(
+            default_storage.exists(article.image_variants['thumbnail'])
+        )
+
+    def test_stale_job_after_replacement_discarded(self):
+        """ Test a job for a replaced image keeps the new variants"""
+        article = Article.objects.create(user=self.user, title='a')
+        with sample_image() as image_file:
+            article.image.save('old.jpg', File(image_file))
+        self.paths.append(article.image.name)
+        current = {'thumbnail': 'uploads/article/new_thumbnail.webp'}
+        rendered = {}
+
+        def replaced_while_rendering(field_file):
+            rendered.update(render_variants(field_file))
+            # The replacement and its own job finish in the meantime.
+            Article.objects.filter(pk=article.pk).update(
+                image='uploads/article/new.jpg', image_variants=current,
+            )
+            return rendered
+
+        with patch('article.derivatives.render_variants',
+                   side_effect=replaced_while_rendering):
+            generate(Article, article.pk, 'image', 'image_variants')
+        self.paths.extend(rendered.values())
+
+        article.refresh_from_db()
+        self.assertEqual(article.image_variants, current)
+        self.assertTrue(rendered)
+        for path in rendered.values():
+            self.assertFalse(default_storage.exists(path))
@@ -0,0 +1,127 @@
+"""
+Test keyset pagination of the article api.
+"""
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Article, Category
+
+ARTICLES_URL = reverse('article:article-list')
+CATEGORIES_URL = reverse('article:category-list')
+PRODUCT_LIST_URL = reverse('article:productlist-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """ Test paging through list endpoints with a cursor"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url):
+        """ Follow next links and return all ids seen, page by page."""
+        pages = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append([item['id'] for item in res.data['results']])
+            url = res.data['next']
+        return pages
+
+    def test_articles_are_paged_by_id(self):
+        """ Test pages cover all articles in descending id order"""
+        ids = [
+            Article.objects.create(user=self.user, title=f'a{i}').id
+            for i in range(7)
+        ]
+
+        pages = self._walk(f'{ARTICLES_URL}?page_size=3')
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), sorted(ids, reverse=True))
+
+    def test_cursor_seeks_instead_of_offset(self):
+        """ Test the next page filters on id rather than using OFFSET"""
+        for i in range(4):
+            Article.objects.create(user=self.user, title=f'a{i}')
+        res = self.client.get(ARTICLES_URL, {'page_size': 2})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(res.data['next'])
+
+        sql = ctx.captured_queries[0]['sql']
+        self.assertIn('"id" <', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_count_only_when_requested(self):
+        """ Test the total count is opt in"""
+        Article.objects.create(user=self.user, title='a')
+
+        res = self.client.get(ARTICLES_URL)
+        self.assertNotIn('count', res.data)
+
+        res = self.client.get(ARTICLES_URL, {'count': 1})
+        self.assertEqual(res.data['count'], 1)
+
+    def test_previous_link_returns_prior_page(self):
+        """ Test following previous returns the page before"""
+        for i in range(5):
+            Article.objects.create(user=self.user, title=f'a{i}')
+        first = self.client.get(ARTICLES_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+
+        back = self.client.get(second.data['previous'])
+
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_categories_paged_by_name_with_duplicates(self):
+        """ Test non unique orderings fall back to the id tie breaker"""
+        for name in ['b', 'a', 'b', 'c', 'b']:
+            Category.objects.create(user=self.user, name=name)
+
+        pages = self._walk(f'{CATEGORIES_URL}?page_size=2')
+        ids = sum(pages, [])
+
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_article_list_endpoint_paged(self):
+        """ Test the filterable article list is paged by id"""
+        ids = [
+            Article.objects.create(user=self.user, title=f'a{i}').id
+            for i in range(3)
+        ]
+
+        pages = self._walk(f'{PRODUCT_LIST_URL}?page_size=2')
+
+        self.assertEqual(sum(pages, []), sorted(ids, reverse=True))
+
+    def test_invalid_cursor(self):
+        """ Test an invalid cursor returns 404"""
+        res = self.client.get(ARTICLES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_cursor_value(self):
+        """ Test a cursor value of the wrong type returns 404"""
+        Article.objects.create(user=self.user, title='a')
+        for value in ('abc', [1], {'id': 1}, None):
+            raw = json.dumps({'v': [value]}).encode('utf-8')
+            cursor = base64.urlsafe_b64encode(raw).decode('ascii')
+
+            res = self.client.get(ARTICLES_URL, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
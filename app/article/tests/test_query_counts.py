@@ -0,0 +1,108 @@
+"""
+Test query counts of the article api endpoints.
+"""
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import (
+    Article,
+    ArticleImage,
+    AttributeVariants,
+    Category,
+)
+from core.testing import QueryCountTestMixin
+
+from article.queryplan import plan_for_serializer
+from article.serializers import ArticleDetailSerializer
+
+ARTICLES_URL = reverse('article:article-list')
+CATEGORIES_URL = reverse('article:category-list')
+ATTRIBUTES_URL = reverse('article:attributevariants-list')
+
+
+def detail_url(article_id):
+    """ create and return a article detail URL."""
+    return reverse('article:article-detail', args=[article_id])
+
+
+class QueryPlanTests(TestCase):
+    """ Test the serializer query plan"""
+
+    def test_plan_prefetches_nested_fields(self):
+        """ Test nested serializers are prefetched with trimmed columns"""
+        plan = plan_for_serializer(ArticleDetailSerializer)
+        lookups = {p.lookup: p for p in plan.prefetches}
+
+        self.assertEqual(set(lookups), {'categories', 'attributes', 'images'})
+        self.assertEqual(lookups['categories'].plan.columns, ['id', 'name'])
+        images = lookups['images'].build().queryset
+        self.assertIn('article', images.query.deferred_loading[0])
+        self.assertNotIn('uploaded_images', plan.columns)
+
+
+class ArticleQueryCountTests(QueryCountTestMixin, TestCase):
+    """ Test the article endpoints run a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _create_articles(self, count):
+        for i in range(count):
+            article = Article.objects.create(
+                user=self.user,
+                title=f'article {i}',
+                price=Decimal('5.50'),
+            )
+            article.categories.add(
+                Category.objects.create(user=self.user, name=f'cat {i}'),
+                Category.objects.create(user=self.user, name=f'cat {i} b'),
+            )
+            article.attributes.add(
+                AttributeVariants.objects.create(
+                    user=self.user, type='Size', name=f'size {i}'
+                )
+            )
+            ArticleImage.objects.create(article=article, image=f'img{i}.jpg')
+
+    def test_article_list_query_count(self):
+        """ Test listing articles does not run a query per article"""
+        self.assertConstantQueries(
+            lambda: self.client.get(ARTICLES_URL),
+            self._create_articles,
+            expected=4,
+        )
+
+    def test_article_detail_query_count(self):
+        """ Test article detail prefetches nested relations"""
+        self._create_articles(1)
+        article = Article.objects.get()
+        _, count = self.count_queries(
+            self.client.get, detail_url(article.id)
+        )
+
+        self.assertEqual(count, 4)
+
+    def test_category_list_query_count(self):
+        """ Test listing categories runs a single query"""
+        self.assertConstantQueries(
+            lambda: self.client.get(CATEGORIES_URL),
+            self._create_articles,
+            expected=1,
+        )
+
+    def test_attribute_list_query_count(self):
+        """ Test listing attribute variants runs a single query"""
+        self.assertConstantQueries(
+            lambda: self.client.get(ATTRIBUTES_URL),
+            self._create_articles,
+            expected=1,
+        )
@@ -0,0 +1,177 @@
+"""
+Test the read only row serializers of the article api.
+"""
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from core.models import (
+    Article,
+    ArticleImage,
+    AttributeVariants,
+    Category,
+)
+from article.readonly import RowSerializer
+from article.views import ArticleViewSet
+
+ARTICLES_URL = reverse('article:article-list')
+
+
+def detail_url(article_id):
+    """ create and return a article detail URL."""
+    return reverse('article:article-detail', args=[article_id])
+
+
+class ArticleRowsTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        shirts = Category.objects.create(user=self.user, name='Shirts')
+        sale = Category.objects.create(user=self.user, name='Sale "50%"')
+        large = AttributeVariants.objects.create(
+            user=self.user, type='Size', name='L', price=Decimal('2.5'),
+        )
+        red = AttributeVariants.objects.create(
+            user=self.user, type='Colour', name='Röd',
+        )
+        for i in range(5):
+            article = Article.objects.create(
+                user=self.user,
+                title=f'Article {i} ',
+                short_description='' if i % 2 else 'Short',
+                description=f'Line one\nline {i}',
+                price=Decimal(i) + Decimal('0.10'),
+                stock=str(i),
+                image=f'uploads/article/{i}.jpg' if i % 2 else None,
+                image_variants={'thumbnail': f'uploads/article/{i}_t.webp'}
+                if i % 2 else {},
+            )
+            article.categories.add(*[shirts, sale][:i % 3])
+            article.attributes.add(*[large, red][i % 2:])
+            for n in range(i % 3):
+                ArticleImage.objects.create(
+                    article=article,
+                    image=f'uploads/article/{i}-{n}.jpg',
+                    variants={'medium': f'uploads/article/{i}-{n}_m.webp'},
+                )
+        self.article = article
+
+
+class RowSerializerGoldenTests(ArticleRowsTestCase):
+    """ Test rows render byte for byte like the ModelSerializers"""
+
+    def get_both(self, url, params=None):
+        """ Return the body of url from the ModelSerializer and row paths."""
+        bodies = []
+        for enabled in (False, True):
+            cache.clear()
+            with mock.patch.object(
+                ArticleViewSet, 'row_serialization', enabled,
+            ):
+                res = self.client.get(url, params or {})
+            self.assertEqual(res.status_code, 200)
+            bodies.append(res.content)
+        return bodies
+
+    def test_list_identical(self):
+        """ Test list pages render the same bytes"""
+        expected, actual = self.get_both(ARTICLES_URL)
+
+        self.assertEqual(actual, expected)
+        self.assertIn(b'http://testserver/static/media/uploads', actual)
+
+    def test_paginated_list_identical(self):
+        """ Test cursors and facets render the same bytes"""
+        expected, actual = self.get_both(
+            ARTICLES_URL, {'page_size': 2, 'count': 1, 'facets': 1},
+        )
+
+        self.assertEqual(actual, expected)
+        self.assertIn(b'"next":"http://testserver', actual)
+
+    def test_detail_identical(self):
+        """ Test the detail page renders the same bytes"""
+        for article in Article.objects.all():
+            expected, actual = self.get_both(detail_url(article.id))
+
+            self.assertEqual(actual, expected)
+
+    def test_other_users_article_not_found(self):
+        """ Test the row path only serves the user's articles"""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123',
+        )
+        article = Article.objects.create(user=other, title='Hidden')
+
+        res = self.client.get(detail_url(article.id))
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_list_queries_fixed(self):
+        """ Test the row path loads a page in one query per relation"""
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.client.get(ARTICLES_URL)
+
+
+class RowSerializerCompileTests(TestCase):
+    """ Test compiling serializers into row serializers"""
+
+    def test_unsupported_field_rejected(self):
+        """ Test fields that cannot be read from a row are refused"""
+
+        class OwnerEmailSerializer(serializers.ModelSerializer):
+            email = serializers.CharField(source='user.email')
+
+            class Meta:
+                model = Article
+                fields = ['id', 'email']
+
+        with self.assertRaises(ImproperlyConfigured):
+            RowSerializer(OwnerEmailSerializer())
+
+
+class StreamingListTests(ArticleRowsTestCase):
+    """ Test streaming the whole article list"""
+
+    def test_stream_matches_list(self):
+        """ Test the stream holds every article of the list in order"""
+        cache.clear()
+        page = self.client.get(ARTICLES_URL)
+
+        res = self.client.get(ARTICLES_URL, {'stream': 1})
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(
+            json.loads(b''.join(res.streaming_content)),
+            page.json()['results'],
+        )
+
+    @override_settings(ARTICLE_STREAMING={'CHUNK_SIZE': 2})
+    def test_relations_loaded_per_chunk(self):
+        """ Test every chunk loads its own relations"""
+        res = self.client.get(ARTICLES_URL, {'stream': 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            items = json.loads(b''.join(res.streaming_content))
+
+        self.assertEqual(len(items), 5)
+        # One cursor over the articles plus three relations per chunk.
+        self.assertEqual(len(queries), 1 + 3 * 3)
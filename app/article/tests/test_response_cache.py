@@ -0,0 +1,108 @@
+"""
+Test response caching of the article api.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Article, ArticleImage, Category
+
+ARTICLES_URL = reverse('article:article-list')
+CATEGORIES_URL = reverse('article:category-list')
+
+
+def detail_url(article_id):
+    """ create and return a article detail URL."""
+    return reverse('article:article-detail', args=[article_id])
+
+
+class ResponseCacheTests(TestCase):
+    """ Test cached reads and conditional GETs"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.article = Article.objects.create(user=self.user, title='First')
+
+    def test_repeated_list_served_from_cache(self):
+        """ Test a repeated list request does not hit the database"""
+        first = self.client.get(ARTICLES_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(ARTICLES_URL)
+
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_matching_etag_returns_not_modified(self):
+        """ Test If-None-Match with the current ETag returns 304"""
+        res = self.client.get(detail_url(self.article.id))
+
+        res = self.client.get(
+            detail_url(self.article.id), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_query_params_are_part_of_the_key(self):
+        """ Test filtered lists are cached separately"""
+        category = Category.objects.create(user=self.user, name='Men')
+        self.article.categories.add(category)
+        Article.objects.create(user=self.user, title='Second')
+
+        full = self.client.get(ARTICLES_URL)
+        filtered = self.client.get(ARTICLES_URL, {'categories': category.id})
+
+        self.assertEqual(len(full.data['results']), 2)
+        self.assertEqual(len(filtered.data['results']), 1)
+        self.assertNotEqual(full['ETag'], filtered['ETag'])
+
+    def test_article_change_invalidates(self):
+        """ Test saving an article changes the ETag and the data"""
+        res = self.client.get(detail_url(self.article.id))
+        self.article.title = 'Changed'
+        self.article.save()
+
+        new = self.client.get(
+            detail_url(self.article.id), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(new.status_code, status.HTTP_200_OK)
+        self.assertEqual(new.data['title'], 'Changed')
+
+    def test_link_and_image_changes_invalidate(self):
+        """ Test m2m changes and new images invalidate cached reads"""
+        etags = [self.client.get(ARTICLES_URL)['ETag']]
+        self.article.categories.add(
+            Category.objects.create(user=self.user, name='Men')
+        )
+        etags.append(self.client.get(ARTICLES_URL)['ETag'])
+        ArticleImage.objects.create(article=self.article, image='a.jpg')
+        etags.append(self.client.get(ARTICLES_URL)['ETag'])
+
+        self.assertEqual(len(set(etags)), 3)
+
+    def test_category_list_cached_per_user(self):
+        """ Test users never see each other's cached responses"""
+        Category.objects.create(user=self.user, name='Mine')
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123'
+        )
+        self.client.get(CATEGORIES_URL)
+
+        self.client.force_authenticate(other)
+        res = self.client.get(CATEGORIES_URL)
+
+        self.assertEqual(res.data['results'], [])
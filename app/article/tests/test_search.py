@@ -0,0 +1,122 @@
+"""
+Test full-text search of the article api.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Article, ArticleSearchTerm
+from article.search import headline
+
+SEARCH_URL = reverse('article:article-search')
+
+
+class ArticleSearchTests(TestCase):
+    """ Test the search endpoint on the python index fallback"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_article(self, user=None, **params):
+        return Article.objects.create(user=user or self.user, **params)
+
+    def test_search_requires_query(self):
+        """ Test searching without q is rejected"""
+        res = self.client.get(SEARCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_results_are_ranked_by_field_weight(self):
+        """ Test title matches rank above description matches"""
+        in_description = self.create_article(
+            title='Plain shirt', description='Made of organic cotton',
+        )
+        in_title = self.create_article(title='Cotton shirt')
+        self.create_article(title='Wool jumper')
+
+        res = self.client.get(SEARCH_URL, {'q': 'cotton'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [in_title.id, in_description.id])
+        self.assertGreater(
+            res.data['results'][0]['rank'], res.data['results'][1]['rank']
+        )
+
+    def test_all_words_must_match(self):
+        """ Test every word of the query has to occur in the article"""
+        match = self.create_article(
+            title='Blue cotton shirt', short_description='slim fit',
+        )
+        self.create_article(title='Blue wool shirt')
+
+        res = self.client.get(SEARCH_URL, {'q': 'blue cotton'})
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [match.id]
+        )
+
+    def test_words_match_by_prefix(self):
+        """ Test query words match longer indexed words"""
+        article = self.create_article(title='Running shoes')
+
+        res = self.client.get(SEARCH_URL, {'q': 'run'})
+
+        self.assertEqual(res.data['results'][0]['id'], article.id)
+
+    def test_headline_highlights_matches(self):
+        """ Test results carry the matched words wrapped in <b>"""
+        self.create_article(
+            title='Shirt', description='Soft organic cotton for summer',
+        )
+
+        res = self.client.get(SEARCH_URL, {'q': 'cotton'})
+
+        self.assertIn('<b>cotton</b>', res.data['results'][0]['headline'])
+
+    def test_search_limited_to_user(self):
+        """ Test other users' articles are not found"""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123',
+        )
+        self.create_article(user=other, title='Cotton shirt')
+
+        res = self.client.get(SEARCH_URL, {'q': 'cotton'})
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_update_reindexes_text(self):
+        """ Test editing the title replaces its index terms"""
+        article = self.create_article(title='Cotton shirt')
+        url = reverse('article:article-detail', args=[article.id])
+
+        self.client.patch(url, {'title': 'Linen shirt'})
+
+        res = self.client.get(SEARCH_URL, {'q': 'cotton'})
+        self.assertEqual(res.data['results'], [])
+        res = self.client.get(SEARCH_URL, {'q': 'linen'})
+        self.assertEqual(res.data['results'][0]['id'], article.id)
+
+    def test_delete_removes_terms(self):
+        """ Test deleting an article drops its index terms"""
+        article = self.create_article(title='Cotton shirt')
+        article.delete()
+
+        self.assertFalse(ArticleSearchTerm.objects.exists())
+
+    def test_headline_window(self):
+        """ Test long texts are cut around the first match"""
+        words = [f'word{i}' for i in range(100)] + ['needle']
+
+        text = headline(' '.join(words), ['needle'], max_words=10)
+
+        self.assertEqual(len(text.split()), 10)
+        self.assertTrue(text.endswith('<b>needle</b>'))
@@ -0,0 +1,142 @@
+"""
+Test streaming multi-image uploads.
+"""
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import (
+    SimpleUploadedFile,
+    TemporaryUploadedFile,
+)
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Article, ArticleImage
+from article.uploads import BudgetedUploadHandler, UploadTooLarge
+
+ARTICLES_URL = reverse('article:article-list')
+
+
+def detail_url(article_id):
+    """ create and return a article detail URL."""
+    return reverse('article:article-detail', args=[article_id])
+
+
+def image_upload(name='img.png', size=(10, 10), fmt='PNG'):
+    """ Return an uploaded image file"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size).save(buffer, format=fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class StreamingUploadTests(TestCase):
+    """ Test uploading several images with an article"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        for image in ArticleImage.objects.all():
+            default_storage.delete(image.image.name)
+
+    def _post(self, images, url=ARTICLES_URL, method='post'):
+        return getattr(self.client, method)(
+            url,
+            {'title': 'a', 'uploaded_images': images},
+            format='multipart',
+        )
+
+    def test_create_with_several_images(self):
+        """ Test every uploaded image is stored for the article"""
+        res = self._post([image_upload(f'{i}.png') for i in range(3)])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        article = Article.objects.get(id=res.data['id'])
+        self.assertEqual(article.images.count(), 3)
+
+    def test_update_appends_images(self):
+        """ Test a patch with images adds them to the article"""
+        article = Article.objects.create(user=self.user, title='a')
+
+        res = self._post([image_upload()], detail_url(article.id), 'patch')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(article.images.count(), 1)
+
+    def test_invalid_image_rejected(self):
+        """ Test a file that is not an image is rejected"""
+        res = self._post([SimpleUploadedFile('a.png', b'not an image')])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Article.objects.exists())
+
+    @override_settings(IMAGE_UPLOADS={'MAX_DIMENSION': 50})
+    def test_oversized_dimensions_rejected(self):
+        """ Test images above the dimension limit are rejected"""
+        res = self._post([image_upload(size=(51, 10))])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IMAGE_UPLOADS={'FORMATS': ('JPEG',)})
+    def test_unsupported_format_rejected(self):
+        """ Test only configured image formats are accepted"""
+        res = self._post([image_upload(fmt='PNG')])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IMAGE_UPLOADS={'MAX_FILES': 2})
+    def test_file_count_budget(self):
+        """ Test uploads with too many files are refused"""
+        res = self._post([image_upload(f'{i}.png') for i in range(3)])
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertFalse(Article.objects.exists())
+
+    @override_settings(IMAGE_UPLOADS={'MAX_REQUEST_BYTES': 1024})
+    def test_request_byte_budget(self):
+        """ Test uploads above the request budget are refused"""
+        res = self._post([image_upload(size=(200, 200), fmt='BMP')])
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+
+class BudgetedUploadHandlerTests(TestCase):
+    """ Test the streaming upload handler"""
+
+    def _start(self, handler, name='a.png'):
+        handler.new_file('uploaded_images', name, 'image/png', None)
+
+    def test_small_files_are_streamed_to_disk(self):
+        """ Test even small parts are written to a temporary file"""
+        handler = BudgetedUploadHandler()
+        self._start(handler)
+        handler.receive_data_chunk(b'abc', 0)
+
+        uploaded = handler.file_complete(3)
+
+        self.assertIsInstance(uploaded, TemporaryUploadedFile)
+        self.assertEqual(uploaded.read(), b'abc')
+        uploaded.close()
+
+    @override_settings(IMAGE_UPLOADS={'MAX_FILE_BYTES': 4})
+    def test_file_budget_exceeded(self):
+        """ Test a single oversized part stops the upload"""
+        handler = BudgetedUploadHandler()
+        self._start(handler)
+
+        with self.assertRaises(UploadTooLarge):
+            handler.receive_data_chunk(b'12345', 0)
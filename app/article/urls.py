@@ -13,7 +13,11 @@ router = DefaultRouter()
 router.register('articles', views.ArticleViewSet)
 router.register('categories', views.CategoryViewSet)
 router.register('attributevariants', views.AttributeVariantsViewSet)
-router.register('article-list', views.ProductListAPIView)
+router.register(
+    'article-list',
+    views.ProductListAPIView,
+    basename='productlist',
+)
 app_name = 'article'
 
 urlpatterns = [
@@ -0,0 +1,21 @@
+"""
+url mappings for the article api under ASGI
+"""
+from django.urls import (
+    path,
+    include,
+)
+
+from article import views
+from article.urls import app_name, router  # noqa: F401
+from core.async_views import async_urlpatterns
+
+READ_VIEWSETS = (
+    views.ArticleViewSet,
+    views.CategoryViewSet,
+    views.AttributeVariantsViewSet,
+)
+
+urlpatterns = [
+    path('', include(async_urlpatterns(router.urls, READ_VIEWSETS))),
+]
@@ -1,6 +1,8 @@
 """
 Views for articles api
 """
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -14,18 +16,28 @@ from rest_framework import (
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics
 import django_filters
+from user.authentication import CachedTokenAuthentication
+from core.renderers import stream_json_array
 from core.models import (
     Article,
     Category,
     AttributeVariants,
 )
-from article import serializers
+from article import facets, filtering, serializers
+from article import export as catalog_export
+from article.caching import CachedResponseMixin
+from article.uploads import use_streaming_uploads
+from article.pagination import KeysetPagination
+from article.queryplan import optimize_queryset
+from article.readonly import row_serializer_for
+from article.search import get_setting as get_search_setting, search_articles
 
 
 @extend_schema_view(
@@ -41,49 +53,284 @@ from article import serializers
                 OpenApiTypes.STR,
                 description='Comma separated list of attributes Ids to filter',
             ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR,
+                enum=['any', 'all'],
+                description=(
+                    'Whether articles need any (default) or all of the '
+                    'listed categories and attributes'
+                ),
+            ),
+            OpenApiParameter(
+                'stream',
+                OpenApiTypes.INT,
+                enum=[0, 1],
+                description=(
+                    'Set to 1 to stream every matching article as a single '
+                    'unpaginated JSON array'
+                ),
+            ),
+            OpenApiParameter(
+                'facets',
+                OpenApiTypes.STR,
+                description=(
+                    'Comma separated facets to count over the filtered '
+                    'articles (categories, attributes) or 1 for all'
+                ),
+            ),
 
         ]
     )
 )
 
 
-class ArticleViewSet(viewsets.ModelViewSet):
+class ArticleViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """ View for managing article api"""
     serializer_class = serializers.ArticleDetailSerializer
     queryset = Article.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ('-id',)
+    # Render list and retrieve from .values() rows (see article.readonly).
+    row_serialization = True
+
 
+    def initial(self, request, *args, **kwargs):
+        """ Stream multipart article uploads to disk within a budget"""
+        super().initial(request, *args, **kwargs)
+        if self.action in ('create', 'update', 'partial_update'):
+            use_streaming_uploads(request)
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, qs, name=None):
         """ coverts a list of strings to integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            raise ValidationError(
+                {name or 'ids': ['Expected a comma separated list of ids.']}
+            )
+
+    def _filtered_queryset(self):
+        """ Return the user's articles matching the filter parameters.
+
+        Relations are matched with EXISTS subqueries, so articles never
+        repeat. match=all requires every listed id instead of any.
+        """
+        params = self.request.query_params
+        match = params.get('match', filtering.MATCH_ANY)
+        if match not in filtering.MATCH_MODES:
+            raise ValidationError(
+                {'match': [f'Expected one of {filtering.MATCH_MODES}.']}
+            )
+        queryset = self.queryset.filter(user=self.request.user)
+        for field_name in ('categories', 'attributes'):
+            if params.get(field_name):
+                ids = self._params_to_ints(params[field_name], field_name)
+                queryset = queryset.filter(*filtering.related_conditions(
+                    field_name, ids, match,
+                ))
+        return queryset
 
     def get_queryset(self):
         """ retrieve articles for aurthenticated user"""
-        categories = self.request.query_params.get('categories')
-        attributes = self.request.query_params.get('attributes')
-        queryset = self.queryset
-        if categories:
-            cat_ids = self._params_to_ints(categories)
-            queryset = queryset.filter(categories__id__in=cat_ids)
-        if attributes:
-            attr_ids = self._params_to_ints(attributes)
-            queryset = queryset.filter(attributes__id__in=attr_ids)
-        return queryset.filter(user=self.request.user).order_by('-id')
+        queryset = optimize_queryset(
+            self._filtered_queryset(),
+            self.get_serializer_class(),
+            trim=self.action in ('list', 'search'),
+        )
+        return queryset.order_by(*self.ordering)
+
+    def get_paginated_response(self, data):
+        """ Add the requested facet counts to the list page"""
+        response = super().get_paginated_response(data)
+        params = self.request.query_params
+        names = facets.requested_facets(params.get('facets'))
+        if names:
+            response.data['facets'] = facets.get_facets(
+                self._filtered_queryset(),
+                self.request.user,
+                names,
+                filtered=bool(
+                    params.get('categories') or params.get('attributes')
+                ),
+                context=self.get_serializer_context(),
+            )
+        return response
 
     def get_serializer_class(self):
         """ Return the serializer class for request"""
         if self.action == 'list':
             return serializers.ArticleSerializer
+        elif self.action == 'search':
+            return serializers.ArticleSearchSerializer
         elif self.action == 'upload_image':
             return serializers.ArticleImageSerializer
+        elif self.action == 'export':
+            return serializers.ArticleExportSerializer
         return self.serializer_class
 
+    def get_row_serializer(self):
+        """ Return the compiled read serializer of the action or None."""
+        if not self.row_serialization:
+            return None
+        return row_serializer_for(self.get_serializer_class())
+
+    def _list_rows(self, request, *args, **kwargs):
+        reader = self.get_row_serializer()
+        queryset = self._filtered_queryset().order_by(*self.ordering)
+        rows = self.paginate_queryset(reader.values(queryset))
+        if rows is None:
+            rows = reader.values(queryset)
+        data = reader.render(rows, self.get_serializer_context())
+        if self.paginator is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def _retrieve_row(self, request, *args, **kwargs):
+        reader = self.get_row_serializer()
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            reader.values(self._filtered_queryset()),
+            **{self.lookup_field: self.kwargs[lookup]},
+        )
+        self.check_object_permissions(request, row)
+        return Response(
+            reader.render([row], self.get_serializer_context())[0]
+        )
+
+    def _stream_rows(self, request):
+        """ Stream every matching article as one JSON array"""
+        chunks = self.get_row_serializer().stream(
+            self._filtered_queryset().order_by(*self.ordering),
+            self.get_serializer_context(),
+        )
+        return StreamingHttpResponse(
+            stream_json_array(chunks), content_type='application/json',
+        )
+
+    def list(self, request, *args, **kwargs):
+        """ Return a page of articles, from the response cache when fresh"""
+        if self.get_row_serializer() is None:
+            return super().list(request, *args, **kwargs)
+        if request.query_params.get('stream') in ('1', 'true', 'True'):
+            return self._stream_rows(request)
+        return self.cached_response(self._list_rows, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """ Return a article, from the response cache when fresh"""
+        handler = super().retrieve
+        if self.get_row_serializer() is not None:
+            handler = self._retrieve_row
+        return self.cached_response(handler, request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """ create a new article"""
         serializer.save(user=self.request.user)
 
+    def _search_limit(self):
+        maximum = get_search_setting('MAX_RESULTS')
+        try:
+            limit = int(self.request.query_params.get('limit', 20))
+        except ValueError:
+            return 20
+        return max(1, min(limit, maximum))
+
+    def _search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'q': ['This query parameter is required.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        articles = search_articles(
+            self.get_queryset(), query, self._search_limit()
+        )
+        serializer = self.get_serializer(articles, many=True)
+        return Response({'results': serializer.data})
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                required=True,
+                description='Words to search titles and descriptions for',
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Maximum number of results (default 20)',
+            ),
+        ]
+    )
+    @action(methods=['GET'], detail=False, url_path='search')
+    def search(self, request):
+        """ Ranked full-text search over the user's articles"""
+        return self.cached_response(self._search, request)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'format',
+                OpenApiTypes.STR,
+                enum=[*catalog_export.FORMATS],
+                description='ndjson (default) or csv',
+            ),
+            OpenApiParameter(
+                'updated_since',
+                OpenApiTypes.DATETIME,
+                description=(
+                    'Only export articles changed since then, e.g. the '
+                    'X-Export-Started header of the previous export. '
+                    'Deleted articles are not reported, a full export '
+                    'reconciles them'
+                ),
+            ),
+        ]
+    )
+    @action(
+        methods=['GET'], detail=False, url_path='export',
+        renderer_classes=[
+            catalog_export.NDJSONRenderer, catalog_export.CSVRenderer,
+        ],
+    )
+    def export(self, request):
+        """ Stream the user's articles with their relations"""
+        updated_since = request.query_params.get('updated_since')
+        if updated_since:
+            try:
+                updated_since = catalog_export.parse_updated_since(
+                    updated_since
+                )
+            except ValueError:
+                raise ValidationError(
+                    {'updated_since': ['Expected an ISO 8601 date/time.']}
+                )
+        compress = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        renderer = request.accepted_renderer
+        fmt = renderer.format
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        body = catalog_export.ArticleExport(
+            self._filtered_queryset(),
+            fmt,
+            context=self.get_serializer_context(),
+            updated_since=updated_since or None,
+            compress=compress,
+        )
+        response = StreamingHttpResponse(body, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="articles.{fmt}"'
+        )
+        response['X-Export-Started'] = body.started.isoformat()
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """ Upload an image to article"""
@@ -99,13 +346,16 @@ class ArticleViewSet(viewsets.ModelViewSet):
 
 
 
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(CachedResponseMixin,
+                            mixins.DestroyModelMixin,
                             mixins.ListModelMixin,
                             mixins.UpdateModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for article viewsets"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ('-name',)
 
     def get_queryset(self):
         """ Filter queryset to authenticated_user"""
@@ -114,8 +364,11 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(article__isnull=False)
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+            queryset = filtering.linked_to_articles(queryset)
+        queryset = optimize_queryset(queryset, self.get_serializer_class())
+        return queryset.filter(
+            user=self.request.user
+        ).order_by(*self.ordering)
        # return self.queryset.filter(user=self.request.user).order_by('-name').distinct()
 
 @extend_schema_view(
@@ -151,22 +404,28 @@ class AttributeVariantsViewSet(BaseRecipeAttrViewSet):
 
 class ProductFilter(django_filters.FilterSet):
 
-    attributes__name = django_filters.ModelMultipleChoiceFilter(
-        field_name='attributes',
-        lookup_expr='icontains',
-
+    # Served by the trigram index on AttributeVariants.name on PostgreSQL.
+    attributes__name = django_filters.CharFilter(
+        field_name='attributes__name',
+        method='filter_attribute_name',
     )
-   # attributes__name = django_filters.CharFilter(lookup_expr='icontains')
     # Add more filters for other fields if needed
 
     class Meta:
         model = Article
         fields = ['attributes']  # Add more fields for filtering if needed
 
+    def filter_attribute_name(self, queryset, name, value):
+        """ Match attribute names with EXISTS, keeping articles unique"""
+        return queryset.filter(filtering.related_matching(
+            'attributes', name__trigram_contains=value,
+        ))
+
 class ProductListAPIView(BaseRecipeAttrViewSet):
     """ manage category in the database"""
     serializer_class = serializers.ArticleSerializer
     queryset = Article.objects.all()
+    ordering = ('-id',)
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProductFilter
 
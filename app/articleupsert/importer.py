@@ -0,0 +1,375 @@
+"""
+Streaming bulk importer for article feeds.
+
+Rows are read incrementally from a CSV or JSON lines upload, validated,
+and written in chunks. Categories and attribute variants are resolved
+through in-memory name -> id maps that are loaded once per import, so a
+chunk costs a handful of queries no matter how many rows it holds.
+"""
+import codecs
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from article.caching import bump_user_version
+from article.facets import refresh_facet_counts
+from article.search import index_articles
+from core.bulk import bulk_insert, chunked
+from core.models import Article, AttributeVariants, Category
+from articleupsert.serializers import ArticleRowSerializer
+
+SCALAR_FIELDS = [
+    'title', 'short_description', 'price', 'description', 'stock', 'variant',
+]
+LIST_SEPARATOR = '|'
+ATTRIBUTE_SEPARATOR = ':'
+
+
+class ImportFormatError(ValueError):
+    """ The upload can not be parsed in the requested format"""
+
+    def __init__(self, message, line=None):
+        super().__init__(message)
+        self.line = line
+
+
+def iter_csv_rows(fileobj, encoding='utf-8-sig'):
+    """ Yield (line, row, error) for every record of a CSV upload.
+
+    `categories` holds names separated by `|` and `attributes` holds
+    `type:name[:price]` entries separated by `|`.
+    """
+    reader = csv.DictReader(codecs.iterdecode(fileobj, encoding))
+    try:
+        for row in reader:
+            yield reader.line_num, _csv_to_row(row), None
+    except csv.Error as exc:
+        line = reader.line_num
+        raise ImportFormatError(f'line {line}: {exc}', line=line)
+    except UnicodeDecodeError as exc:
+        # Raised reading the next line, before the reader counts it.
+        line = reader.line_num + 1
+        raise ImportFormatError(f'line {line}: {exc}', line=line)
+
+
+def _csv_to_row(record):
+    row = {}
+    for key, value in record.items():
+        if key is None or value is None:
+            continue
+        key = key.strip()
+        if value == '' and key in ('id', 'price', 'variant'):
+            continue
+        if key == 'categories':
+            value = [name.strip() for name in value.split(LIST_SEPARATOR)
+                     if name.strip()]
+        elif key == 'attributes':
+            value = [_csv_attribute(item) for item in value.split(
+                LIST_SEPARATOR) if item.strip()]
+        row[key] = value
+    return row
+
+
+def _csv_attribute(item):
+    parts = [part.strip() for part in item.split(ATTRIBUTE_SEPARATOR)]
+    attribute = {'type': parts[0], 'name': parts[1] if len(parts) > 1 else ''}
+    if len(parts) > 2 and parts[2]:
+        attribute['price'] = parts[2]
+    return attribute
+
+
+def iter_jsonl_rows(fileobj, encoding='utf-8'):
+    """ Yield (line, row, error) for every record of a JSON lines upload."""
+    for line, raw in enumerate(fileobj, start=1):
+        try:
+            raw = raw.decode(encoding) if isinstance(raw, bytes) else raw
+        except UnicodeDecodeError as exc:
+            yield line, None, {'non_field_errors': [str(exc)]}
+            continue
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError as exc:
+            yield line, None, {'non_field_errors': [f'Invalid JSON: {exc}']}
+            continue
+        if not isinstance(row, dict):
+            yield line, None, {'non_field_errors': ['Expected an object.']}
+            continue
+        categories = row.get('categories')
+        if isinstance(categories, list):
+            row['categories'] = [
+                item.get('name') if isinstance(item, dict) else item
+                for item in categories
+            ]
+        yield line, row, None
+
+
+PARSERS = {
+    'csv': iter_csv_rows,
+    'jsonl': iter_jsonl_rows,
+}
+
+
+def _price_key(value):
+    try:
+        return Decimal(value).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError):
+        return Decimal('0.00')
+
+
+class ImportResult:
+    """ Counters and per-row errors of an import run"""
+
+    def __init__(self, max_errors=1000):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+class ArticleImporter:
+    """ Import article rows for a user in chunks.
+
+    Rows carrying an `id` update that article (which must belong to the
+    user), other rows create new articles. When a row lists categories
+    or attributes those relations replace the article's current ones.
+    """
+
+    def __init__(self, user, chunk_size=1000, max_errors=1000):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.result = ImportResult(max_errors=max_errors)
+        self.category_ids = None
+        self.attribute_ids = None
+
+    def run(self, rows):
+        """ Import (line, row, error) tuples and return an ImportResult.
+
+        Chunks are committed as they are written, so an upload that
+        can not be parsed past some line still imports the rows before
+        it; the line is reported as a failed row and reading stops.
+        """
+        self._load_maps()
+        for chunk in chunked(self._until_format_error(rows), self.chunk_size):
+            self._import_chunk(chunk)
+        if self.result.created or self.result.updated:
+            # Through rows are written in bulk, without m2m_changed. The
+            # counts are rebuilt from scratch, once for the whole import.
+            with transaction.atomic():
+                refresh_facet_counts(self.user.pk)
+            bump_user_version(self.user.pk)
+        return self.result
+
+    def _until_format_error(self, rows):
+        try:
+            yield from rows
+        except ImportFormatError as exc:
+            self.result.rows += 1
+            self.result.add_error(exc.line, {'non_field_errors': [
+                f'{exc}. The rest of the file was not imported.'
+            ]})
+
+    def _load_maps(self):
+        self.category_ids = dict(
+            Category.objects.filter(user=self.user).values_list('name', 'id')
+        )
+        self.attribute_ids = {
+            (type_, name, _price_key(price)): pk
+            for pk, type_, name, price in AttributeVariants.objects.filter(
+                user=self.user
+            ).values_list('id', 'type', 'name', 'price')
+        }
+
+    def _validate(self, chunk):
+        valid = []
+        for line, row, error in chunk:
+            self.result.rows += 1
+            if error:
+                self.result.add_error(line, error)
+                continue
+            serializer = ArticleRowSerializer(data=row)
+            if not serializer.is_valid():
+                self.result.add_error(line, serializer.errors)
+                continue
+            valid.append((line, serializer.validated_data))
+        return valid
+
+    def _import_chunk(self, chunk):
+        rows = self._check_owned(self._validate(chunk))
+        if not rows:
+            return
+        try:
+            with transaction.atomic():
+                created, updated = self._write(rows)
+        except DatabaseError as exc:
+            for line, _ in rows:
+                self.result.add_error(line, {'non_field_errors': [str(exc)]})
+            # The maps may reference rows rolled back with the chunk.
+            self._load_maps()
+            return
+        self.result.created += created
+        self.result.updated += updated
+        # Bulk writes send no model signals, invalidate cached reads here.
+        bump_user_version(self.user.pk)
+
+    def _write(self, rows):
+        self._create_missing_categories(rows)
+        self._create_missing_attributes(rows)
+
+        new = [(line, data) for line, data in rows if 'id' not in data]
+        existing = [(line, data) for line, data in rows if 'id' in data]
+
+        articles = bulk_insert(
+            Article,
+            [
+                Article(user=self.user, **self._scalars(data))
+                for _, data in new
+            ],
+            batch_size=self.chunk_size,
+        )
+        self._update_articles(existing)
+
+        pairs = [
+            (article.id, data) for article, (_, data) in zip(articles, new)
+        ]
+        pairs += [(data['id'], data) for _, data in existing]
+        replace = [data['id'] for _, data in existing]
+        self._set_relations(pairs, replace)
+        index_articles([article_id for article_id, _ in pairs])
+        return len(new), len(existing)
+
+    def _check_owned(self, rows):
+        ids = [data['id'] for _, data in rows if 'id' in data]
+        if not ids:
+            return rows
+        owned = set(Article.objects.filter(
+            user=self.user, id__in=ids
+        ).values_list('id', flat=True))
+        checked = []
+        for line, data in rows:
+            if 'id' in data and data['id'] not in owned:
+                self.result.add_error(line, {'id': ['Article not found.']})
+                continue
+            checked.append((line, data))
+        return checked
+
+    def _scalars(self, data):
+        return {field: data[field] for field in SCALAR_FIELDS if field in data}
+
+    def _update_articles(self, rows):
+        # bulk_update skips auto_now, and rows that only relink still
+        # count as changed for incremental exports.
+        now = timezone.now()
+        groups = {}
+        for _, data in rows:
+            fields = tuple(field for field in SCALAR_FIELDS if field in data)
+            groups.setdefault(fields + ('updated_at',), []).append(
+                Article(id=data['id'], updated_at=now, **self._scalars(data))
+            )
+        for fields, objs in groups.items():
+            Article.objects.bulk_update(
+                objs, fields, batch_size=self.chunk_size
+            )
+
+    def _create_missing_categories(self, rows):
+        missing = {
+            name
+            for _, data in rows
+            for name in data.get('categories', [])
+            if name not in self.category_ids
+        }
+        if not missing:
+            return
+        created = bulk_insert(
+            Category,
+            [Category(user=self.user, name=name) for name in sorted(missing)],
+        )
+        self.category_ids.update((obj.name, obj.id) for obj in created)
+
+    def _attribute_key(self, attribute):
+        return (
+            attribute['type'], attribute['name'],
+            _price_key(attribute['price']),
+        )
+
+    def _create_missing_attributes(self, rows):
+        missing = {}
+        for _, data in rows:
+            for attribute in data.get('attributes', []):
+                key = self._attribute_key(attribute)
+                if key not in self.attribute_ids:
+                    missing[key] = attribute
+        if not missing:
+            return
+        created = bulk_insert(
+            AttributeVariants,
+            [
+                AttributeVariants(user=self.user, **attribute)
+                for attribute in missing.values()
+            ],
+        )
+        for key, obj in zip(missing, created):
+            self.attribute_ids[key] = obj.id
+
+    def _set_relations(self, pairs, replace):
+        """ Write the through rows of both M2M relations for pairs."""
+        replace = set(replace)
+        lookups = {
+            'categories': self.category_ids.__getitem__,
+            'attributes': lambda attribute: self.attribute_ids[
+                self._attribute_key(attribute)],
+        }
+        for field_name, lookup in lookups.items():
+            field = Article._meta.get_field(field_name)
+            through = field.remote_field.through
+            source = field.m2m_column_name()
+            target = field.m2m_reverse_name()
+
+            stale = [pk for pk, data in pairs
+                     if field_name in data and pk in replace]
+            if stale:
+                through.objects.filter(**{f'{source}__in': stale}).delete()
+
+            links = {
+                (pk, lookup(item))
+                for pk, data in pairs
+                for item in data.get(field_name, [])
+            }
+            through.objects.bulk_create(
+                [
+                    through(**{source: pk, target: target_id})
+                    for pk, target_id in links
+                ],
+                batch_size=self.chunk_size,
+                ignore_conflicts=True,
+            )
+
+
+def import_articles(user, fileobj, fmt, chunk_size=1000):
+    """ Import an uploaded feed in format fmt for user."""
+    try:
+        parser = PARSERS[fmt]
+    except KeyError:
+        raise ImportFormatError(f'Unsupported format: {fmt}')
+    importer = ArticleImporter(user, chunk_size=chunk_size)
+    return importer.run(parser(fileobj))
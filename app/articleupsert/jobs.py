@@ -0,0 +1,88 @@
+"""
+Article imports run outside the request.
+
+A feed of a million rows takes minutes, longer than the worker timeout
+of the production server, which would kill the request halfway with
+the committed chunks unreported. Uploads of at least ASYNC_MIN_BYTES
+are therefore stored and imported by an ArticleImportJob instead: once
+the upload commits, `manage.py run_import_job` is started in a process
+of its own, outside the worker and its timeout, and records the result
+on the job. Clients poll the job resource for its status and counts.
+"""
+import logging
+import os
+import subprocess
+import sys
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ArticleImportJob
+from articleupsert.importer import PARSERS, ArticleImporter
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC_MIN_BYTES': 1024 * 1024,
+    'DIRECTORY': 'imports',
+}
+
+
+def get_setting(name):
+    """ Return an ARTICLE_IMPORT setting, falling back to the default."""
+    return getattr(settings, 'ARTICLE_IMPORT', {}).get(name, DEFAULTS[name])
+
+
+def runs_as_job(upload):
+    """ Return whether an upload is too large to import in the request."""
+    return upload.size >= get_setting('ASYNC_MIN_BYTES')
+
+
+def create_job(user, upload, fmt):
+    """ Store an upload and start its import once the upload commits."""
+    ext = os.path.splitext(upload.name or '')[1].lower()
+    name = default_storage.save(
+        f'{get_setting("DIRECTORY")}/{uuid.uuid4()}{ext}', upload,
+    )
+    job = ArticleImportJob.objects.create(user=user, format=fmt, file=name)
+    transaction.on_commit(lambda: start(job.pk))
+    return job
+
+
+def start(job_id):
+    """ Run a job in a new process, detached from the calling worker."""
+    subprocess.Popen(
+        [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'),
+            'run_import_job', str(job_id),
+        ],
+        stdin=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def run_job(job_id, chunk_size=1000):
+    """ Import the feed of a queued job, return False if not queued."""
+    claimed = ArticleImportJob.objects.filter(
+        pk=job_id, status=ArticleImportJob.QUEUED,
+    ).update(status=ArticleImportJob.RUNNING, started_at=timezone.now())
+    if not claimed:
+        return False
+    job = ArticleImportJob.objects.select_related('user').get(pk=job_id)
+    importer = ArticleImporter(job.user, chunk_size=chunk_size)
+    job.status = ArticleImportJob.DONE
+    try:
+        with default_storage.open(job.file, 'rb') as fileobj:
+            importer.run(PARSERS[job.format](fileobj))
+    except Exception as exc:
+        logger.exception('Article import %s failed', job_id)
+        job.status = ArticleImportJob.FAILED
+        job.error = str(exc)
+    job.result = importer.result.as_dict()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    default_storage.delete(job.file)
+    return True
@@ -0,0 +1,25 @@
+"""
+Django command running queued article import jobs.
+"""
+from django.core.management.base import BaseCommand
+
+from articleupsert.jobs import run_job
+
+
+class Command(BaseCommand):
+    """ django command importing the feed of ArticleImportJob rows"""
+    help = (
+        'Import the uploaded feed of queued import jobs. Started by the '
+        'import api for large uploads, outside the server workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('job_ids', nargs='+', help='Job ids to run')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for job_id in options['job_ids']:
+            if run_job(job_id, chunk_size=options['chunk_size']):
+                self.stdout.write(f'Import job {job_id} finished.')
+            else:
+                self.stderr.write(f'Import job {job_id} is not queued.')
@@ -0,0 +1,62 @@
+"""
+Serializers validating rows of an article import feed
+"""
+from rest_framework import serializers
+
+from core.models import Article, ArticleImportJob
+
+
+class AttributeRowSerializer(serializers.Serializer):
+    """ Attribute variant of an imported article"""
+    type = serializers.CharField(max_length=32)
+    name = serializers.CharField(max_length=32)
+    price = serializers.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default='0.00',
+    )
+
+
+class ArticleRowSerializer(serializers.Serializer):
+    """ A single article row of an import feed"""
+    id = serializers.IntegerField(min_value=1, required=False)
+    title = serializers.CharField(
+        max_length=255, required=False, allow_blank=True
+    )
+    short_description = serializers.CharField(
+        max_length=255, required=False, allow_blank=True
+    )
+    price = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False
+    )
+    description = serializers.CharField(required=False, allow_blank=True)
+    stock = serializers.CharField(
+        max_length=255, required=False, allow_blank=True
+    )
+    variant = serializers.ChoiceField(
+        choices=Article.VARIANTS, required=False
+    )
+    categories = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+    )
+    attributes = AttributeRowSerializer(many=True, required=False)
+
+    def validate(self, attrs):
+        if 'id' not in attrs and not attrs.get('title'):
+            raise serializers.ValidationError(
+                {'title': 'This field is required for new articles.'}
+            )
+        return attrs
+
+
+class ArticleImportJobSerializer(serializers.ModelSerializer):
+    """ Status and result of an import run outside the request"""
+
+    class Meta:
+        model = ArticleImportJob
+        fields = [
+            'id', 'status', 'format', 'result', 'error', 'created_at',
+            'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
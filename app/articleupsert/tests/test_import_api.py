@@ -0,0 +1,315 @@
+"""
+Test for the article import API.
+"""
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from article.facets import refresh_facet_counts
+from articleupsert.jobs import run_job
+from articleupsert.views import ArticleUpsertView
+from core.models import (
+    Article,
+    ArticleFacetCount,
+    ArticleImportJob,
+    ArticleSearchTerm,
+    AttributeVariants,
+    Category,
+)
+
+IMPORT_URL = reverse('articleupsert:article_upsert')
+
+CSV_HEADER = 'id,title,short_description,price,stock,categories,attributes\n'
+
+
+def csv_upload(*lines, name='feed.csv'):
+    """ Return an uploaded CSV file with the given data lines."""
+    content = CSV_HEADER + ''.join(f'{line}\n' for line in lines)
+    return SimpleUploadedFile(name, content.encode('utf-8'))
+
+
+def jsonl_upload(*rows, name='feed.jsonl'):
+    """ Return an uploaded JSON lines file with the given rows."""
+    content = '\n'.join(
+        row if isinstance(row, str) else json.dumps(row) for row in rows
+    )
+    return SimpleUploadedFile(name, content.encode('utf-8'))
+
+
+class PublicImportAPITests(TestCase):
+    """ Test unauthenticated import requests."""
+
+    def test_auth_required(self):
+        """ Test auth is required to import articles"""
+        res = APIClient().post(IMPORT_URL, {'file': csv_upload()})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateImportAPITests(TestCase):
+    """ Test authenticated import requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _import(self, upload, **params):
+        return self.client.post(
+            IMPORT_URL, {'file': upload, **params}, format='multipart'
+        )
+
+    def test_import_csv_creates_articles(self):
+        """ Test importing a CSV creates articles and their relations"""
+        res = self._import(csv_upload(
+            ',Shirt,Cotton shirt,10.50,3,Men|Summer,Size:M:1.00|Color:Red',
+            ',Hat,Straw hat,4.00,1,Summer,',
+        ))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['failed'], 0)
+        shirt = Article.objects.get(title='Shirt')
+        self.assertEqual(shirt.user, self.user)
+        self.assertEqual(shirt.price, Decimal('10.50'))
+        self.assertEqual(
+            sorted(shirt.categories.values_list('name', flat=True)),
+            ['Men', 'Summer'],
+        )
+        self.assertEqual(shirt.attributes.count(), 2)
+        self.assertEqual(Category.objects.filter(name='Summer').count(), 1)
+
+    def test_import_reuses_existing_categories(self):
+        """ Test existing categories and variants are resolved by name"""
+        category = Category.objects.create(user=self.user, name='Men')
+        variant = AttributeVariants.objects.create(
+            user=self.user, type='Size', name='M', price=Decimal('1.00')
+        )
+
+        self._import(csv_upload(',Shirt,,10.50,3,Men,Size:M:1.00'))
+
+        article = Article.objects.get(title='Shirt')
+        self.assertEqual(list(article.categories.all()), [category])
+        self.assertEqual(list(article.attributes.all()), [variant])
+        self.assertEqual(Category.objects.count(), 1)
+
+    def test_import_jsonl_updates_articles(self):
+        """ Test rows with an id update the existing article"""
+        article = Article.objects.create(user=self.user, title='Old')
+        article.categories.add(
+            Category.objects.create(user=self.user, name='Stale')
+        )
+
+        res = self._import(jsonl_upload(
+            {'id': article.id, 'title': 'New', 'categories': ['Fresh']},
+            {'title': 'Created', 'attributes': [
+                {'type': 'Size', 'name': 'L'},
+            ]},
+        ))
+
+        self.assertEqual(res.data['updated'], 1)
+        self.assertEqual(res.data['created'], 1)
+        article.refresh_from_db()
+        self.assertEqual(article.title, 'New')
+        self.assertEqual(
+            list(article.categories.values_list('name', flat=True)),
+            ['Fresh'],
+        )
+
+    def test_import_updates_search_index(self):
+        """ Test bulk updated articles are found by their new title"""
+        article = Article.objects.create(user=self.user, title='Old')
+
+        self._import(jsonl_upload({'id': article.id, 'title': 'Renamed'}))
+
+        self.assertEqual(
+            list(ArticleSearchTerm.objects.filter(
+                article=article,
+            ).values_list('term', flat=True)),
+            ['renamed'],
+        )
+
+    def test_import_reports_row_errors(self):
+        """ Test invalid rows are reported without failing the import"""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123'
+        )
+        foreign = Article.objects.create(user=other, title='Foreign')
+
+        res = self._import(jsonl_upload(
+            {'title': 'Good'},
+            '{not json',
+            {'title': 'Bad price', 'price': 'abc'},
+            {'id': foreign.id, 'title': 'Stolen'},
+        ))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failed'], 3)
+        self.assertEqual(
+            [error['row'] for error in res.data['errors']], [2, 3, 4]
+        )
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.title, 'Foreign')
+
+    @patch.object(ArticleUpsertView, 'chunk_size', 2)
+    def test_unreadable_line_keeps_committed_chunks(self):
+        """ Test a feed broken after the first chunk reports its rows"""
+        content = CSV_HEADER.encode('utf-8') + (
+            b',a1,,,,,\n,a2,,,,,\n,a3,,,,,\n,\xff,,,,,\n,a5,,,,,\n'
+        )
+
+        res = self._import(SimpleUploadedFile('feed.csv', content))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 3)
+        self.assertEqual(res.data['failed'], 1)
+        self.assertEqual(res.data['rows'], 4)
+        self.assertEqual(res.data['errors'][0]['row'], 5)
+        self.assertIn(
+            'not imported', res.data['errors'][0]['errors'][
+                'non_field_errors'][0],
+        )
+        self.assertEqual(
+            sorted(Article.objects.values_list('title', flat=True)),
+            ['a1', 'a2', 'a3'],
+        )
+
+    @override_settings(ARTICLE_FACETS={'MATERIALIZED': True})
+    @patch.object(ArticleUpsertView, 'chunk_size', 2)
+    def test_facet_counts_refreshed_once(self):
+        """ Test materialized counts are rebuilt once per import"""
+        rows = [{'title': f'a{i}', 'categories': ['Men']} for i in range(5)]
+
+        with patch(
+            'articleupsert.importer.refresh_facet_counts',
+            wraps=refresh_facet_counts,
+        ) as refresh:
+            self._import(jsonl_upload(*rows))
+
+        refresh.assert_called_once_with(self.user.pk)
+        self.assertEqual(
+            ArticleFacetCount.objects.get(user=self.user).count, 5
+        )
+
+    def test_import_queries_do_not_grow_per_row(self):
+        """ Test relations are resolved in batches rather than per row"""
+        Category.objects.create(user=self.user, name='Men')
+        rows = [
+            {'id': Article.objects.create(user=self.user).id,
+             'title': f'a{i}', 'categories': ['Men']}
+            for i in range(20)
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            self._import(jsonl_upload(*rows))
+
+        self.assertLess(len(ctx.captured_queries), 15)
+        self.assertEqual(
+            Article.categories.through.objects.count(), 20
+        )
+
+    def test_feed_format_from_query_string(self):
+        """ Test ?feed_format= overrides the file extension"""
+        upload = SimpleUploadedFile(
+            'feed.txt', json.dumps({'title': 'Query'}).encode('utf-8'),
+        )
+
+        res = self.client.post(
+            f'{IMPORT_URL}?feed_format=jsonl', {'file': upload},
+            format='multipart',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 1)
+        self.assertTrue(Article.objects.filter(title='Query').exists())
+
+    def test_unsupported_format(self):
+        """ Test an unknown feed format is rejected"""
+        res = self._import(SimpleUploadedFile('feed.xml', b'<a/>'))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(ARTICLE_IMPORT={'ASYNC_MIN_BYTES': 1})
+@patch('articleupsert.jobs.subprocess.Popen')
+class ImportJobTests(TestCase):
+    """ Test large feeds are imported by a job outside the request"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _queue(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                IMPORT_URL, {'file': upload}, format='multipart',
+            )
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        job = ArticleImportJob.objects.get(pk=res.data['id'])
+        self.addCleanup(default_storage.delete, job.file)
+        return res, job
+
+    def test_large_upload_starts_job(self, popen):
+        """ Test the upload is stored and a process started for it"""
+        res, job = self._queue(csv_upload(',Job,,,,,'))
+
+        self.assertEqual(res.data['status'], ArticleImportJob.QUEUED)
+        self.assertTrue(res['Location'].endswith(f'/import/{job.pk}'))
+        self.assertFalse(Article.objects.exists())
+        self.assertTrue(default_storage.exists(job.file))
+        command = popen.call_args[0][0]
+        self.assertEqual(command[-2:], ['run_import_job', str(job.pk)])
+
+    def test_job_reports_counts(self, popen):
+        """ Test the job resource holds the result once it ran"""
+        res, job = self._queue(jsonl_upload({'title': 'a'}, {'price': 'x'}))
+
+        call_command('run_import_job', str(job.pk), stdout=io.StringIO())
+        res = self.client.get(res['Location'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], ArticleImportJob.DONE)
+        self.assertEqual(res.data['result']['created'], 1)
+        self.assertEqual(res.data['result']['failed'], 1)
+        self.assertFalse(default_storage.exists(job.file))
+
+    def test_job_runs_once(self, popen):
+        """ Test a job already claimed is not imported again"""
+        _, job = self._queue(jsonl_upload({'title': 'a'}))
+
+        self.assertTrue(run_job(job.pk))
+        self.assertFalse(run_job(job.pk))
+        self.assertEqual(Article.objects.count(), 1)
+
+    def test_jobs_of_other_users_hidden(self, popen):
+        """ Test a user can only read the status of their own jobs"""
+        res, _ = self._queue(jsonl_upload({'title': 'a'}))
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123',
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(res['Location'])
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -7,5 +7,14 @@ from . import views
 app_name = 'articleupsert'
 
 urlpatterns = [
-    path('import', views.article_upsert , name='article_upsert' )
+    path(
+        'import',
+        views.ArticleUpsertView.as_view(),
+        name='article_upsert',
+    ),
+    path(
+        'import/<uuid:pk>',
+        views.ArticleImportJobView.as_view(),
+        name='import_job',
+    ),
 ]
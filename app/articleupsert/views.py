@@ -1,6 +1,113 @@
-from django.shortcuts import render
-from django.http import HttpResponse
+"""
+Views for the article import api
+"""
+import os
 
-def article_upsert(request):
-    """ Article import and update"""
-    return HttpResponse('This is just for view')
\ No newline at end of file
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import generics, status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+
+from user.authentication import CachedTokenAuthentication
+from articleupsert import jobs
+from articleupsert.importer import (
+    PARSERS,
+    ImportFormatError,
+    import_articles,
+)
+from articleupsert.serializers import ArticleImportJobSerializer
+from core.models import ArticleImportJob
+
+EXTENSION_FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+
+class ArticleUpsertView(APIView):
+    """ Bulk create and update articles from a CSV or JSON lines file"""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    chunk_size = 1000
+    # Not `format`, DRF takes ?format= for selecting the renderer.
+    format_param = 'feed_format'
+
+    def get_format(self, request, upload):
+        """ Return the feed format from feed_format or the file extension."""
+        fmt = (
+            request.query_params.get(self.format_param)
+            or request.data.get(self.format_param)
+        )
+        if fmt:
+            return fmt
+        ext = os.path.splitext(upload.name or '')[1].lower()
+        return EXTENSION_FORMATS.get(ext)
+
+    @extend_schema(parameters=[
+        OpenApiParameter(
+            'feed_format',
+            OpenApiTypes.STR,
+            enum=[*PARSERS],
+            description=(
+                'Format of the uploaded feed, taken from the file '
+                'extension by default'
+            ),
+        ),
+    ])
+    def post(self, request):
+        """ Article import and update
+
+        Uploads of at least ARTICLE_IMPORT['ASYNC_MIN_BYTES'] are imported
+        by a job: the response is 202 with the job, its Location reports
+        the status and counts.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'file': ['No file was submitted.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        fmt = self.get_format(request, upload)
+        if fmt not in PARSERS:
+            return Response(
+                {self.format_param: [
+                    f'Expected one of: {", ".join(PARSERS)}.'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if jobs.runs_as_job(upload):
+            job = jobs.create_job(request.user, upload, fmt)
+            return Response(
+                ArticleImportJobSerializer(job).data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Location': reverse(
+                    'articleupsert:import_job', args=[job.pk],
+                    request=request,
+                )},
+            )
+        try:
+            result = import_articles(
+                request.user, upload, fmt, chunk_size=self.chunk_size
+            )
+        except ImportFormatError as exc:
+            return Response(
+                {'file': [str(exc)]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+class ArticleImportJobView(generics.RetrieveAPIView):
+    """ Status and result of an import job of the user"""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = ArticleImportJobSerializer
+
+    def get_queryset(self):
+        return ArticleImportJob.objects.filter(user=self.request.user)
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core.db.lookups import register_lookups
+        register_lookups()
+
+        from core import metrics
+        if metrics.get_setting('ENABLED'):
+            from django.db.backends.signals import connection_created
+            connection_created.connect(metrics.install_query_recorder)
+            metrics.instrument_serializers()
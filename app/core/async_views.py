@@ -0,0 +1,139 @@
+"""
+Async views running sync DRF views in a bounded thread pool.
+
+Django 3.2 has no async ORM, so under ASGI every query has to leave the
+event loop. Django runs each sync view in a thread of its own, as many
+threads (and database connections) as there are requests in flight.
+async_view() hands safe requests to a pool of THREADS threads instead,
+a bound that should not exceed the database connection pool; requests
+beyond it wait in the pool queue without holding a thread or a
+connection while the event loop keeps accepting new ones. Other methods
+run the way Django runs sync views.
+
+Django 3.2's ASGI handler iterates streaming bodies on the event loop,
+where the ORM refuses to run, so streaming responses are written to a
+spooled temporary file in the pool thread and sent from there.
+"""
+import asyncio
+import contextvars
+import functools
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+DEFAULTS = {
+    'THREADS': 10,
+    'SPOOL_MAX_MEMORY': 1024 * 1024,
+    'BASE_URLCONF': 'app.urls',
+}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+READ_SIZE = 64 * 1024
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_setting(name):
+    """ Return an ASYNC_VIEWS setting, falling back to the default."""
+    return getattr(settings, 'ASYNC_VIEWS', {}).get(name, DEFAULTS[name])
+
+
+def executor():
+    """ Return the thread pool of async views, started on first use."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_setting('THREADS'),
+                thread_name_prefix='async-view',
+            )
+        return _executor
+
+
+def shutdown():
+    """ Stop the thread pool once its queued calls are done."""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def _call(func, args, kwargs):
+    # What request_started and request_finished do around sync requests.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """ Await func(*args, **kwargs) run in the pool.
+
+    The call sees the context variables of the caller, like the metrics
+    of the current request.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor(),
+        functools.partial(context.run, _call, func, args, kwargs),
+    )
+
+
+def _read(spool):
+    with spool:
+        yield from iter(functools.partial(spool.read, READ_SIZE), b'')
+
+
+def _spool(chunks):
+    spool = tempfile.SpooledTemporaryFile(
+        max_size=get_setting('SPOOL_MAX_MEMORY'),
+    )
+    for chunk in chunks:
+        spool.write(chunk)
+    spool.seek(0)
+    return _read(spool)
+
+
+def _respond(view, request, args, kwargs):
+    response = view(request, *args, **kwargs)
+    # Render here rather than on the event loop. No middleware of this
+    # project has process_template_response to run before.
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    if response.streaming:
+        response.streaming_content = _spool(response.streaming_content)
+    return response
+
+
+def async_view(view):
+    """ Return an async view serving safe requests of view from the pool."""
+    run_sync = sync_to_async(view)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await run_sync(request, *args, **kwargs)
+        return await run_in_thread(_respond, view, request, args, kwargs)
+    return wrapper
+
+
+def async_urlpatterns(patterns, viewsets):
+    """ Return patterns with the routes of viewsets served by async views."""
+    return [
+        URLPattern(
+            pattern.pattern, async_view(pattern.callback),
+            pattern.default_args, pattern.name,
+        )
+        if getattr(pattern.callback, 'cls', None) in viewsets else pattern
+        for pattern in patterns
+    ]
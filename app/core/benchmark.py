@@ -0,0 +1,235 @@
+"""
+Endpoint benchmarks with query count, latency and memory budgets.
+
+Every scale seeds a catalog with product.seeding inside a transaction
+that is rolled back afterwards, then drives the api through the test
+client with real token authentication. Results can be compared against
+a stored baseline to catch regressions.
+"""
+import io
+import json
+import math
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Article, User
+from product.seeding import PASSWORD, SeedPlan, seed
+
+# Allowed relative growth over the baseline per metric.
+DEFAULT_TOLERANCE = {
+    'queries': 0,
+    'p95_ms': 0.25,
+    'peak_kb': 0.25,
+}
+
+IMPORT_ROWS = 100
+
+
+class BenchmarkError(Exception):
+    """ An endpoint failed while being benchmarked"""
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (120, 40, 40)).save(buffer, 'PNG')
+    buffer.seek(0)
+    buffer.name = 'benchmark.png'
+    return buffer
+
+
+def _feed(rows):
+    lines = ['title,price,categories']
+    lines += [f'Imported {i},9.99,Benchmark|Imported' for i in range(rows)]
+    buffer = io.BytesIO('\n'.join(lines).encode('utf-8'))
+    buffer.name = 'feed.csv'
+    return buffer
+
+
+def article_list(context):
+    return 'get', reverse('article:article-list'), {
+        'data': {'page_size': 100},
+    }
+
+
+def article_detail(context):
+    url = reverse('article:article-detail', args=[context['article_id']])
+    return 'get', url, {}
+
+
+def article_upload_image(context):
+    url = reverse(
+        'article:article-upload-image', args=[context['article_id']]
+    )
+    return 'post', url, {'data': {'image': _png()}, 'format': 'multipart'}
+
+
+def token_create(context):
+    return 'post', reverse('user:token'), {
+        'data': {'email': context['email'], 'password': PASSWORD},
+    }
+
+
+def article_import(context):
+    return 'post', reverse('articleupsert:article_upsert'), {
+        'data': {'file': _feed(IMPORT_ROWS)}, 'format': 'multipart',
+    }
+
+
+SCENARIOS = {
+    'article_list': article_list,
+    'article_detail': article_detail,
+    'article_upload_image': article_upload_image,
+    'token_create': token_create,
+    'article_import': article_import,
+}
+
+
+def percentile(values, fraction):
+    """ Return the nearest-rank percentile of values."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _call(client, scenario, context):
+    method, url, kwargs = scenario(context)
+    response = getattr(client, method)(url, **kwargs)
+    if response.status_code >= 400:
+        raise BenchmarkError(
+            f'{scenario.__name__} returned {response.status_code}: '
+            f'{response.content[:200]!r}'
+        )
+    return response
+
+
+def measure(client, scenario, context, iterations, warmup=1):
+    """ Return latency, query and allocation figures of a scenario."""
+    for _ in range(warmup):
+        _call(client, scenario, context)
+
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            _call(client, scenario, context)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured.captured_queries))
+
+    # Tracing slows everything down, so allocations get their own run.
+    tracemalloc.start()
+    try:
+        _call(client, scenario, context)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_scale(articles, endpoints, iterations, seed_value=0):
+    """ Seed a catalog of articles and benchmark every endpoint."""
+    results = {}
+    with transaction.atomic():
+        plan = SeedPlan(
+            users=1, articles=articles, products=0, seed=seed_value,
+        )
+        seed(plan)
+        user = User.objects.get(pk=plan.bases['users'])
+        token, _ = Token.objects.get_or_create(user=user)
+        context = {
+            'email': user.email,
+            'article_id': Article.objects.filter(user=user).latest('pk').pk,
+        }
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for name in endpoints:
+            results[name] = measure(
+                client, SCENARIOS[name], context, iterations,
+            )
+        transaction.set_rollback(True)
+    return results
+
+
+def run_suite(scales, endpoints=None, iterations=20, cached=False,
+              seed_value=0):
+    """ Benchmark endpoints at every scale and return the report."""
+    endpoints = list(endpoints or SCENARIOS)
+    overrides = {
+        'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+    }
+    if not cached:
+        # Measure the work behind a request, not response cache hits.
+        overrides['RESPONSE_CACHE'] = {
+            **getattr(settings, 'RESPONSE_CACHE', {}), 'TIMEOUT': 0,
+        }
+    report = {
+        'meta': {
+            'vendor': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'iterations': iterations,
+            'cached': cached,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as media:
+        with override_settings(MEDIA_ROOT=media, **overrides):
+            for scale in scales:
+                report['results'][str(scale)] = run_scale(
+                    scale, endpoints, iterations, seed_value,
+                )
+    return report
+
+
+def compare(report, baseline, tolerance=None):
+    """ Return the budget violations of report against baseline."""
+    tolerance = {**DEFAULT_TOLERANCE, **(tolerance or {})}
+    violations = []
+    for scale, endpoints in baseline.get('results', {}).items():
+        for name, budget in endpoints.items():
+            current = report['results'].get(scale, {}).get(name)
+            if current is None:
+                continue
+            for metric, allowed in tolerance.items():
+                if metric not in budget:
+                    continue
+                limit = budget[metric] * (1 + allowed)
+                if current[metric] > limit:
+                    violations.append(
+                        f'{name} at {scale} articles: {metric} '
+                        f'{current[metric]} exceeds {limit:g} '
+                        f'(baseline {budget[metric]})'
+                    )
+    return violations
+
+
+def load(path):
+    with open(path, encoding='utf-8') as fileobj:
+        return json.load(fileobj)
+
+
+def dump(report, path):
+    with open(path, 'w', encoding='utf-8') as fileobj:
+        json.dump(report, fileobj, indent=2, sort_keys=True)
+        fileobj.write('\n')
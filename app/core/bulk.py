@@ -0,0 +1,34 @@
+"""
+Helpers for batched writes.
+"""
+from itertools import islice
+
+from django.db import connections
+
+
+def chunked(iterable, size):
+    """ Yield lists of at most size items from iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bulk_insert(model, objs, batch_size=None):
+    """ Insert objs and make sure every object has its primary key set.
+
+    Backends that can return rows from a bulk insert (postgres) use a
+    single bulk_create, others fall back to one INSERT per object.
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+    manager = model._default_manager
+    features = connections[manager.db].features
+    if features.can_return_rows_from_bulk_insert:
+        return manager.bulk_create(objs, batch_size=batch_size)
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
@@ -0,0 +1,239 @@
+"""
+Django cache backend of a Redis compatible server.
+
+    CACHES = {'default': {
+        'BACKEND': 'core.cache.backend.RedisCache',
+        'LOCATION': 'redis://:password@host:6379/0',
+    }}
+
+LOCATION memory://[name] keeps the entries in a MemoryStore of the
+process instead, shared by every cache with that name. Integers are
+stored as such, so incr() is atomic on the server, other values are
+pickled. Errors of the server are raised, not taken for misses, so an
+unreachable cache fails loudly rather than silently skipping version
+bumps.
+
+Every get() and get_many() counts a hit or a miss under the namespace
+of the key, its part before the first colon (article-api, authtoken).
+cache_stats() returns the counts per cache alias.
+"""
+import pickle
+import threading
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core.cache.memory import get_store
+from core.cache.resp import RedisClient
+
+OTHER_NAMESPACE = 'other'
+
+_clients = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def get_client(location, options=None):
+    """ Return the client of a location, shared by the process."""
+    with _lock:
+        client = _clients.get(location)
+        if client is None:
+            options = options or {}
+            if location.startswith('memory://'):
+                client = get_store(
+                    urlsplit(location).netloc, options.get('MAX_ENTRIES'),
+                )
+            else:
+                client = RedisClient.from_url(
+                    location,
+                    pool_size=options.get('POOL_SIZE'),
+                    socket_timeout=options.get('SOCKET_TIMEOUT'),
+                )
+            _clients[location] = client
+        return client
+
+
+def close_clients():
+    """ Close the idle sockets of every client."""
+    with _lock:
+        clients = list(_clients.values())
+    for client in clients:
+        client.close()
+
+
+class CacheStats:
+    """ Hits and misses per key namespace"""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, hit):
+        namespace = key.split(':', 1)[0] if ':' in key else OTHER_NAMESPACE
+        with self._lock:
+            counts = self._counts.setdefault(namespace, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = {
+                name: tuple(value) for name, value in self._counts.items()
+            }
+        hits = sum(value[0] for value in counts.values())
+        lookups = hits + sum(value[1] for value in counts.values())
+        return {
+            'hits': hits,
+            'misses': lookups - hits,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'namespaces': {
+                name: {'hits': value[0], 'misses': value[1]}
+                for name, value in sorted(counts.items())
+            },
+        }
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+def get_stats(location):
+    """ Return the CacheStats of a location."""
+    with _lock:
+        stats = _stats.get(location)
+        if stats is None:
+            stats = _stats[location] = CacheStats()
+        return stats
+
+
+def cache_stats():
+    """ Return the hit and miss counts of every RedisCache alias."""
+    return {
+        alias: get_stats(config['LOCATION']).snapshot()
+        for alias, config in sorted(settings.CACHES.items())
+        if config.get('BACKEND') == f'{__name__}.RedisCache'
+    }
+
+
+def _dumps(value):
+    if type(value) is int:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(data):
+    try:
+        return int(data)
+    except ValueError:
+        return pickle.loads(data)
+
+
+class RedisCache(BaseCache):
+    """ Cache of a Redis server or, for memory:// locations, a MemoryStore"""
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        location = server if isinstance(server, str) else server[0]
+        self._client = get_client(location, params.get('OPTIONS'))
+        self._stats = get_stats(location)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _milliseconds(self, timeout):
+        """ Return the PX of a timeout, None for no expiry."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(0, int(timeout * 1000))
+
+    def _set_command(self, key, value, timeout, *flags):
+        command = ['SET', key, _dumps(value)]
+        milliseconds = self._milliseconds(timeout)
+        if milliseconds is not None:
+            command += ['PX', milliseconds]
+        return command + list(flags)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if self._milliseconds(timeout) == 0:
+            return not self._client.execute('EXISTS', key)
+        return self._client.execute(
+            *self._set_command(key, value, timeout, 'NX')
+        ) is not None
+
+    def get(self, key, default=None, version=None):
+        data = self._client.execute('GET', self._key(key, version))
+        self._stats.record(key, data is not None)
+        return default if data is None else _loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if self._milliseconds(timeout) == 0:
+            self._client.execute('DEL', key)
+            return
+        self._client.execute(*self._set_command(key, value, timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        milliseconds = self._milliseconds(timeout)
+        if milliseconds is None:
+            exists, _persisted = self._client.pipeline([
+                ('EXISTS', key), ('PERSIST', key),
+            ])
+            return bool(exists)
+        return bool(self._client.execute('PEXPIRE', key, milliseconds))
+
+    def delete(self, key, version=None):
+        return bool(self._client.execute('DEL', self._key(key, version)))
+
+    def has_key(self, key, version=None):
+        return bool(self._client.execute('EXISTS', self._key(key, version)))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._client.execute(
+            'MGET', *(self._key(key, version) for key in keys)
+        )
+        found = {}
+        for key, data in zip(keys, values):
+            self._stats.record(key, data is not None)
+            if data is not None:
+                found[key] = _loads(data)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        if self._milliseconds(timeout) == 0:
+            self.delete_many(data, version)
+            return []
+        self._client.pipeline([
+            self._set_command(self._key(key, version), value, timeout)
+            for key, value in data.items()
+        ])
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._client.execute('DEL', *keys)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        # INCRBY would start a missing key at 0, Django raises instead.
+        if not self._client.execute('EXISTS', key):
+            raise ValueError(f"Key '{key}' not found")
+        return self._client.execute('INCRBY', key, delta)
+
+    def clear(self):
+        self._client.execute('FLUSHDB')
+
+    def close(self, **kwargs):
+        # Sockets are pooled per process, not per request.
+        pass
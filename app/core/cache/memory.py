@@ -0,0 +1,245 @@
+"""
+In-process stand-in for a Redis server.
+
+MemoryStore runs the subset of Redis commands the cache backend sends,
+with the same replies and errors as Redis, on a dict of the process. It
+takes the place of RedisClient for memory:// cache locations, in local
+runs and tests, so both go through the same backend code. Entries past
+max_entries are evicted least recently used first, as Redis does with
+an allkeys-lru policy.
+
+MemoryServer serves a MemoryStore over the Redis protocol, for running
+several processes against a shared cache without a Redis server.
+"""
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+
+from core.cache.resp import (
+    ResponseError,
+    encode_reply,
+    raise_errors,
+    read_reply,
+    to_bytes,
+)
+
+DEFAULTS = {
+    'MAX_ENTRIES': 10000,
+}
+
+COMMANDS = frozenset((
+    'ping', 'auth', 'select', 'get', 'mget', 'set', 'del', 'exists',
+    'incrby', 'pexpire', 'persist', 'pttl', 'dbsize', 'flushdb',
+))
+
+OK = b'OK'
+
+NOT_INTEGER = 'ERR value is not an integer or out of range'
+SYNTAX_ERROR = 'ERR syntax error'
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _integer(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ResponseError(NOT_INTEGER)
+
+
+class MemoryStore:
+    """ Keys and values in a dict, expiring lazily on access"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or DEFAULTS['MAX_ENTRIES']
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, value, expires_at, now):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            for stale in [
+                name for name, (_value, expires) in self._entries.items()
+                if expires is not None and expires <= now
+            ]:
+                del self._entries[stale]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def execute(self, command, *args):
+        """ Run one command, return its reply as RedisClient does."""
+        name = to_bytes(command).decode('ascii', 'replace').lower()
+        if name not in COMMANDS:
+            raise ResponseError(f"ERR unknown command '{name}'")
+        handler = getattr(self, f'_{name}')
+        args = [to_bytes(arg) for arg in args]
+        with self._lock:
+            try:
+                return handler(time.monotonic(), *args)
+            except TypeError:
+                raise ResponseError(
+                    f"ERR wrong number of arguments for '{name}' command"
+                )
+
+    def pipeline(self, commands):
+        """ Run commands in order, return their replies."""
+        replies = []
+        for command in commands:
+            try:
+                replies.append(self.execute(*command))
+            except ResponseError as error:
+                replies.append(error)
+        return raise_errors(replies)
+
+    def close(self):
+        pass
+
+    def _ping(self, now):
+        return b'PONG'
+
+    def _auth(self, now, *args):
+        return OK
+
+    def _select(self, now, db):
+        return OK
+
+    def _get(self, now, key):
+        entry = self._live(key, now)
+        return None if entry is None else entry[0]
+
+    def _mget(self, now, *keys):
+        return [self._get(now, key) for key in keys]
+
+    def _set(self, now, key, value, *options):
+        expires_at = None
+        condition = None
+        options = [option.upper() for option in options]
+        while options:
+            option = options.pop(0)
+            if option in (b'NX', b'XX'):
+                condition = option
+            elif option in (b'PX', b'EX') and options:
+                amount = _integer(options.pop(0))
+                if amount <= 0:
+                    raise ResponseError(
+                        "ERR invalid expire time in 'set' command"
+                    )
+                expires_at = now + (
+                    amount / 1000 if option == b'PX' else amount
+                )
+            else:
+                raise ResponseError(SYNTAX_ERROR)
+        exists = self._live(key, now) is not None
+        if (condition == b'NX' and exists) or (
+                condition == b'XX' and not exists):
+            return None
+        self._store(key, value, expires_at, now)
+        return OK
+
+    def _del(self, now, *keys):
+        deleted = 0
+        for key in keys:
+            if self._live(key, now) is not None:
+                del self._entries[key]
+                deleted += 1
+        return deleted
+
+    def _exists(self, now, *keys):
+        return sum(self._live(key, now) is not None for key in keys)
+
+    def _incrby(self, now, key, increment):
+        entry = self._live(key, now)
+        value, expires_at = entry if entry is not None else (b'0', None)
+        value = _integer(value) + _integer(increment)
+        self._store(key, b'%d' % value, expires_at, now)
+        return value
+
+    def _pexpire(self, now, key, milliseconds):
+        entry = self._live(key, now)
+        if entry is None:
+            return 0
+        milliseconds = _integer(milliseconds)
+        if milliseconds <= 0:
+            del self._entries[key]
+        else:
+            self._entries[key] = (entry[0], now + milliseconds / 1000)
+        return 1
+
+    def _persist(self, now, key):
+        entry = self._live(key, now)
+        if entry is None or entry[1] is None:
+            return 0
+        self._entries[key] = (entry[0], None)
+        return 1
+
+    def _pttl(self, now, key):
+        entry = self._live(key, now)
+        if entry is None:
+            return -2
+        if entry[1] is None:
+            return -1
+        return int((entry[1] - now) * 1000)
+
+    def _dbsize(self, now):
+        return sum(
+            expires is None or expires > now
+            for _value, expires in self._entries.values()
+        )
+
+    def _flushdb(self, now, *args):
+        self._entries.clear()
+        return OK
+
+
+def get_store(name='', max_entries=None):
+    """ Return the store of a memory:// location, shared in the process."""
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None:
+            store = _stores[name] = MemoryStore(max_entries)
+        return store
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, ValueError):
+                return
+            try:
+                if not isinstance(command, list) or not command:
+                    raise ResponseError('ERR Protocol error')
+                reply = self.server.store.execute(*command)
+            except ResponseError as error:
+                reply = error
+            self.wfile.write(encode_reply(reply))
+
+
+class MemoryServer(socketserver.ThreadingTCPServer):
+    """ Redis protocol server of a MemoryStore, a thread per client
+
+        server = MemoryServer(('127.0.0.1', 6379))
+        server.serve_forever()
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, store=None):
+        self.store = store or MemoryStore()
+        super().__init__(address, _RespHandler)
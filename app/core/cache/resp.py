@@ -0,0 +1,225 @@
+"""
+Redis protocol (RESP) client.
+
+RedisClient sends commands to a Redis compatible server over a pool of
+sockets kept per process. pipeline() writes several commands at once
+and reads their replies in order, one round trip for all of them. Idle
+sockets inherited across a fork are dropped rather than shared with the
+parent. A command failing on a reused socket, which the server may have
+closed while idle, is sent again on another one.
+"""
+import os
+import socket
+import threading
+from urllib.parse import unquote, urlsplit
+
+DEFAULTS = {
+    'POOL_SIZE': 10,
+    'SOCKET_TIMEOUT': 1.0,
+}
+
+DEFAULT_PORT = 6379
+
+CRLF = b'\r\n'
+
+
+class ResponseError(Exception):
+    """ An error reply of the server"""
+
+
+def to_bytes(value):
+    """ Return a command argument as the bytes Redis receives."""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, (int, float)):
+        return repr(value).encode('ascii')
+    raise TypeError(f'Cannot send {type(value).__name__} to the cache.')
+
+
+def encode_command(*args):
+    """ Return a command as a RESP array of bulk strings."""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        arg = to_bytes(arg)
+        parts += [b'$%d\r\n' % len(arg), arg, CRLF]
+    return b''.join(parts)
+
+
+def encode_reply(reply):
+    """ Return a reply in RESP, as a server sends it."""
+    if isinstance(reply, ResponseError):
+        return b'-%s\r\n' % str(reply).encode('utf-8')
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, list):
+        return b''.join(
+            [b'*%d\r\n' % len(reply)] + [encode_reply(item) for item in reply]
+        )
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+def read_reply(stream):
+    """ Read one RESP value from a binary file object.
+
+    Error replies are returned, not raised, so the replies following
+    them in a pipeline are still read.
+    """
+    line = stream.readline()
+    if not line.endswith(CRLF):
+        raise ConnectionError('Connection closed by the cache server.')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest
+    if kind == b'-':
+        return ResponseError(rest.decode('utf-8', 'replace'))
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        size = int(rest)
+        if size < 0:
+            return None
+        data = stream.read(size + 2)
+        if len(data) != size + 2:
+            raise ConnectionError('Connection closed by the cache server.')
+        return data[:-2]
+    if kind == b'*':
+        size = int(rest)
+        if size < 0:
+            return None
+        return [read_reply(stream) for _ in range(size)]
+    raise ConnectionError(f'Unexpected reply from the cache server: {line!r}')
+
+
+def raise_errors(replies):
+    """ Return replies, raising the first error among them."""
+    for reply in replies:
+        if isinstance(reply, ResponseError):
+            raise reply
+    return replies
+
+
+class Connection:
+    """ One socket to the server, authenticated and on its database"""
+
+    def __init__(self, host, port, db=0, password=None, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+        setup = []
+        if password:
+            setup.append(('AUTH', password))
+        if db:
+            setup.append(('SELECT', db))
+        if setup:
+            raise_errors(self.send(setup))
+
+    def send(self, commands):
+        self.sock.sendall(b''.join(encode_command(*c) for c in commands))
+        return [read_reply(self.stream) for _ in commands]
+
+    def close(self):
+        try:
+            self.stream.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisClient:
+    """ Client of one Redis server with a per process socket pool.
+
+    Sockets are opened on demand, at most pool_size idle ones are kept.
+    """
+
+    def __init__(self, host='localhost', port=DEFAULT_PORT, db=0,
+                 password=None, pool_size=None, socket_timeout=None):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.pool_size = pool_size or DEFAULTS['POOL_SIZE']
+        self.socket_timeout = (
+            DEFAULTS['SOCKET_TIMEOUT']
+            if socket_timeout is None else socket_timeout
+        )
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """ Return a client of redis://[:password@]host[:port][/db]."""
+        parts = urlsplit(url)
+        if parts.scheme != 'redis':
+            raise ValueError(f'Not a redis:// URL: {url}')
+        db = parts.path.strip('/')
+        return cls(
+            host=parts.hostname or 'localhost',
+            port=parts.port or DEFAULT_PORT,
+            db=int(db) if db else 0,
+            password=unquote(parts.password) if parts.password else None,
+            **kwargs,
+        )
+
+    def _connect(self):
+        try:
+            return Connection(
+                self.host, self.port, self.db, self.password,
+                self.socket_timeout,
+            )
+        except OSError as error:
+            raise ConnectionError(
+                f'Cache server {self.host}:{self.port} unreachable: {error}'
+            ) from error
+
+    def _checkout(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Sockets of the parent process, never share them.
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def _checkin(self, connection):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def pipeline(self, commands):
+        """ Send commands in one round trip, return their replies.
+
+        Raises the first error reply once every reply is read.
+        """
+        connection, reused = self._checkout()
+        try:
+            replies = connection.send(commands)
+        except OSError as error:
+            connection.close()
+            # A timed out command may have run, only a closed socket is
+            # known not to have sent it.
+            if not reused or isinstance(error, socket.timeout):
+                raise ConnectionError(
+                    f'Cache server {self.host}:{self.port} failed: {error}'
+                ) from error
+            return self.pipeline(commands)
+        self._checkin(connection)
+        return raise_errors(replies)
+
+    def execute(self, *args):
+        """ Send one command, return its reply."""
+        return self.pipeline([args])[0]
+
+    def close(self):
+        """ Close the idle sockets."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
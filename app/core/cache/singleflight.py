@@ -0,0 +1,79 @@
+"""
+Single-flight recompute of missing cache entries.
+
+When a popular entry expires or its version is bumped, every request
+missing it would recompute it at once (a cache stampede). get_or_compute()
+lets the first one take a lock key with add(), atomic on the cache
+server, and compute; the others, in any thread or process, poll the
+cache for its result instead. A waiter that sees no result within
+WAIT_TIMEOUT, or sees the lock released without one, computes itself.
+The lock expires after LOCK_TIMEOUT should its holder die.
+"""
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from core.cache.versions import get_cache, get_setting
+
+POLL_INTERVAL = 0.01
+MAX_POLL_INTERVAL = 0.2
+
+LOCK_SUFFIX = ':lock'
+
+_counters = {'computes': 0, 'waits': 0, 'wait_timeouts': 0}
+_lock = threading.Lock()
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def stats():
+    """ Return how often entries were computed and waited for."""
+    with _lock:
+        return dict(_counters)
+
+
+def _compute(key, compute, timeout, cache):
+    _count('computes')
+    value = compute()
+    if value is not None:
+        cache.set(key, value, timeout)
+    return value
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT, cache=None):
+    """ Return the cached value of key, computing it once if missing.
+
+    compute() returning None is not cached, the caller gets None.
+    """
+    cache = cache or get_cache()
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f'{key}{LOCK_SUFFIX}'
+    if cache.add(lock_key, 1, get_setting('LOCK_TIMEOUT')):
+        try:
+            return _compute(key, compute, timeout, cache)
+        finally:
+            cache.delete(lock_key)
+
+    _count('waits')
+    interval = POLL_INTERVAL
+    deadline = time.monotonic() + get_setting('WAIT_TIMEOUT')
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+        # Look before getting, polls are not misses of the hit ratio.
+        if key in cache:
+            value = cache.get(key)
+            if value is not None:
+                return value
+        if lock_key not in cache:
+            break
+    else:
+        _count('wait_timeouts')
+    return _compute(key, compute, timeout, cache)
@@ -0,0 +1,49 @@
+"""
+Versioned cache keys.
+
+A version is a counter in the cache that keys embed. Bumping it moves
+every reader to new keys at once, without tracking the old ones, which
+expire on their own. A lost counter restarts from the clock so it never
+goes back to a version already used.
+
+The article response cache keeps one per user (article.caching), the
+token cache a revocation version per user (user.authentication).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'LOCK_TIMEOUT': 10,
+    'WAIT_TIMEOUT': 5,
+}
+
+
+def get_setting(name):
+    """ Return a CACHE_LAYER setting, falling back to the default."""
+    return getattr(settings, 'CACHE_LAYER', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[get_setting('ALIAS')]
+
+
+def get_version(key, cache=None):
+    """ Return the version stored at key, starting it if missing."""
+    cache = cache or get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key, cache=None):
+    """ Move the version stored at key on."""
+    cache = cache or get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
@@ -0,0 +1,102 @@
+"""
+PostgreSQL backend that checks connections out of an in-process pool.
+
+Configure it with ENGINE 'core.db.backends.pooled_postgresql' and an
+optional POOL dict (MIN_SIZE, MAX_SIZE, TIMEOUT, HEALTH_CHECK_INTERVAL,
+MAX_LIFETIME) in the database settings. Keep CONN_MAX_AGE at 0: closing
+the connection at the end of a request hands it back to the pool.
+"""
+import psycopg2.extras
+from psycopg2 import extensions
+from django.db import OperationalError
+from django.db.backends.postgresql import base, creation
+
+from core.db.pool import ConnectionPool, PoolTimeout, close_pool, get_pool
+
+
+def _connect(conn_params, options):
+    """ Open a psycopg2 connection the way the postgresql backend does."""
+    connection = base.Database.connect(**conn_params)
+    isolation_level = options.get('isolation_level')
+    if (isolation_level is not None
+            and isolation_level != connection.isolation_level):
+        connection.set_session(isolation_level=isolation_level)
+    psycopg2.extras.register_default_jsonb(
+        conn_or_curs=connection, loads=lambda x: x
+    )
+    return connection
+
+
+def _check(connection):
+    """ Raise when a pooled connection is no longer usable."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    if not connection.autocommit:
+        connection.rollback()
+
+
+def _reset(connection):
+    """ Roll back whatever a returned connection left open."""
+    status = connection.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        raise OperationalError('Connection is broken')
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep DROP DATABASE from running.
+        close_pool(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params=None):
+        if conn_params is None:
+            conn_params = self.get_connection_params()
+        options = self.settings_dict['OPTIONS']
+        config = {
+            key.lower(): value
+            for key, value in self.settings_dict.get('POOL', {}).items()
+        }
+
+        def factory():
+            return ConnectionPool(
+                lambda: _connect(conn_params, options),
+                check=_check,
+                reset=_reset,
+                **config,
+            )
+        return get_pool(self.alias, factory, params=conn_params)
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        try:
+            connection = pool.getconn()
+        except PoolTimeout as exc:
+            raise OperationalError(str(exc)) from exc
+        self._pool = pool
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool, self._pool = getattr(self, '_pool', None), None
+        if pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+
+    def warm_pool(self):
+        """ Open the configured minimum number of connections."""
+        self.get_pool().fill()
+
+    def pool_stats(self):
+        return self.get_pool().stats()
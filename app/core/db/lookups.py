@@ -0,0 +1,30 @@
+"""
+Lookups that can be served by trigram indexes on PostgreSQL.
+"""
+from django.db.models import CharField, TextField
+from django.db.models.lookups import IContains
+
+
+class TrigramContains(IContains):
+    """ Case-insensitive containment served by a gin_trgm_ops index.
+
+    icontains compiles to UPPER(col) LIKE UPPER(%s) on PostgreSQL, which
+    a trigram index on the plain column cannot serve. This lookup emits
+    col ILIKE %s there and behaves exactly like icontains elsewhere.
+    """
+    lookup_name = 'trigram_contains'
+
+    def as_sql(self, compiler, connection):
+        return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        if not self.rhs_is_direct_value() or self.bilateral_transforms:
+            return self.as_sql(compiler, connection)
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs_sql} ILIKE {rhs_sql}', lhs_params + rhs_params
+
+
+def register_lookups():
+    CharField.register_lookup(TrigramContains)
+    TextField.register_lookup(TrigramContains)
@@ -0,0 +1,26 @@
+"""
+Migration operations for database specific schema.
+"""
+from django.db import migrations
+
+
+class RunPostgreSQL(migrations.RunSQL):
+    """ RunSQL that only runs against PostgreSQL databases.
+
+    Used for triggers and index types other backends (SQLite in tests)
+    do not support. Like RunSQL it does not change the model state.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
@@ -0,0 +1,229 @@
+"""
+In-process database connection pool.
+"""
+import os
+import threading
+import time
+
+DEFAULTS = {
+    'MIN_SIZE': 1,
+    'MAX_SIZE': 10,
+    'TIMEOUT': 10,
+    'HEALTH_CHECK_INTERVAL': 30,
+    'MAX_LIFETIME': 3600,
+}
+
+
+class PoolTimeout(Exception):
+    """ No connection became available within the pool timeout"""
+
+
+class ConnectionPool:
+    """ A bounded pool of raw DB-API connections.
+
+    connect() opens a new connection, check(conn) raises when a pooled
+    connection is no longer usable and reset(conn) returns a connection
+    to a clean state before it goes back to the pool. Connections idle
+    for longer than health_check_interval are checked before reuse.
+    """
+
+    def __init__(self, connect, check=None, reset=None, min_size=None,
+                 max_size=None, timeout=None, health_check_interval=None,
+                 max_lifetime=None):
+        self.connect = connect
+        self.check = check
+        self.reset = reset
+        self.min_size = DEFAULTS['MIN_SIZE'] if min_size is None else min_size
+        self.max_size = max_size or DEFAULTS['MAX_SIZE']
+        self.timeout = DEFAULTS['TIMEOUT'] if timeout is None else timeout
+        self.health_check_interval = (
+            DEFAULTS['HEALTH_CHECK_INTERVAL']
+            if health_check_interval is None else health_check_interval
+        )
+        self.max_lifetime = (
+            DEFAULTS['MAX_LIFETIME'] if max_lifetime is None else max_lifetime
+        )
+        self.params = None
+        self.closed = False
+        self._idle = []
+        self._created_at = {}
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self.stats_counters = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'health_checks': 0,
+        }
+
+    @property
+    def size(self):
+        return len(self._idle) + self._in_use
+
+    def getconn(self):
+        """ Check a connection out of the pool, waiting up to timeout."""
+        started = time.monotonic()
+        waited = False
+        with self._condition:
+            while not self._idle and self.size >= self.max_size:
+                waited = True
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    if not self._idle and self.size >= self.max_size:
+                        self.stats_counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No connection available within {self.timeout}s '
+                            f'(max_size={self.max_size})'
+                        )
+            entry = self._idle.pop() if self._idle else None
+            self._in_use += 1
+            self._record_checkout(started, waited)
+
+        try:
+            return self._prepare(entry)
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def _record_checkout(self, started, waited):
+        counters = self.stats_counters
+        counters['checkouts'] += 1
+        if waited:
+            wait = time.monotonic() - started
+            counters['waits'] += 1
+            counters['wait_seconds'] += wait
+            counters['max_wait_seconds'] = max(
+                counters['max_wait_seconds'], wait
+            )
+
+    def _prepare(self, entry):
+        """ Return a usable connection for an idle entry (or a new one)."""
+        if entry is not None:
+            conn, idle_since = entry
+            if self._expired(conn):
+                self._discard(conn)
+            elif (self.check is not None and
+                  time.monotonic() - idle_since >= self.health_check_interval):
+                self.stats_counters['health_checks'] += 1
+                try:
+                    self.check(conn)
+                    return conn
+                except Exception:
+                    self._discard(conn)
+            else:
+                return conn
+        conn = self.connect()
+        self._created_at[id(conn)] = time.monotonic()
+        self.stats_counters['created'] += 1
+        return conn
+
+    def _expired(self, conn):
+        created = self._created_at.get(id(conn))
+        return (self.max_lifetime and created is not None
+                and time.monotonic() - created > self.max_lifetime)
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        self.stats_counters['discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def putconn(self, conn, discard=False):
+        """ Return a connection to the pool."""
+        if not discard and self.reset is not None:
+            try:
+                self.reset(conn)
+            except Exception:
+                discard = True
+        if (discard or self.closed or getattr(conn, 'closed', False)
+                or self._expired(conn)):
+            self._discard(conn)
+            conn = None
+        with self._condition:
+            self._in_use -= 1
+            if conn is not None:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def fill(self):
+        """ Open connections until the pool holds min_size of them."""
+        while True:
+            with self._condition:
+                if self.size >= self.min_size:
+                    return
+                self._in_use += 1
+            try:
+                conn = self._prepare(None)
+            except Exception:
+                with self._condition:
+                    self._in_use -= 1
+                raise
+            self.putconn(conn)
+
+    def close(self):
+        """ Close every idle connection and refuse returned ones."""
+        with self._condition:
+            self.closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._condition:
+            return {
+                **self.stats_counters,
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'max_size': self.max_size,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, factory, params=None):
+    """ Return the pool of a database alias for the current process.
+
+    factory() builds the pool the first time. A pool created for other
+    connection params (e.g. before the test database was set up) is
+    closed and replaced; pools are never shared with forked children.
+    """
+    key = (alias, os.getpid())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None and pool.params != params:
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = _pools[key] = factory()
+            pool.params = params
+        return pool
+
+
+def close_pool(alias):
+    """ Close the idle connections of an alias and forget its pool."""
+    with _pools_lock:
+        pool = _pools.pop((alias, os.getpid()), None)
+    if pool is not None:
+        pool.close()
+
+
+def pool_stats():
+    """ Return the stats of every pool of the current process."""
+    pid = os.getpid()
+    with _pools_lock:
+        pools = {
+            alias: pool for (alias, owner), pool in _pools.items()
+            if owner == pid
+        }
+    return {alias: pool.stats() for alias, pool in pools.items()}
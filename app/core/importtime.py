@@ -0,0 +1,143 @@
+"""
+Import time profile of process startup.
+
+profile_startup() boots a fresh interpreter under `python -X importtime`
+the way a worker does (django.setup(), then the URLconf and optionally
+the prefork warm-up) with a given settings module, and reads back the
+self and cumulative import time of every module and which module first
+imported it. Wall times are the median of several boots, the first of
+which also warms the bytecode cache.
+
+CPython does not time modules loaded with importlib.import_module, as
+Django loads apps, models modules and URLconfs; the imports those make
+are listed without an importer.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+
+BOOT_SCRIPT = '''
+import sys
+import time
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+if {urls}:
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+if {warm_up}:
+    from core.prefork import warm_up
+    warm_up()
+sys.stdout.write('%f %f' % (setup - started, time.perf_counter() - started))
+'''
+
+PREFIX = 'import time:'
+
+
+class StartupError(Exception):
+    """ The profiled interpreter failed to boot"""
+
+
+class Module:
+    """ Import cost of one module in microseconds"""
+
+    __slots__ = ('name', 'self_us', 'cumulative_us', 'imported_by')
+
+    def __init__(self, name, self_us, cumulative_us, imported_by=None):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.imported_by = imported_by
+
+    @property
+    def package(self):
+        return self.name.split('.')[0]
+
+    def as_dict(self):
+        return {
+            'module': self.name,
+            'self_ms': round(self.self_us / 1000, 3),
+            'cumulative_ms': round(self.cumulative_us / 1000, 3),
+            'imported_by': self.imported_by,
+        }
+
+
+def parse_importtime(output):
+    """ Return the Modules of -X importtime output, in import order."""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith(PREFIX):
+            continue
+        fields = line[len(PREFIX):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The header line.
+        raw = fields[2].rstrip()
+        depth = len(raw) - len(raw.lstrip())
+        entries.append(
+            (depth, Module(raw.strip(), int(fields[0]), int(fields[1])))
+        )
+    # A module is listed after the ones it imported, so its importer is
+    # the next entry nested less deep.
+    parents = {}
+    for depth, module in reversed(entries):
+        module.imported_by = next(
+            (parents[level] for level in range(depth - 1, -1, -1)
+             if level in parents), None,
+        )
+        parents[depth] = module.name
+        for level in [level for level in parents if level > depth]:
+            del parents[level]
+    return [module for depth, module in entries]
+
+
+def by_package(modules):
+    """ Return [(package, self us, module count)], most expensive first."""
+    packages = {}
+    for module in modules:
+        total, count = packages.get(module.package, (0, 0))
+        packages[module.package] = (total + module.self_us, count + 1)
+    return sorted(
+        ((name, total, count) for name, (total, count) in packages.items()),
+        key=lambda item: -item[1],
+    )
+
+
+def _boot(settings_module, urls, warm_up, importtime):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module}
+    env.pop('DJANGO_ROOT_URLCONF', None)
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', BOOT_SCRIPT.format(urls=urls, warm_up=warm_up)]
+    result = subprocess.run(
+        command, cwd=settings.BASE_DIR, env=env, capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise StartupError(
+            f'{settings_module} failed to boot:\n{result.stderr[-2000:]}'
+        )
+    setup, boot = (float(value) for value in result.stdout.split()[-2:])
+    return setup, boot, result.stderr
+
+
+def profile_startup(settings_module, urls=True, warm_up=False, repeat=3):
+    """ Return the startup profile of a settings module."""
+    setups, boots = [], []
+    for _ in range(max(1, repeat)):
+        setup, boot, _stderr = _boot(settings_module, urls, warm_up, False)
+        setups.append(setup)
+        boots.append(boot)
+    stderr = _boot(settings_module, urls, warm_up, True)[2]
+    modules = parse_importtime(stderr)
+    return {
+        'settings': settings_module,
+        'setup_ms': round(statistics.median(setups) * 1000, 1),
+        'boot_ms': round(statistics.median(boots) * 1000, 1),
+        'import_ms': round(sum(m.self_us for m in modules) / 1000, 1),
+        'modules': modules,
+    }
@@ -0,0 +1,236 @@
+"""
+Concurrency benchmark of the WSGI and ASGI deployments.
+
+run_load() keeps a number of HTTP/1.1 keep-alive clients busy against a
+running server for a fixed duration, cycling through a list of paths,
+and reports requests per second, latency percentiles and errors. The
+client is plain asyncio streams so a single process can hold a thousand
+connections; on a small host it can become the bottleneck itself, so
+compare servers on the same machine and watch the client CPU.
+
+serve() starts gunicorn with the WSGI (sync or gthread workers) or the
+ASGI (uvicorn workers) application of this project for the duration of
+a benchmark.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from core import prefork
+from core.benchmark import percentile
+
+WSGI = 'wsgi'
+ASGI = 'asgi'
+SERVERS = (WSGI, ASGI)
+
+DEFAULT_CONCURRENCY = (100, 250, 500, 1000)
+
+STARTUP_TIMEOUT = 30
+
+
+class LoadTestError(Exception):
+    """ A server could not be started or reached"""
+
+
+def parse_url(url):
+    """ Return (host, port) of an http:// base url."""
+    parts = urlsplit(url)
+    if parts.scheme != 'http' or not parts.hostname:
+        raise LoadTestError(f'Expected an http:// url, got {url!r}')
+    return parts.hostname, parts.port or 80
+
+
+async def _read_body(reader, headers):
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        size = 0
+        while True:
+            length = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(length + 2)
+            size += length
+            if not length:
+                return size
+    if 'content-length' in headers:
+        length = int(headers['content-length'])
+        await reader.readexactly(length)
+        return length
+    return len(await reader.read())
+
+
+async def read_response(reader):
+    """ Return (status, body size, keep alive) of the next response."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by the server')
+    version, status = status_line.split()[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    size = await _read_body(reader, headers)
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' and (
+        version == b'HTTP/1.1' or connection == 'keep-alive'
+    )
+    if 'content-length' not in headers and 'transfer-encoding' not in headers:
+        keep_alive = False
+    return int(status), size, keep_alive
+
+
+def _request(host, port, path, headers):
+    lines = [f'GET {path} HTTP/1.1', f'Host: {host}:{port}']
+    lines.extend(f'{name}: {value}' for name, value in headers.items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+class _Stats:
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.reconnects = 0
+        self.bytes = 0
+
+
+async def _client(host, port, requests, deadline, timeout, stats, offset):
+    connection = None
+    index = offset
+    while time.perf_counter() < deadline:
+        request = requests[index % len(requests)]
+        index += 1
+        reused = connection is not None
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(
+                    asyncio.open_connection(host, port), timeout,
+                )
+            reader, writer = connection
+            writer.write(request)
+            status, size, keep_alive = await asyncio.wait_for(
+                read_response(reader), timeout,
+            )
+        except ConnectionError:
+            # Keep-alive connections closed by the server, like workers
+            # recycled after max_requests, are reopened as clients do.
+            if reused:
+                stats.reconnects += 1
+            else:
+                stats.errors += 1
+            keep_alive = False
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                ValueError):
+            stats.errors += 1
+            keep_alive = False
+        else:
+            stats.latencies.append(time.perf_counter() - started)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.bytes += size
+        if not keep_alive and connection is not None:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def run_load(url, paths, concurrency, duration, headers=None,
+                   timeout=30):
+    """ Return the figures of concurrency clients requesting paths."""
+    host, port = parse_url(url)
+    requests = [_request(host, port, path, headers or {}) for path in paths]
+    stats = _Stats()
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _client(host, port, requests, deadline, timeout, stats, n)
+        for n in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    latencies = stats.latencies or [0.0]
+    return {
+        'concurrency': concurrency,
+        'requests': len(stats.latencies),
+        'errors': stats.errors,
+        'reconnects': stats.reconnects,
+        'non_2xx': sum(
+            count for status, count in stats.statuses.items()
+            if not 200 <= status < 300
+        ),
+        'rps': round(len(stats.latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'bytes': stats.bytes,
+    }
+
+
+def run(url, paths, concurrency, duration, headers=None, timeout=30):
+    return asyncio.run(
+        run_load(url, paths, concurrency, duration, headers, timeout)
+    )
+
+
+def _wait_for_port(host, port, process):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise LoadTestError(
+                f'Server exited with status {process.returncode}'
+            )
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise LoadTestError(f'Server not listening on {host}:{port}')
+
+
+def server_command(kind, port, workers, threads=1):
+    """ Return the gunicorn command line serving kind on port."""
+    if kind not in SERVERS:
+        raise LoadTestError(f'Expected one of: {", ".join(SERVERS)}.')
+    command = prefork.gunicorn_command(kind) + [
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers),
+    ]
+    if kind == WSGI:
+        command += ['--worker-class', 'gthread' if threads > 1 else 'sync']
+        command += ['--threads', str(threads)]
+    return command
+
+
+@contextmanager
+def serve(kind, port, workers, threads=1):
+    """ Run a gunicorn server of kind on port, yields its base url."""
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'app.settings'
+        ),
+        'GUNICORN_ACCESS_LOG': '',
+    }
+    # Each server picks its own URLconf (app.asgi selects the async one).
+    env.pop('DJANGO_ROOT_URLCONF', None)
+    process = subprocess.Popen(
+        server_command(kind, port, workers, threads),
+        cwd=settings.BASE_DIR, env=env,
+    )
+    try:
+        _wait_for_port('127.0.0.1', port, process)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=STARTUP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
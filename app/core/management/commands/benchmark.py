@@ -0,0 +1,100 @@
+"""
+Django command benchmarking the api endpoints.
+"""
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import SCENARIOS, compare, dump, load, run_suite
+
+
+def _ints(value):
+    return [int(part) for part in value.split(',') if part]
+
+
+class Command(BaseCommand):
+    """ django command running the endpoint benchmark suite"""
+    help = (
+        'Seed catalogs of several sizes (rolled back afterwards) and '
+        'record p50/p95 latency, queries and peak allocations per '
+        'endpoint. Exits non-zero when a budget regresses against the '
+        'baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', type=_ints, default=[100, 1000],
+            help='Comma separated catalog sizes in articles',
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--endpoints', default=','.join(SCENARIOS),
+            help=f'Comma separated subset of {", ".join(SCENARIOS)}',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--cached', action='store_true',
+            help='Let the response cache serve repeated reads',
+        )
+        parser.add_argument('--output', help='Write the JSON report here')
+        parser.add_argument(
+            '--baseline', help='Compare against this JSON report',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Store this run as the new baseline',
+        )
+        parser.add_argument(
+            '--latency-tolerance', type=float, default=0.25,
+            help='Allowed relative p95 growth (default 0.25)',
+        )
+        parser.add_argument(
+            '--memory-tolerance', type=float, default=0.25,
+            help='Allowed relative peak allocation growth (default 0.25)',
+        )
+
+    def handle(self, *args, **options):
+        endpoints = [
+            name.strip() for name in options['endpoints'].split(',')
+            if name.strip()
+        ]
+        unknown = set(endpoints) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown endpoints: {", ".join(unknown)}')
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline needs --baseline PATH.')
+
+        report = run_suite(
+            options['scales'],
+            endpoints,
+            iterations=options['iterations'],
+            cached=options['cached'],
+            seed_value=options['seed'],
+        )
+
+        if options['output']:
+            dump(report, options['output'])
+        else:
+            self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+
+        baseline = options['baseline']
+        if options['save_baseline']:
+            dump(report, baseline)
+            self.stdout.write(self.style.SUCCESS(
+                f'Saved baseline to {baseline}.'
+            ))
+            return
+        if not baseline:
+            return
+        if not os.path.exists(baseline):
+            raise CommandError(f'No baseline at {baseline}.')
+        violations = compare(report, load(baseline), {
+            'p95_ms': options['latency_tolerance'],
+            'peak_kb': options['memory_tolerance'],
+        })
+        if violations:
+            raise CommandError(
+                'Benchmark budgets exceeded:\n' + '\n'.join(violations)
+            )
+        self.stdout.write(self.style.SUCCESS('All budgets met.'))
@@ -0,0 +1,152 @@
+"""
+Django command comparing requests/sec of the WSGI and ASGI deployments.
+"""
+import json
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core import loadtest
+
+
+def _ints(value):
+    return [int(part) for part in value.split(',') if part]
+
+
+def _default_paths():
+    return ','.join(reverse(name) for name in (
+        'article:article-list',
+        'article:category-list',
+        'article:attributevariants-list',
+    ))
+
+
+class Command(BaseCommand):
+    """ django command running the WSGI/ASGI concurrency benchmark"""
+    help = (
+        'Hold 100-1000 concurrent keep-alive clients against the WSGI and '
+        'ASGI servers (started with gunicorn unless urls are given) and '
+        'report requests/sec and latency percentiles of each.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--token', required=True,
+            help='Api token of the user whose catalog is read',
+        )
+        parser.add_argument(
+            '--concurrency', type=_ints,
+            default=list(loadtest.DEFAULT_CONCURRENCY),
+            help='Comma separated numbers of concurrent clients',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Seconds per server and concurrency level',
+        )
+        parser.add_argument(
+            '--warmup', type=float, default=2,
+            help='Seconds of traffic before measuring each server',
+        )
+        parser.add_argument(
+            '--paths', default=None,
+            help='Comma separated paths requested in turn '
+                 '(default: the article, category and variant lists)',
+        )
+        parser.add_argument(
+            '--servers', default=','.join(loadtest.SERVERS),
+            help='Comma separated subset of wsgi,asgi',
+        )
+        parser.add_argument(
+            '--wsgi-url', help='Benchmark this running WSGI server',
+        )
+        parser.add_argument(
+            '--asgi-url', help='Benchmark this running ASGI server',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Gunicorn workers of the servers started here',
+        )
+        parser.add_argument(
+            '--wsgi-threads', type=int, default=1,
+            help='Threads per WSGI worker (more than 1 uses gthread)',
+        )
+        parser.add_argument(
+            '--port', type=int, default=8101,
+            help='Port of the first server started here',
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', help='Write the JSON report here')
+
+    def handle(self, *args, **options):
+        servers = [
+            name.strip() for name in options['servers'].split(',')
+            if name.strip()
+        ]
+        unknown = set(servers) - set(loadtest.SERVERS)
+        if unknown:
+            raise CommandError(f'Unknown servers: {", ".join(unknown)}')
+        paths = (options['paths'] or _default_paths()).split(',')
+        headers = {'Authorization': f'Token {options["token"]}'}
+
+        report = {
+            'paths': paths,
+            'duration': options['duration'],
+            'servers': {},
+        }
+        try:
+            for offset, kind in enumerate(servers):
+                with ExitStack() as stack:
+                    url = options[f'{kind}_url'] or stack.enter_context(
+                        loadtest.serve(
+                            kind, options['port'] + offset,
+                            options['workers'], options['wsgi_threads'],
+                        )
+                    )
+                    report['servers'][kind] = self.measure(
+                        kind, url, paths, headers, options,
+                    )
+        except loadtest.LoadTestError as error:
+            raise CommandError(str(error))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+        self.summarize(report, options['concurrency'])
+
+    def measure(self, kind, url, paths, headers, options):
+        if options['warmup'] > 0:
+            loadtest.run(url, paths, 10, options['warmup'], headers)
+        results = []
+        for concurrency in options['concurrency']:
+            result = loadtest.run(
+                url, paths, concurrency, options['duration'], headers,
+                options['timeout'],
+            )
+            self.stderr.write(
+                f'{kind} c={concurrency}: {result["rps"]} req/s, '
+                f'p95 {result["p95_ms"]} ms, {result["errors"]} errors, '
+                f'{result["non_2xx"]} non-2xx'
+            )
+            results.append(result)
+        return results
+
+    def summarize(self, report, levels):
+        servers = report['servers']
+        self.stdout.write(
+            'clients ' + ''.join(f'{kind + " req/s":>14}' for kind in servers)
+            + ('   asgi/wsgi' if len(servers) == 2 else '')
+        )
+        for index, concurrency in enumerate(levels):
+            rates = [results[index]['rps'] for results in servers.values()]
+            line = f'{concurrency:>7} ' + ''.join(
+                f'{rate:>14.1f}' for rate in rates
+            )
+            if set(servers) == set(loadtest.SERVERS) and servers[
+                loadtest.WSGI
+            ][index]['rps']:
+                line += '{:>12.2f}'.format(
+                    servers[loadtest.ASGI][index]['rps']
+                    / servers[loadtest.WSGI][index]['rps']
+                )
+            self.stdout.write(line)
@@ -0,0 +1,83 @@
+"""
+Django command comparing the plans of icontains and trigram lookups.
+"""
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import Article, Attribute, AttributeValue, AttributeVariants
+
+TARGETS = (
+    ('AttributeVariants.name', AttributeVariants, 'name'),
+    ('Attribute.name', Attribute, 'name'),
+    ('AttributeValue.value', AttributeValue, 'value'),
+    ('Article.attributes__name', Article, 'attributes__name'),
+)
+
+
+def _scans(plan):
+    """ Return the scan node types of an EXPLAIN (FORMAT JSON) plan."""
+    scans = []
+    if 'Scan' in plan['Node Type']:
+        scans.append(f"{plan['Node Type']} on {plan.get('Relation Name')}")
+    for child in plan.get('Plans', ()):
+        scans.extend(_scans(child))
+    return scans
+
+
+def explain(queryset):
+    """ Return the estimated total cost and scans of a queryset."""
+    if connection.vendor != 'postgresql':
+        return {'cost': None, 'scans': []}
+    plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+    return {'cost': plan['Total Cost'], 'scans': _scans(plan)}
+
+
+class Command(BaseCommand):
+    """ django command comparing lookup plan costs"""
+    help = (
+        'Compare the estimated plan cost of icontains (before) and '
+        'trigram_contains (after) on the trigram indexed columns. '
+        'Trigram indexes only serve terms of three or more characters.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('term', nargs='?', default='red')
+        parser.add_argument(
+            '--json', action='store_true', help='Print the results as JSON',
+        )
+
+    def handle(self, *args, **options):
+        term = options['term']
+        results = []
+        for label, model, field in TARGETS:
+            queryset = model.objects.all()
+            results.append({
+                'lookup': label,
+                'before': explain(
+                    queryset.filter(**{f'{field}__icontains': term})
+                ),
+                'after': explain(
+                    queryset.filter(**{f'{field}__trigram_contains': term})
+                ),
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                'Plan costs are only available on PostgreSQL.'
+            ))
+        self.stdout.write(f'{"lookup":<28}{"icontains":>14}{"trigram":>14}')
+        for result in results:
+            before = result['before']['cost']
+            after = result['after']['cost']
+            self.stdout.write(
+                f'{result["lookup"]:<28}'
+                f'{"n/a" if before is None else before:>14}'
+                f'{"n/a" if after is None else after:>14}'
+            )
+            for scan in result['after']['scans']:
+                self.stdout.write(f'    {scan}')
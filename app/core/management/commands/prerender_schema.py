@@ -0,0 +1,37 @@
+"""
+Django command pre-rendering the OpenAPI schema.
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """ django command writing the schema files of the code version"""
+    help = (
+        'Generate the OpenAPI schema and write its YAML and JSON '
+        'renderings, plain and gzipped, named by code version, for '
+        'api/schema/ to serve without generating it. Run at image build.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory',
+            help='Where to write (default SCHEMA_CACHE["DIRECTORY"])',
+        )
+
+    def handle(self, *args, **options):
+        if not apps.is_installed('drf_spectacular'):
+            raise CommandError(
+                'drf_spectacular is not installed with these settings.'
+            )
+        from core import schema
+
+        directory = options['directory'] or schema.get_setting('DIRECTORY')
+        if not directory:
+            raise CommandError('No directory to write the schema to.')
+        written = schema.prerender(directory)
+        self.stdout.write(
+            f'Schema of code version {schema.code_version()}:'
+        )
+        for path in written:
+            self.stdout.write(f'  {path} ({path.stat().st_size} bytes)')
@@ -0,0 +1,104 @@
+"""
+Django command profiling the import cost of process startup.
+"""
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importtime import StartupError, by_package, profile_startup
+
+
+class Command(BaseCommand):
+    """ django command reporting per module import time at boot"""
+    help = (
+        'Boot fresh interpreters under -X importtime with each settings '
+        'profile and report the wall time of django.setup() and of the '
+        'whole boot, and the most expensive packages or modules.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles',
+            default=os.environ.get('DJANGO_SETTINGS_MODULE', 'app.settings'),
+            help='Comma separated settings modules to compare',
+        )
+        parser.add_argument(
+            '--by', choices=('package', 'module'), default='package',
+        )
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Boots per profile for the wall times (median)',
+        )
+        parser.add_argument(
+            '--no-urls', action='store_true',
+            help='Stop after django.setup(), as one-shot commands do',
+        )
+        parser.add_argument(
+            '--warm-up', action='store_true',
+            help='Include the prefork warm-up in the boot',
+        )
+        parser.add_argument('--output', help='Write the JSON report here')
+
+    def handle(self, *args, **options):
+        profiles = [
+            name.strip() for name in options['profiles'].split(',')
+            if name.strip()
+        ]
+        try:
+            reports = [
+                profile_startup(
+                    name, urls=not options['no_urls'],
+                    warm_up=options['warm_up'], repeat=options['repeat'],
+                )
+                for name in profiles
+            ]
+        except StartupError as error:
+            raise CommandError(str(error))
+
+        for report in reports:
+            self.write_report(report, options['by'], options['top'])
+        if len(reports) > 1:
+            self.compare(reports)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump([
+                    {
+                        **report,
+                        'modules': [m.as_dict() for m in report['modules']],
+                    }
+                    for report in reports
+                ], output, indent=2)
+
+    def write_report(self, report, by, top):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{report["settings"]}: setup {report["setup_ms"]} ms, boot '
+            f'{report["boot_ms"]} ms, imports {report["import_ms"]} ms in '
+            f'{len(report["modules"])} modules'
+        ))
+        if by == 'package':
+            self.stdout.write(f'{"self ms":>9} {"modules":>7}  package')
+            for name, total, count in by_package(report['modules'])[:top]:
+                self.stdout.write(f'{total / 1000:>9.1f} {count:>7}  {name}')
+            return
+        self.stdout.write(
+            f'{"cumul ms":>9} {"self ms":>8}  module (imported by)'
+        )
+        modules = sorted(report['modules'], key=lambda m: -m.cumulative_us)
+        for module in modules[:top]:
+            self.stdout.write(
+                f'{module.cumulative_us / 1000:>9.1f} '
+                f'{module.self_us / 1000:>8.1f}  {module.name} '
+                f'({module.imported_by or "-"})'
+            )
+
+    def compare(self, reports):
+        base = reports[0]
+        for report in reports[1:]:
+            self.stdout.write(
+                f'{report["settings"]} vs {base["settings"]}: boot '
+                f'{report["boot_ms"] - base["boot_ms"]:+.1f} ms, imports '
+                f'{report["import_ms"] - base["import_ms"]:+.1f} ms, '
+                f'{len(report["modules"]) - len(base["modules"]):+d} modules'
+            )
@@ -0,0 +1,110 @@
+"""
+Django command running the production server.
+"""
+import importlib.util
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import prefork
+
+# Command line options and the gunicorn config environment they set.
+OPTION_ENV = (
+    ('bind', 'GUNICORN_BIND'),
+    ('workers', 'GUNICORN_WORKERS'),
+    ('threads', 'GUNICORN_THREADS'),
+    ('max_requests', 'GUNICORN_MAX_REQUESTS'),
+    ('max_rss_mb', 'GUNICORN_MAX_RSS_MB'),
+    ('timeout', 'GUNICORN_TIMEOUT'),
+)
+
+
+def process_local_caches():
+    """ Return the cache aliases whose entries stay in one process."""
+    return [
+        alias for alias, config in sorted(settings.CACHES.items())
+        if config.get('BACKEND') == 'core.cache.backend.RedisCache'
+        and str(config.get('LOCATION', '')).startswith('memory://')
+    ]
+
+
+class Command(BaseCommand):
+    """ django command replacing itself with a preforking gunicorn"""
+    help = (
+        'Run gunicorn with workers sized from the CPU count, forked from '
+        'a preloaded and warmed up master and recycled by request count '
+        'or RSS. Startup time and worker memory are logged.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Serve the ASGI application with uvicorn workers',
+        )
+        parser.add_argument('--bind', help='Address (default 0.0.0.0:8000)')
+        parser.add_argument(
+            '--workers', type=int,
+            help='Worker processes (default from the CPU count, 1 with a '
+                 'memory:// cache)',
+        )
+        parser.add_argument(
+            '--threads', type=int,
+            help='Threads per WSGI worker, more than 1 uses gthread',
+        )
+        parser.add_argument(
+            '--max-requests', type=int,
+            help='Recycle workers after this many requests (default 1000)',
+        )
+        parser.add_argument(
+            '--max-rss-mb', type=int,
+            help='Recycle WSGI workers above this RSS (default 512, 0 off)',
+        )
+        parser.add_argument('--timeout', type=int)
+        parser.add_argument(
+            '--no-preload', action='store_true',
+            help='Load and warm up the app in every worker instead',
+        )
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('gunicorn') is None:
+            raise CommandError('gunicorn is not installed.')
+        if options['asgi'] and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('uvicorn is not installed.')
+
+        env = dict(os.environ)
+        for option, name in OPTION_ENV:
+            if options[option] is not None:
+                env[name] = str(options[option])
+        if options['no_preload']:
+            env['GUNICORN_PRELOAD'] = '0'
+        self.check_caches(env)
+
+        kind = 'asgi' if options['asgi'] else 'wsgi'
+        command = prefork.gunicorn_command(kind)
+        self.stdout.write(' '.join(command))
+        self.stdout.flush()
+        os.execvpe(command[0], command, env)
+
+    def check_caches(self, env):
+        """ Keep to one worker while the cache lives in the process.
+
+        Version bumps of a memory:// cache never reach other workers,
+        which would serve stale pages and 304s.
+        """
+        local = process_local_caches()
+        if not local:
+            return
+        workers = int(env.get('GUNICORN_WORKERS') or 0)
+        if workers > 1:
+            raise CommandError(
+                f'Cache {", ".join(local)} is memory://, private to each '
+                f'of the {workers} workers. Set CACHE_URL to a Redis '
+                f'server or run one worker.'
+            )
+        if not workers:
+            env['GUNICORN_WORKERS'] = '1'
+            self.stderr.write(self.style.WARNING(
+                f'Cache {", ".join(local)} is memory://, starting one '
+                f'worker. Set CACHE_URL to a Redis server for more.'
+            ))
@@ -0,0 +1,568 @@
+"""
+Per-request performance metrics.
+
+MetricsMiddleware times every request and labels it with the view that
+served it (ViewSet.action for viewsets). A database execute wrapper adds
+up the queries and their time, and the top level serializer .data is
+timed on its own. Aggregates are rendered in the Prometheus text format.
+
+A sampled fraction of requests also records its SQL and, when served
+synchronously, a cProfile run.
+The ones slower than SLOW_REQUEST_MS are logged and kept in a bounded
+buffer. Everything else costs a few counters per request and query.
+
+The figures live in the process that collected them. Under a preforking
+server a scrape reaches one random worker, so with DIRECTORY set every
+process writes its figures to a file of its own there, at most once per
+FLUSH_INTERVAL and when it exits, and render_prometheus() adds up the
+files of all of them, as prometheus_client's multiprocess mode does.
+Files of exited workers keep counting towards the counters; their
+gauges are left out. The gunicorn configurations set DIRECTORY (env
+METRICS_DIR) to a new temporary directory per server.
+"""
+import contextvars
+import glob
+import io
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'TOKEN': None,
+    'SLOW_REQUEST_MS': 1000,
+    'SAMPLE_RATE': 0.05,
+    'MAX_SAMPLES': 50,
+    'MAX_SAMPLE_QUERIES': 200,
+    'PROFILE_LINES': 40,
+    'DIRECTORY': None,
+    'FLUSH_INTERVAL': 1.0,
+}
+
+# Upper bounds in seconds of the request duration histogram.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+UNRESOLVED = '<unresolved>'
+
+POOL_GAUGES = ('size', 'idle', 'in_use', 'max_size', 'max_wait_seconds')
+
+FILE_PATTERN = 'metrics-{pid}.json'
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+def get_setting(name):
+    """ Return a METRICS setting, falling back to the default."""
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+class RequestMetrics:
+    """ Figures collected while a single request is handled"""
+
+    def __init__(self, sampled=False):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+        self.sql = [] if sampled else None
+
+    @property
+    def sampled(self):
+        return self.sql is not None
+
+    def add_query(self, sql, params, many, seconds):
+        self.queries += 1
+        self.query_seconds += seconds
+        if self.sampled and len(self.sql) < get_setting('MAX_SAMPLE_QUERIES'):
+            self.sql.append({
+                'sql': sql,
+                'params': repr(params)[:1000],
+                'many': many,
+                'ms': round(seconds * 1000, 3),
+            })
+
+
+def current():
+    """ Return the metrics of the request being handled, if any."""
+    return _current.get()
+
+
+def start_request(sampled=False):
+    """ Start collecting metrics, returns (metrics, reset token)."""
+    metrics = RequestMetrics(sampled)
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """ Database execute wrapper timing queries of the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, params, many, time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """ connection_created receiver adding record_query to connections.
+
+    Installed on every connection rather than around each request, so
+    queries run by thread pools on behalf of a request are counted too.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def serializing():
+    """ Count the time of the block as serializer time.
+
+    Nested blocks are part of the outermost one.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializing = False
+        metrics.serializer_seconds += time.perf_counter() - started
+
+
+def instrument_serializers():
+    """ Time the .data of top level DRF serializers.
+
+    Serializer.data and ListSerializer.data both defer to
+    BaseSerializer.data, which only the outermost serializer calls;
+    nested fields go through to_representation directly.
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    fget = BaseSerializer.data.fget
+    if getattr(fget, 'instrumented', False):
+        return
+
+    def data(self):
+        with serializing():
+            return fget(self)
+
+    data.instrumented = True
+    BaseSerializer.data = property(data)
+
+
+def view_label(view_func, method):
+    """ Return a bounded label of the view serving a request."""
+    cls = getattr(view_func, 'cls', None) or getattr(
+        view_func, 'view_class', None,
+    )
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        return f'{cls.__name__}.{actions.get(method.lower(), method.lower())}'
+    return cls.__name__
+
+
+def profile_text(profiler):
+    """ Return the cumulative time listing of a cProfile run."""
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(get_setting('PROFILE_LINES'))
+    return stream.getvalue()
+
+
+class MetricsRegistry:
+    """ Thread safe aggregates of the requests of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+            self.samples = deque(maxlen=get_setting('MAX_SAMPLES'))
+
+    def observe(self, view, method, status, seconds, metrics, size):
+        """ Add a finished request to the aggregates."""
+        with self._lock:
+            entry = self._views.get((view, method))
+            if entry is None:
+                entry = self._views[(view, method)] = {
+                    'statuses': {},
+                    'buckets': [0] * len(BUCKETS),
+                    'count': 0,
+                    'seconds': 0.0,
+                    'queries': 0,
+                    'query_seconds': 0.0,
+                    'serializer_seconds': 0.0,
+                    'response_bytes': 0,
+                    'slow': 0,
+                }
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    entry['buckets'][index] += 1
+                    break
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['queries'] += metrics.queries
+            entry['query_seconds'] += metrics.query_seconds
+            entry['serializer_seconds'] += metrics.serializer_seconds
+            entry['response_bytes'] += size
+            if seconds * 1000 >= get_setting('SLOW_REQUEST_MS'):
+                entry['slow'] += 1
+
+    def add_sample(self, sample):
+        with self._lock:
+            self.samples.append(sample)
+
+    def snapshot(self):
+        """ Return a copy of the per view aggregates."""
+        with self._lock:
+            return {
+                key: {
+                    **entry,
+                    'statuses': dict(entry['statuses']),
+                    'buckets': list(entry['buckets']),
+                }
+                for key, entry in self._views.items()
+            }
+
+    def slow_requests(self):
+        with self._lock:
+            return list(self.samples)
+
+
+registry = MetricsRegistry()
+
+
+def process_figures():
+    """ Return the figures of this process as JSON data."""
+    from core.cache import singleflight
+    from core.cache.backend import cache_stats
+    from core.db.pool import pool_stats
+    from user.authentication import token_cache
+
+    return {
+        'pid': os.getpid(),
+        'views': [
+            [view, method, {
+                **entry,
+                'statuses': {
+                    str(status): count
+                    for status, count in entry['statuses'].items()
+                },
+            }]
+            for (view, method), entry in registry.snapshot().items()
+        ],
+        'token_cache': token_cache.stats(),
+        'caches': {
+            alias: stats['namespaces']
+            for alias, stats in cache_stats().items()
+        },
+        'single_flight': singleflight.stats(),
+        'pools': pool_stats(),
+    }
+
+
+_flushed = {'at': None}
+_flush_lock = threading.Lock()
+
+
+def flush(force=False):
+    """ Write the figures of this process to DIRECTORY, if set.
+
+    Without force at most once per FLUSH_INTERVAL.
+    """
+    directory = get_setting('DIRECTORY')
+    if not directory:
+        return
+    now = time.monotonic()
+    with _flush_lock:
+        last = _flushed['at']
+        if not force and last is not None and (
+                now - last < get_setting('FLUSH_INTERVAL')):
+            return
+        _flushed['at'] = now
+    path = os.path.join(directory, FILE_PATTERN.format(pid=os.getpid()))
+    # Written aside and renamed, readers never see half a file.
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as fileobj:
+        json.dump(process_figures(), fileobj)
+    os.replace(temporary, path)
+
+
+def clear_directory():
+    """ Remove the figures of processes of an earlier server."""
+    directory = get_setting('DIRECTORY')
+    if directory:
+        for path in glob.glob(os.path.join(directory, FILE_PATTERN.format(
+                pid='*'))):
+            os.remove(path)
+
+
+def _running(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """ Return the figures of every process writing to DIRECTORY.
+
+    Only this process is reported without a DIRECTORY.
+    """
+    directory = get_setting('DIRECTORY')
+    if not directory:
+        return [process_figures()]
+    flush(force=True)
+    figures = []
+    for path in sorted(glob.glob(os.path.join(
+            directory, FILE_PATTERN.format(pid='*')))):
+        try:
+            with open(path) as fileobj:
+                figures.append(json.load(fileobj))
+        except (OSError, ValueError):
+            # Removed or replaced in the meantime.
+            continue
+    return figures
+
+
+def _add(totals, values):
+    for name, value in values.items():
+        totals[name] = totals.get(name, 0) + value
+
+
+def merge(figures):
+    """ Add up the figures of several processes.
+
+    Counters are summed over all of them, gauges over those still
+    running.
+    """
+    views = {}
+    token_cache = {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0}
+    caches = {}
+    single_flight = {}
+    pools = {}
+    for process in figures:
+        running = _running(process['pid'])
+        for view, method, entry in process['views']:
+            total = views.get((view, method))
+            if total is None:
+                total = views[(view, method)] = {
+                    'statuses': {}, 'buckets': [0] * len(BUCKETS),
+                }
+            _add(total['statuses'], entry['statuses'])
+            total['buckets'] = [
+                a + b for a, b in zip(total['buckets'], entry['buckets'])
+            ]
+            _add(total, {
+                name: value for name, value in entry.items()
+                if name not in ('statuses', 'buckets')
+            })
+        for name in ('hits', 'misses', 'evictions'):
+            token_cache[name] += process['token_cache'][name]
+        if running:
+            token_cache['size'] += process['token_cache']['size']
+        for alias, namespaces in process['caches'].items():
+            merged = caches.setdefault(alias, {})
+            for namespace, counts in namespaces.items():
+                _add(merged.setdefault(namespace, {}), counts)
+        _add(single_flight, process['single_flight'])
+        for alias, stats in process['pools'].items():
+            merged = pools.setdefault(alias, {})
+            for name, value in stats.items():
+                if name not in POOL_GAUGES:
+                    merged[name] = merged.get(name, 0) + value
+                elif not running:
+                    merged.setdefault(name, 0)
+                elif name == 'max_wait_seconds':
+                    merged[name] = max(merged.get(name, 0), value)
+                else:
+                    merged[name] = merged.get(name, 0) + value
+    return {
+        'views': views,
+        'token_cache': token_cache,
+        'caches': caches,
+        'single_flight': single_flight,
+        'pools': pools,
+    }
+
+
+def build_sample(request, view, status, seconds, metrics, profiler):
+    return {
+        'time': datetime.now(timezone.utc).isoformat(),
+        'view': view,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': status,
+        'duration_ms': round(seconds * 1000, 3),
+        'queries': metrics.queries,
+        'query_ms': round(metrics.query_seconds * 1000, 3),
+        'serializer_ms': round(metrics.serializer_seconds * 1000, 3),
+        'sql': metrics.sql,
+        'profile': profile_text(profiler) if profiler else '',
+    }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n'
+    )
+
+
+def _labels(**labels):
+    return ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    )
+
+
+class _Exposition:
+    """ Builder of Prometheus text exposition lines"""
+
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, kind, help_text, samples):
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            label_text = f'{{{labels}}}' if labels else ''
+            self.lines.append(f'{name}{suffix}{label_text} {value:g}')
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def render_prometheus():
+    """ Return every metric in the Prometheus format.
+
+    Figures are added up over the processes sharing DIRECTORY.
+    """
+    figures = merge(collect())
+    out = _Exposition()
+    views = sorted(figures['views'].items())
+
+    out.metric(
+        'http_requests_total', 'counter', 'Requests by view and status.',
+        [
+            ('', _labels(view=view, method=method, status=status), count)
+            for (view, method), entry in views
+            for status, count in sorted(entry['statuses'].items())
+        ],
+    )
+    histogram = []
+    for (view, method), entry in views:
+        cumulative = 0
+        for bound, count in zip(BUCKETS, entry['buckets']):
+            cumulative += count
+            histogram.append((
+                '_bucket', _labels(view=view, method=method, le=f'{bound:g}'),
+                cumulative,
+            ))
+        histogram.append((
+            '_bucket', _labels(view=view, method=method, le='+Inf'),
+            entry['count'],
+        ))
+        labels = _labels(view=view, method=method)
+        histogram.append(('_sum', labels, entry['seconds']))
+        histogram.append(('_count', labels, entry['count']))
+    out.metric(
+        'http_request_duration_seconds', 'histogram',
+        'Request duration by view.', histogram,
+    )
+    totals = (
+        ('http_request_queries_total', 'queries',
+         'Database queries run by requests.'),
+        ('http_request_query_seconds_total', 'query_seconds',
+         'Time spent in database queries.'),
+        ('http_request_serializer_seconds_total', 'serializer_seconds',
+         'Time spent evaluating serializer data.'),
+        ('http_response_bytes_total', 'response_bytes',
+         'Size of non streaming response bodies.'),
+        ('http_slow_requests_total', 'slow',
+         'Requests slower than the slow request threshold.'),
+    )
+    for name, field, help_text in totals:
+        out.metric(name, 'counter', help_text, [
+            ('', _labels(view=view, method=method), entry[field])
+            for (view, method), entry in views
+        ])
+
+    cache = figures['token_cache']
+    for field in ('hits', 'misses', 'evictions'):
+        out.metric(
+            f'token_cache_{field}_total', 'counter',
+            f'Token authentication cache {field}.', [('', '', cache[field])],
+        )
+    out.metric(
+        'token_cache_size', 'gauge', 'Cached tokens.',
+        [('', '', cache['size'])],
+    )
+
+    caches = sorted(figures['caches'].items())
+    for field in ('hits', 'misses'):
+        out.metric(
+            f'cache_{field}_total', 'counter',
+            f'Cache {field} by key namespace.', [
+                ('', _labels(alias=alias, namespace=namespace), counts[field])
+                for alias, namespaces in caches
+                for namespace, counts in sorted(namespaces.items())
+            ],
+        )
+    ratios = []
+    for alias, namespaces in caches:
+        hits = sum(counts['hits'] for counts in namespaces.values())
+        lookups = hits + sum(
+            counts['misses'] for counts in namespaces.values()
+        )
+        ratios.append(
+            ('', _labels(alias=alias), hits / lookups if lookups else 0.0)
+        )
+    out.metric(
+        'cache_hit_ratio', 'gauge', 'Share of cache lookups that hit.',
+        ratios,
+    )
+    for field, value in sorted(figures['single_flight'].items()):
+        out.metric(
+            f'cache_single_flight_{field}_total', 'counter',
+            f'Single flight cache recompute {field}.', [('', '', value)],
+        )
+
+    pools = sorted(figures['pools'].items())
+    for field, value in (pools[0][1].items() if pools else ()):
+        kind = 'gauge' if field in POOL_GAUGES else 'counter'
+        name = f'db_pool_{field}' + ('_total' if kind == 'counter' else '')
+        out.metric(name, kind, f'Connection pool {field}.', [
+            ('', _labels(alias=alias), stats[field]) for alias, stats in pools
+        ])
+    return out.render()
@@ -0,0 +1,89 @@
+"""
+Middleware of the core app.
+"""
+import asyncio
+import cProfile
+import random
+import time
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import metrics
+
+
+class MetricsMiddleware:
+    """ Record timing, queries and size of every request.
+
+    Keep it first in MIDDLEWARE so the timing covers the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics.get_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Lets the handler await this instance, like MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        sampled = random.random() < metrics.get_setting('SAMPLE_RATE')
+        collected, token = metrics.start_request(sampled)
+        profiler = cProfile.Profile() if sampled else None
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            metrics.end_request(token)
+        seconds = time.perf_counter() - started
+        self.record(request, response, seconds, collected, profiler)
+        return response
+
+    async def __acall__(self, request):
+        # Requests sharing the event loop thread would mix in a cProfile
+        # run, so sampled async requests only keep their SQL.
+        sampled = random.random() < metrics.get_setting('SAMPLE_RATE')
+        collected, token = metrics.start_request(sampled)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        seconds = time.perf_counter() - started
+        self.record(request, response, seconds, collected, None)
+        return response
+
+    def record(self, request, response, seconds, collected, profiler):
+        match = getattr(request, 'resolver_match', None)
+        view = metrics.UNRESOLVED if match is None else metrics.view_label(
+            match.func, request.method,
+        )
+        size = 0 if response.streaming else len(response.content)
+        metrics.registry.observe(
+            view, request.method, response.status_code, seconds, collected,
+            size,
+        )
+        metrics.flush()
+        if collected.sampled and seconds * 1000 >= metrics.get_setting(
+            'SLOW_REQUEST_MS'
+        ):
+            self.capture(request, view, response, seconds, collected, profiler)
+
+    def capture(self, request, view, response, seconds, collected, profiler):
+        sample = metrics.build_sample(
+            request, view, response.status_code, seconds, collected, profiler,
+        )
+        metrics.registry.add_sample(sample)
+        metrics.logger.warning(
+            'Slow request %s %s (%s) took %.1f ms with %d queries',
+            request.method, sample['path'], view, sample['duration_ms'],
+            collected.queries, extra={'metrics_sample': sample},
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='articleimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:20
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import migrations, models
+import django.db.models.deletion
+
+from core.db.operations import RunPostgreSQL
+
+SEARCH_TRIGGER = """
+CREATE FUNCTION core_article_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(
+            to_tsvector('english', coalesce(NEW.short_description, '')), 'B'
+        ) ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_article_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, short_description, description
+    ON core_article
+    FOR EACH ROW EXECUTE PROCEDURE core_article_search_vector_update();
+
+UPDATE core_article SET title = title;
+"""
+
+DROP_SEARCH_TRIGGER = """
+DROP TRIGGER IF EXISTS core_article_search_vector_trigger ON core_article;
+DROP FUNCTION IF EXISTS core_article_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='search_vector',
+            field=SearchVectorField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ArticleSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField(default=0)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='core.article')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='articlesearchterm',
+            index=models.Index(fields=['term', 'article'], name='core_articl_term_d85d33_idx'),
+        ),
+        RunPostgreSQL(SEARCH_TRIGGER, DROP_SEARCH_TRIGGER),
+        RunPostgreSQL(
+            'CREATE INDEX core_article_search_vector_gin '
+            'ON core_article USING gin (search_vector);',
+            'DROP INDEX IF EXISTS core_article_search_vector_gin;',
+        ),
+    ]
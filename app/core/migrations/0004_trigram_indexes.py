@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:45
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from core.db.operations import RunPostgreSQL
+
+TRIGRAM_INDEXES = (
+    ('core_attributevariants_name_trgm', 'core_attributevariants', 'name'),
+    ('core_attribute_name_trgm', 'core_attribute', 'name'),
+    ('core_attributevalue_value_trgm', 'core_attributevalue', 'value'),
+)
+
+
+def trigram_index(name, table, column):
+    return RunPostgreSQL(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+        f'ON {table} USING gin ({column} gin_trgm_ops);',
+        f'DROP INDEX CONCURRENTLY IF EXISTS {name};',
+    )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core', '0003_article_search'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        *(trigram_index(*index) for index in TRIGRAM_INDEXES),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_article_facet_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='updated_at',
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now,
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(
+                fields=['user', 'updated_at'],
+                name='core_articl_user_id_934d11_idx',
+            ),
+        ),
+    ]
@@ -5,6 +5,7 @@ import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -88,21 +89,45 @@ class Article(models.Model):
     stock=models.CharField(max_length=255, blank=True)
     categories= models.ManyToManyField('Category')
     image = models.ImageField(null=True, upload_to=article_image_file_path)
+    image_variants = models.JSONField(default=dict, blank=True)
     attributes= models.ManyToManyField('AttributeVariants')
    # uploaded_images = models.ManyToManyField('ArticleImage', related_name='+')
     variant=models.CharField(max_length=10,choices=VARIANTS, default='None')
    # attributes_new = models.ManyToManyField(AttributeValue)
+    # Maintained by a trigger on PostgreSQL, GIN indexed (see 0003).
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Also bumped when links or images change, for incremental exports.
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = '1. Article'
         indexes = [
             models.Index(fields=['title',]),
             models.Index(fields=['short_description',]),
+            models.Index(fields=['user', 'updated_at']),
 
         ]
     def __str__(self):
         return self.title
 
+class ArticleSearchTerm(models.Model):
+    """ Inverted index entry used for search when not on PostgreSQL"""
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+    )
+    term = models.CharField(max_length=64)
+    weight = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'article']),
+        ]
+
+    def __str__(self):
+        return self.term
+
 class AttributeValue(models.Model):
     attribute = models.ForeignKey(Attribute, on_delete=models.CASCADE)
     article = models.ForeignKey(Article, on_delete=models.CASCADE)
@@ -168,6 +193,7 @@ class ArticleImage(models.Model):
     """ Article images"""
     article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to=article_image_file_path)
+    variants = models.JSONField(default=dict, blank=True)
 
     class Meta:
         verbose_name_plural = '3. Article Image'
@@ -175,6 +201,67 @@ class ArticleImage(models.Model):
     # def __str__(self):
         # return "%s" % (self.article.title)
 
+class ArticleFacetCount(models.Model):
+    """ Materialized number of a user's articles per category or variant"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+',
+    )
+    attribute = models.ForeignKey(
+        AttributeVariants,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+',
+    )
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category'],
+                condition=models.Q(category__isnull=False),
+                name='unique_category_facet',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'attribute'],
+                condition=models.Q(attribute__isnull=False),
+                name='unique_attribute_facet',
+            ),
+        ]
+
+class ArticleImportJob(models.Model):
+    """ Article feed imported outside the request that uploaded it"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    status = models.CharField(max_length=8, choices=STATUSES, default=QUEUED)
+    format = models.CharField(max_length=8)
+    file = models.CharField(max_length=255)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
 """ New category Model"""
 
 class ProductCategory(models.Model):
@@ -0,0 +1,297 @@
+"""
+Prefork server support: boot warm-up, memory figures and recycling.
+
+Used by the gunicorn configurations in app/ (see the serve command).
+With preload_app the master imports Django and runs warm_up() before
+forking, so the URL resolvers, the DRF settings classes, model field
+caches, the compiled row serializers and the OpenAPI schema (see
+core.schema) are built once and shared copy on write by every worker.
+warm_up() runs no queries; database connections must never be opened
+before the fork. Each worker fills its own connection pools instead,
+see warm_pools().
+
+Workers are recycled after max_requests requests (a gunicorn setting)
+or once their RSS passes the limit given to check_memory().
+"""
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from importlib import import_module
+
+logger = logging.getLogger('gunicorn.error')
+
+# Requests between two RSS checks of a worker.
+RSS_CHECK_INTERVAL = 16
+
+# rest_framework settings holding classes imported on first access.
+API_CLASS_SETTINGS = (
+    'DEFAULT_RENDERER_CLASSES',
+    'DEFAULT_PARSER_CLASSES',
+    'DEFAULT_AUTHENTICATION_CLASSES',
+    'DEFAULT_PERMISSION_CLASSES',
+    'DEFAULT_THROTTLE_CLASSES',
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+    'DEFAULT_METADATA_CLASS',
+    'DEFAULT_VERSIONING_CLASS',
+    'DEFAULT_PAGINATION_CLASS',
+    'DEFAULT_FILTER_BACKENDS',
+    'EXCEPTION_HANDLER',
+)
+
+# Modules the app imports on first use, loaded by a preloading master so
+# workers share them instead of importing them on their first request.
+DEFERRED_IMPORTS = (
+    'PIL.Image',
+    'PIL.ImageOps',
+)
+
+
+def default_workers(threads=1):
+    """ Return the worker count for this host, (2 x CPUs) + 1 when sync."""
+    cpus = multiprocessing.cpu_count()
+    if threads > 1:
+        return cpus + 1
+    return cpus * 2 + 1
+
+
+def gunicorn_command(kind):
+    """ Return the command line serving the wsgi or asgi application."""
+    return [
+        sys.executable, '-m', 'gunicorn', f'app.{kind}:application',
+        '-c', f'python:app.gunicorn_{kind}',
+    ]
+
+
+def _kb(line):
+    return int(line.split()[1])
+
+
+def memory_usage(pid='self'):
+    """ Return the memory of a process in kB.
+
+    rss is the resident size, pss the proportional share of it, shared
+    and private the pages shared with other processes (the copy on
+    write pages of a preloaded master) or owned by this one. Only rss
+    is known outside of Linux.
+    """
+    usage = {'rss': 0, 'pss': None, 'shared': None, 'private': None}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as smaps:
+            lines = smaps.readlines()
+    except OSError:
+        if pid == 'self':
+            usage['rss'] = rss_kb()
+        return usage
+    shared = private = 0
+    for line in lines:
+        if line.startswith('Rss:'):
+            usage['rss'] = _kb(line)
+        elif line.startswith('Pss:'):
+            usage['pss'] = _kb(line)
+        elif line.startswith('Shared_'):
+            shared += _kb(line)
+        elif line.startswith('Private_'):
+            private += _kb(line)
+    usage['shared'] = shared
+    usage['private'] = private
+    return usage
+
+
+def rss_kb():
+    """ Return the current resident size of this process in kB."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        # Peak rather than current size; kB on Linux, bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _url_patterns(resolver):
+    for pattern in resolver.url_patterns:
+        if hasattr(pattern, 'url_patterns'):
+            # Namespaced includes keep their own reverse lookups.
+            pattern.reverse_dict
+            yield from _url_patterns(pattern)
+        else:
+            yield pattern
+
+
+def _view_serializers(patterns):
+    from django.http import HttpRequest
+    from rest_framework.request import Request
+
+    seen = set()
+    for pattern in patterns:
+        callback = pattern.callback
+        cls = getattr(callback, 'cls', None)
+        actions = getattr(callback, 'actions', None) or {}
+        if cls is None or not hasattr(cls, 'get_serializer_class'):
+            continue
+        for method, action in actions.items():
+            request = HttpRequest()
+            request.method = method.upper()
+            view = cls(**getattr(callback, 'initkwargs', {}))
+            view.action_map = actions
+            view.action = action
+            view.args, view.kwargs = (), {}
+            view.format_kwarg = None
+            view.request = Request(request)
+            try:
+                serializer_class = view.get_serializer_class()
+            except Exception:
+                continue
+            if (cls, serializer_class) not in seen:
+                seen.add((cls, serializer_class))
+                yield cls, serializer_class
+
+
+def warm_up():
+    """ Build the lazily built state of the api, returns what was done."""
+    from django.apps import apps
+    from django.core.exceptions import ImproperlyConfigured
+    from django.urls import get_resolver
+    from rest_framework.settings import api_settings
+
+    from article.readonly import row_serializer_for
+
+    started = time.perf_counter()
+    for name in API_CLASS_SETTINGS:
+        getattr(api_settings, name)
+    for module in DEFERRED_IMPORTS:
+        import_module(module)
+
+    resolver = get_resolver()
+    resolver.reverse_dict
+    patterns = list(_url_patterns(resolver))
+
+    serializers = set()
+    rows = set()
+    for cls, serializer_class in _view_serializers(patterns):
+        if serializer_class not in serializers:
+            try:
+                # Builds the fields from the model meta caches.
+                serializer_class().fields
+            except Exception:
+                continue
+            serializers.add(serializer_class)
+        if getattr(cls, 'row_serialization', False):
+            try:
+                row_serializer_for(serializer_class)
+            except ImproperlyConfigured:
+                continue
+            rows.add(serializer_class)
+    schema = False
+    if apps.is_installed('drf_spectacular'):
+        from core import schema as schema_cache
+        try:
+            # Read from the pre-rendered files or generated once here.
+            schema_cache.documents()
+            schema = True
+        except Exception:
+            logger.exception('Schema not warmed up')
+    return {
+        'urls': len(patterns),
+        'serializers': len(serializers),
+        'row_serializers': len(rows),
+        'schema': schema,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def _describe(usage):
+    text = f'rss {usage["rss"] / 1024:.1f} MiB'
+    if usage['pss'] is not None:
+        text += (
+            f', pss {usage["pss"] / 1024:.1f} MiB, shared '
+            f'{usage["shared"] / 1024:.1f} MiB, private '
+            f'{usage["private"] / 1024:.1f} MiB'
+        )
+    return text
+
+
+def on_ready(server, boot_started):
+    """ gunicorn when_ready hook: warm a preloaded app, report the boot."""
+    from core import metrics
+
+    metrics.clear_directory()
+    warmed = warm_up() if server.cfg.preload_app else None
+    logger.info(
+        'Booted in %.2fs (%s workers, preload %s), master %s',
+        time.monotonic() - boot_started, server.num_workers,
+        'on' if server.cfg.preload_app else 'off',
+        _describe(memory_usage()),
+    )
+    if warmed:
+        logger.info('Warmed up %s', warmed)
+
+
+def warm_pools():
+    """ Open the minimum connections of every pooled database.
+
+    Returns the aliases warmed. A database that is down is left for the
+    first request to report.
+    """
+    from django.db import DatabaseError, connections
+
+    warmed = []
+    for connection in connections.all():
+        warm_pool = getattr(connection, 'warm_pool', None)
+        if warm_pool is None:
+            continue
+        try:
+            warm_pool()
+        except DatabaseError:
+            logger.exception('Pool of %s not warmed up', connection.alias)
+            continue
+        warmed.append(connection.alias)
+    return warmed
+
+
+def on_worker_init(worker):
+    """ gunicorn post_worker_init hook: warm when not preloaded, report."""
+    if not worker.cfg.preload_app:
+        logger.info('Worker %s warmed up %s', worker.pid, warm_up())
+    pools = warm_pools()
+    if pools:
+        logger.info('Worker %s filled the pools of %s', worker.pid,
+                    ', '.join(pools))
+    worker.rss_limit_hit = False
+    logger.info('Worker %s started, %s', worker.pid,
+                _describe(memory_usage()))
+
+
+def check_memory(worker, max_rss_kb):
+    """ gunicorn post_request hook: recycle a worker past max_rss_kb.
+
+    The worker finishes its current requests and exits; the master
+    forks a fresh one.
+    """
+    if not max_rss_kb or worker.nr % RSS_CHECK_INTERVAL:
+        return
+    rss = rss_kb()
+    if rss > max_rss_kb and worker.alive:
+        worker.rss_limit_hit = True
+        logger.info(
+            'Worker %s recycled at %.1f MiB RSS after %s requests',
+            worker.pid, rss / 1024, worker.nr,
+        )
+        worker.alive = False
+
+
+def on_worker_exit(server, worker):
+    """ gunicorn worker_exit hook: keep the metrics, report the memory."""
+    from core import metrics
+
+    metrics.flush(force=True)
+    logger.info(
+        'Worker %s exiting after %s requests%s, %s', worker.pid,
+        worker.nr,
+        ' (RSS limit)' if getattr(worker, 'rss_limit_hit', False) else '',
+        _describe(memory_usage()),
+    )
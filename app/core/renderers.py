@@ -0,0 +1,81 @@
+"""
+JSON rendering for the api.
+
+FastJSONRenderer renders with orjson when it is installed and the output
+is compact, falling back to DRF's stdlib renderer otherwise (no orjson,
+indented or ASCII only output, values orjson refuses). Types orjson
+does not handle itself (Decimal, lazy strings, datetimes) go through
+DRF's encoder, so both paths produce the same JSON apart from the
+exponent notation of very large or small floats.
+
+stream_json_array() emits a list as chunks for StreamingHttpResponse.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Keep the output a strict javascript subset like JSONRenderer does.
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+_encoder = JSONEncoder()
+
+if orjson is not None:
+    ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+
+def _escape_separators(data):
+    for raw, escaped in LINE_SEPARATORS:
+        if raw in data:
+            data = data.replace(raw, escaped)
+    return data
+
+
+def dumps(data):
+    """ Return data as compact UTF-8 JSON like the api renders it."""
+    if orjson is not None and api_settings.UNICODE_JSON:
+        try:
+            return _escape_separators(
+                orjson.dumps(data, default=_encoder.default,
+                             option=ORJSON_OPTIONS)
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            pass
+    return JSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """ JSONRenderer using orjson for compact output"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+def stream_json_array(chunks):
+    """ Yield a JSON array of the items of chunks (lists of items).
+
+    The concatenated output is the same as rendering the whole list.
+    """
+    yield b'['
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        body = b','.join(dumps(item) for item in chunk)
+        yield body if first else b',' + body
+        first = False
+    yield b']'
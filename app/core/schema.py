@@ -0,0 +1,250 @@
+"""
+Pre-rendered OpenAPI schema.
+
+drf-spectacular builds the schema by introspecting every view and
+serializer, on every request of api/schema/. documents() builds it once
+per code version instead and keeps the YAML and JSON renderings, plain
+and gzipped, in memory. The code version is SCHEMA_CACHE['VERSION'] when
+set (a release tag or commit), otherwise a hash of the project sources,
+the settings module and the versions of the schema libraries.
+
+prerender() writes the renderings to SCHEMA_CACHE['DIRECTORY'], named by
+code version, at image build (the prerender_schema command). A process
+whose code version has files there reads them instead of generating,
+and the prefork warm-up does either in the master before the fork.
+
+CachedSchemaView serves them with an ETag and gzip, falling back to
+SpectacularAPIView for what depends on the request (the lang parameter,
+non public schemas). Like the spectacular command, and unlike
+SpectacularAPIView, the schema is generated without a request, so the
+views see a mock request of each operation's own method.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+DEFAULTS = {
+    'DIRECTORY': None,
+    'VERSION': None,
+}
+
+RENDERERS = {
+    'yaml': OpenApiYamlRenderer,
+    'json': OpenApiJsonRenderer,
+}
+
+# Source directories that do not change the schema.
+SKIPPED_DIRECTORIES = {'tests', 'migrations', '__pycache__'}
+
+FILE_PREFIX = 'openapi-'
+
+_version = None
+_documents = None
+_lock = threading.Lock()
+
+
+def get_setting(name):
+    """ Return a SCHEMA_CACHE setting, falling back to the default."""
+    return getattr(settings, 'SCHEMA_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class Document:
+    """ One rendering of the schema, plain and gzipped, with its ETags"""
+
+    __slots__ = ('body', 'gzipped', 'etag', 'gzip_etag')
+
+    def __init__(self, body, gzipped=None):
+        self.body = body
+        if gzipped is None:
+            # No timestamp, so every build compresses to the same bytes.
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        self.gzipped = gzipped
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+def _sources():
+    base = Path(settings.BASE_DIR)
+    for root, directories, files in os.walk(base):
+        directories[:] = sorted(
+            name for name in directories
+            if name not in SKIPPED_DIRECTORIES and not name.startswith('.')
+        )
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = Path(root, name)
+                yield path.relative_to(base).as_posix(), path
+
+
+def code_version():
+    """ Return the code version the schema is cached by."""
+    global _version
+    if _version is not None:
+        return _version
+    version = get_setting('VERSION')
+    if not version:
+        import django
+        import drf_spectacular
+        import rest_framework
+
+        digest = hashlib.sha256()
+        digest.update(json.dumps([
+            settings.SETTINGS_MODULE,
+            django.__version__,
+            rest_framework.VERSION,
+            drf_spectacular.__version__,
+            getattr(settings, 'SPECTACULAR_SETTINGS', {}),
+        ], default=str, sort_keys=True).encode('utf-8'))
+        for name, path in _sources():
+            digest.update(name.encode('utf-8'))
+            digest.update(path.read_bytes())
+        version = digest.hexdigest()[:16]
+    _version = version
+    return version
+
+
+def schema_path(fmt, directory=None, version=None):
+    """ Return the file of a rendering of the given code version."""
+    directory = directory or get_setting('DIRECTORY')
+    if not directory:
+        return None
+    version = version or code_version()
+    return Path(directory, f'{FILE_PREFIX}{version}.{fmt}')
+
+
+def generate():
+    """ Return the public schema of the project URLconf."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+def render(schema):
+    """ Return {format: Document} of a schema."""
+    return {
+        fmt: Document(renderer().render(schema, renderer.media_type, {}))
+        for fmt, renderer in RENDERERS.items()
+    }
+
+
+def _load(directory=None):
+    rendered = {}
+    for fmt in RENDERERS:
+        path = schema_path(fmt, directory)
+        if path is None:
+            return None
+        try:
+            rendered[fmt] = Document(
+                path.read_bytes(),
+                Path(f'{path}.gz').read_bytes(),
+            )
+        except FileNotFoundError:
+            return None
+    return rendered
+
+
+def documents():
+    """ Return {format: Document} of the current code version.
+
+    Read from the pre-rendered files or generated on first call, once
+    even when concurrent requests ask for it.
+    """
+    global _documents
+    if _documents is None:
+        with _lock:
+            if _documents is None:
+                _documents = _load() or render(generate())
+    return _documents
+
+
+def prerender(directory=None):
+    """ Write the renderings of the current code version.
+
+    Renderings of other versions in the directory are removed. Returns
+    the paths written.
+    """
+    directory = Path(directory or get_setting('DIRECTORY'))
+    directory.mkdir(parents=True, exist_ok=True)
+    rendered = render(generate())
+    written = []
+    for fmt, document in rendered.items():
+        path = schema_path(fmt, directory)
+        path.write_bytes(document.body)
+        Path(f'{path}.gz').write_bytes(document.gzipped)
+        written += [path, Path(f'{path}.gz')]
+    for stale in directory.glob(f'{FILE_PREFIX}*'):
+        if stale not in written:
+            stale.unlink()
+    return written
+
+
+def clear():
+    """ Forget the code version and the renderings held in memory."""
+    global _version, _documents
+    with _lock:
+        _version = None
+        _documents = None
+
+
+def _accepts_gzip(request):
+    return 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """ OpenApi3 schema for this API, served with an ETag and gzip.
+
+    Format can be selected via content negotiation.
+
+    - YAML: application/vnd.oai.openapi
+    - JSON: application/vnd.oai.openapi+json
+    """
+
+    def is_cached(self, request):
+        return (
+            self.serve_public
+            and self.urlconf is None
+            and self.api_version is None
+            and self.generator_class
+            is spectacular_settings.DEFAULT_GENERATOR_CLASS
+            and not (settings.USE_I18N and request.GET.get('lang'))
+        )
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if not self.is_cached(request):
+            return super().get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        document = documents()[renderer.format]
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        if _accepts_gzip(request):
+            response = HttpResponse(
+                document.gzipped, content_type=content_type,
+            )
+            response['Content-Encoding'] = 'gzip'
+            response['ETag'] = document.gzip_etag
+        else:
+            response = HttpResponse(document.body, content_type=content_type)
+            response['ETag'] = document.etag
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+        return get_conditional_response(
+            request, etag=response['ETag'], response=response,
+        ) or response
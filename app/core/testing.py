@@ -0,0 +1,62 @@
+"""
+Shared helpers for api test cases.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountTestMixin:
+    """ Assertions on the number of queries an endpoint runs"""
+
+    page_sizes = (1, 5, 20)
+
+    def count_queries(self, func, *args, **kwargs):
+        """ Call func and return (result, number of queries run)."""
+        with CaptureQueriesContext(connection) as ctx:
+            result = func(*args, **kwargs)
+        return result, len(ctx.captured_queries)
+
+    def assertConstantQueries(self, request, populate, expected=None,
+                              sizes=None):
+        """ Assert request runs the same number of queries at every size.
+
+        populate(n) must add n more rows to the data set the endpoint
+        reads; request() performs the api call and returns the response.
+        """
+        sizes = sizes or self.page_sizes
+        counts = {}
+        created = 0
+        for size in sizes:
+            populate(size - created)
+            created = size
+            res, counts[size] = self.count_queries(request)
+            self.assertLess(res.status_code, 300, res.content)
+
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'Query count grows with page size: {counts}',
+        )
+        if expected is not None:
+            self.assertEqual(counts[sizes[0]], expected, counts)
+        return counts[sizes[0]]
+
+
+class QueryPlanTestMixin:
+    """ Assertions on the plan the database picks for a queryset"""
+
+    def explain(self, queryset):
+        """ Return the EXPLAIN output of queryset as text."""
+        return queryset.explain()
+
+    def assertPlan(self, queryset, contains=None, excludes=None):
+        """ Assert the plan holds or lacks fragments, per vendor.
+
+        contains and excludes map a database vendor to the fragments to
+        look for; vendors without an entry are not checked.
+        """
+        plan = self.explain(queryset)
+        for fragment in (contains or {}).get(connection.vendor, ()):
+            self.assertIn(fragment, plan, plan)
+        for fragment in (excludes or {}).get(connection.vendor, ()):
+            self.assertNotIn(fragment, plan, plan)
+        return plan
@@ -0,0 +1,133 @@
+"""
+Test the async read views of the ASGI application.
+"""
+import asyncio
+import json
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import async_views, metrics
+from core.models import Article, Category
+
+ASGI_URLS = override_settings(ROOT_URLCONF='app.urls_asgi')
+
+
+@ASGI_URLS
+class AsyncViewTests(TransactionTestCase):
+    """ Test the article api served by async views"""
+
+    def setUp(self):
+        # Pool threads hold their own connections.
+        self.addCleanup(async_views.shutdown)
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        token = Token.objects.create(user=self.user)
+        # AsyncClient in Django 3.2 takes extra headers by their name.
+        self.headers = {'authorization': f'Token {token.key}'}
+        self.category = Category.objects.create(user=self.user, name='Shirts')
+        for i in range(3):
+            Article.objects.create(user=self.user, title=f'Article {i}')
+        self.client = AsyncClient()
+
+    def get(self, url, **params):
+        # Django 3.2's AsyncClient drops the data of GET requests.
+        if params:
+            url = f'{url}?{urlencode(params)}'
+
+        async def fetch():
+            return await self.client.get(url, **self.headers)
+        return async_to_sync(fetch)()
+
+    def test_read_routes_are_async(self):
+        """ Test reads of the three viewsets resolve to async views"""
+        for name in ('article-list', 'category-list',
+                     'attributevariants-list'):
+            match = resolve(reverse(f'article:{name}'))
+
+            self.assertTrue(asyncio.iscoroutinefunction(match.func))
+        self.assertFalse(asyncio.iscoroutinefunction(
+            resolve(reverse('article:productlist-list')).func
+        ))
+
+    def test_list_matches_sync_path(self):
+        """ Test the async list renders what the WSGI path renders"""
+        url = reverse('article:article-list')
+        res = self.get(url)
+
+        with override_settings(ROOT_URLCONF='app.urls'):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            cache.clear()
+            expected = client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, expected.content)
+
+    def test_detail_and_category_list(self):
+        """ Test retrieve and the category list through the pool"""
+        article = Article.objects.first()
+
+        res = self.get(reverse('article:article-detail', args=[article.id]))
+        categories = self.get(reverse('article:category-list'))
+
+        self.assertEqual(res.json()['title'], article.title)
+        self.assertEqual(
+            [item['name'] for item in categories.json()['results']],
+            ['Shirts'],
+        )
+
+    def test_concurrent_requests(self):
+        """ Test requests beyond the pool size wait for a thread"""
+        url = reverse('article:article-list')
+
+        async def fetch_all():
+            return await asyncio.gather(*(
+                self.client.get(url, **self.headers) for _ in range(8)
+            ))
+
+        with override_settings(ASYNC_VIEWS={'THREADS': 2}):
+            responses = async_to_sync(fetch_all)()
+
+        self.assertEqual({res.status_code for res in responses}, {200})
+
+    def test_stream_spooled(self):
+        """ Test streaming responses are read in the pool"""
+        res = self.get(reverse('article:article-list'), stream=1)
+
+        with self.assertNumQueries(0):
+            items = json.loads(b''.join(res.streaming_content))
+        self.assertEqual(len(items), 3)
+
+    def test_writes_served(self):
+        """ Test unsafe methods still reach the viewset"""
+        async def post():
+            return await self.client.post(
+                reverse('article:category-list'), {'name': 'Sale'},
+                content_type='application/json', **self.headers,
+            )
+
+        res = async_to_sync(post)()
+
+        # The category viewset has no create action.
+        self.assertEqual(res.status_code, 405)
+
+    def test_metrics_recorded(self):
+        """ Test queries in the pool count toward the request"""
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+        self.get(reverse('article:article-list'))
+
+        entry = metrics.registry.snapshot()[('ArticleViewSet.list', 'GET')]
+        self.assertEqual(entry['count'], 1)
+        self.assertGreater(entry['queries'], 0)
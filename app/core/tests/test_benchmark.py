@@ -0,0 +1,85 @@
+"""
+Test the endpoint benchmark suite.
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.benchmark import compare, percentile
+from core.models import Article
+
+ENDPOINTS = 'article_list,article_detail,token_create'
+
+
+class BenchmarkTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.baseline = os.path.join(self.directory.name, 'baseline.json')
+
+    def run_benchmark(self, *args):
+        call_command(
+            'benchmark', '--scales', '5', '--iterations', '2',
+            '--endpoints', ENDPOINTS, *args, stdout=StringIO(),
+        )
+
+    def test_report_records_every_endpoint(self):
+        """ Test the report has the figures of every endpoint and scale"""
+        self.run_benchmark('--baseline', self.baseline, '--save-baseline')
+
+        with open(self.baseline) as fileobj:
+            report = json.load(fileobj)
+        self.assertEqual(list(report['results']), ['5'])
+        self.assertEqual(
+            sorted(report['results']['5']), sorted(ENDPOINTS.split(',')),
+        )
+        figures = report['results']['5']['article_detail']
+        self.assertEqual(
+            set(figures),
+            {'p50_ms', 'p95_ms', 'mean_ms', 'queries', 'peak_kb'},
+        )
+        self.assertGreater(figures['queries'], 0)
+
+    def test_seeded_rows_rolled_back(self):
+        """ Test every scale leaves the database as it found it"""
+        self.run_benchmark()
+
+        self.assertFalse(Article.objects.exists())
+
+    def test_query_regression_fails(self):
+        """ Test an extra query over the baseline fails the run"""
+        self.run_benchmark('--baseline', self.baseline, '--save-baseline')
+        with open(self.baseline) as fileobj:
+            report = json.load(fileobj)
+        report['results']['5']['article_list']['queries'] -= 1
+        with open(self.baseline, 'w') as fileobj:
+            json.dump(report, fileobj)
+
+        with self.assertRaisesMessage(CommandError, 'article_list at 5'):
+            self.run_benchmark(
+                '--baseline', self.baseline,
+                '--latency-tolerance', '1000', '--memory-tolerance', '1000',
+            )
+
+    def test_compare_within_tolerance(self):
+        """ Test growth inside the tolerance is not a violation"""
+        baseline = {'results': {'5': {'x': {'p95_ms': 10, 'queries': 3}}}}
+        report = {'results': {'5': {'x': {'p95_ms': 12, 'queries': 3}}}}
+
+        self.assertEqual(compare(report, baseline), [])
+        self.assertEqual(
+            len(compare(report, baseline, {'p95_ms': 0.1})), 1,
+        )
+
+    def test_percentile_nearest_rank(self):
+        """ Test percentiles pick the nearest ranked value"""
+        values = list(range(1, 21))
+
+        self.assertEqual(percentile(values, 0.5), 10)
+        self.assertEqual(percentile(values, 0.95), 19)
@@ -0,0 +1,304 @@
+"""
+Test the Redis protocol cache layer.
+"""
+import io
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import singleflight
+from core.cache.backend import RedisCache, cache_stats
+from core.cache.memory import MemoryServer, MemoryStore
+from core.cache.resp import (
+    RedisClient,
+    ResponseError,
+    encode_command,
+    encode_reply,
+    read_reply,
+)
+from core.cache.versions import bump_version, get_version
+from core.metrics import render_prometheus
+
+
+class RespTests(SimpleTestCase):
+    """ Test the protocol encoding"""
+
+    def test_replies_round_trip(self):
+        """ Test every reply type reads back as it was encoded"""
+        replies = [b'value', b'', None, 42, -1, [b'a', None, 3, [b'b']]]
+
+        stream = io.BytesIO(b''.join(encode_reply(r) for r in replies))
+
+        self.assertEqual([read_reply(stream) for _ in replies], replies)
+
+    def test_error_reply_returned(self):
+        """ Test error replies are returned for the caller to raise"""
+        stream = io.BytesIO(encode_reply(ResponseError('ERR broken')))
+
+        error = read_reply(stream)
+
+        self.assertIsInstance(error, ResponseError)
+        self.assertEqual(str(error), 'ERR broken')
+
+    def test_command_is_array_of_bulk_strings(self):
+        """ Test commands are sent as Redis expects them"""
+        self.assertEqual(
+            encode_command('SET', 'key', 10),
+            b'*3\r\n$3\r\nSET\r\n$3\r\nkey\r\n$2\r\n10\r\n',
+        )
+
+    def test_closed_connection(self):
+        """ Test a truncated reply is a connection error"""
+        with self.assertRaises(ConnectionError):
+            read_reply(io.BytesIO(b'$5\r\nab'))
+
+
+class MemoryStoreTests(SimpleTestCase):
+    """ Test the in-process Redis stand-in"""
+
+    def setUp(self):
+        self.store = MemoryStore(max_entries=3)
+
+    def test_set_conditions(self):
+        """ Test SET NX and XX only write missing or existing keys"""
+        self.assertEqual(self.store.execute('SET', 'a', 1, 'NX'), b'OK')
+        self.assertIsNone(self.store.execute('SET', 'a', 2, 'NX'))
+        self.assertIsNone(self.store.execute('SET', 'b', 2, 'XX'))
+
+        self.assertEqual(self.store.execute('MGET', 'a', 'b'), [b'1', None])
+
+    def test_expiry(self):
+        """ Test keys expire after their PX"""
+        now = time.monotonic()
+        with mock.patch('core.cache.memory.time.monotonic') as monotonic:
+            monotonic.return_value = now
+            self.store.execute('SET', 'a', 'x', 'PX', 1500)
+            self.assertEqual(self.store.execute('PTTL', 'a'), 1500)
+
+            monotonic.return_value = now + 2
+            self.assertIsNone(self.store.execute('GET', 'a'))
+            self.assertEqual(self.store.execute('PTTL', 'a'), -2)
+
+    def test_incrby(self):
+        """ Test INCRBY counts from 0 and refuses non integers"""
+        self.assertEqual(self.store.execute('INCRBY', 'n', 5), 5)
+        self.assertEqual(self.store.execute('INCRBY', 'n', -2), 3)
+        self.store.execute('SET', 's', 'text')
+
+        with self.assertRaises(ResponseError):
+            self.store.execute('INCRBY', 's', 1)
+
+    def test_least_recently_used_evicted(self):
+        """ Test entries past max_entries are evicted by last use"""
+        for key in 'abc':
+            self.store.execute('SET', key, key)
+        self.store.execute('GET', 'a')
+
+        self.store.execute('SET', 'd', 'd')
+
+        self.assertEqual(self.store.execute('EXISTS', 'a', 'b', 'c', 'd'), 3)
+        self.assertIsNone(self.store.execute('GET', 'b'))
+
+    def test_unknown_command(self):
+        """ Test commands outside the subset are errors, as in Redis"""
+        with self.assertRaises(ResponseError):
+            self.store.execute('KEYS', '*')
+        with self.assertRaises(ResponseError):
+            self.store.execute('GET')
+
+
+class RedisCacheTests(SimpleTestCase):
+    """ Test the backend over the Redis protocol"""
+
+    def setUp(self):
+        self.server = MemoryServer(('127.0.0.1', 0))
+        thread = threading.Thread(
+            target=self.server.serve_forever, args=(0.05,),
+        )
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        host, port = self.server.server_address
+        self.cache = RedisCache(f'redis://{host}:{port}/1', {
+            'KEY_PREFIX': 'test',
+        })
+
+    def tearDown(self):
+        self.cache._client.close()
+
+    def test_values_round_trip(self):
+        """ Test values are stored with their types"""
+        self.cache.set('dict', {'a': [1, 2]})
+        self.cache.set('int', 7)
+        self.cache.set_many({'x': 'x', 'y': b'y'})
+
+        self.assertEqual(self.cache.get('dict'), {'a': [1, 2]})
+        self.assertEqual(self.cache.get('int'), 7)
+        self.assertEqual(
+            self.cache.get_many(['x', 'y', 'z']), {'x': 'x', 'y': b'y'},
+        )
+        self.assertEqual(self.cache.get('z', 'default'), 'default')
+        self.assertEqual(self.server.store.execute('GET', 'test:1:int'), b'7')
+
+    def test_add_and_incr(self):
+        """ Test add only writes missing keys and incr needs the key"""
+        self.assertTrue(self.cache.add('n', 1))
+        self.assertFalse(self.cache.add('n', 5))
+
+        self.assertEqual(self.cache.incr('n', 10), 11)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.assertNotIn('missing', self.cache)
+
+    def test_timeouts(self):
+        """ Test timeouts become PX and 0 deletes"""
+        self.cache.set('a', 'a', 30)
+        self.cache.set('b', 'b', None)
+        self.cache.set('c', 'c', 0)
+
+        self.assertAlmostEqual(
+            self.server.store.execute('PTTL', 'test:1:a'), 30000, delta=1000,
+        )
+        self.assertEqual(self.server.store.execute('PTTL', 'test:1:b'), -1)
+        self.assertIsNone(self.cache.get('c'))
+        self.assertTrue(self.cache.touch('a', None))
+        self.assertEqual(self.server.store.execute('PTTL', 'test:1:a'), -1)
+        self.assertFalse(self.cache.touch('missing', 10))
+
+    def test_delete_and_clear(self):
+        """ Test keys are deleted one, many or all at once"""
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+
+        self.assertTrue(self.cache.delete('a'))
+        self.cache.delete_many(['b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': 3})
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('c'))
+
+    def test_socket_closed_by_server_retried(self):
+        """ Test a pooled socket that broke while idle is replaced"""
+        self.cache.set('a', 1)
+        idle = self.cache._client._idle[0]
+        idle.sock.close()
+
+        self.assertEqual(self.cache.get('a'), 1)
+
+    def test_unreachable_server(self):
+        """ Test an unreachable server is an error, not a miss"""
+        client = RedisClient(
+            '127.0.0.1', self.server.server_address[1], socket_timeout=1,
+        )
+        self.server.server_close()
+
+        with self.assertRaises(ConnectionError):
+            client.execute('GET', 'a')
+
+
+class VersionTests(SimpleTestCase):
+    """ Test counter versions"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version_moves_on(self):
+        """ Test a bump changes the version and leaves others alone"""
+        first = get_version('a:version')
+        other = get_version('b:version')
+
+        bump_version('a:version')
+
+        self.assertEqual(get_version('a:version'), first + 1)
+        self.assertEqual(get_version('b:version'), other)
+
+    def test_lost_version_not_reused(self):
+        """ Test a version lost from the cache restarts from the clock"""
+        bump_version('a:version')
+        used = get_version('a:version')
+        cache.delete('a:version')
+
+        self.assertGreater(get_version('a:version'), used)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """ Test stampede protection"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        """ Test threads missing the same key compute it once"""
+        calls = []
+        barrier = threading.Barrier(5)
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        def request():
+            barrier.wait()
+            results.append(singleflight.get_or_compute('page', compute, 60))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+        self.assertNotIn('page:lock', cache)
+
+    def test_none_not_cached(self):
+        """ Test a None result is computed again next time"""
+        compute = mock.Mock(return_value=None)
+
+        singleflight.get_or_compute('missing', compute)
+        singleflight.get_or_compute('missing', compute)
+
+        self.assertEqual(compute.call_count, 2)
+
+    @override_settings(CACHE_LAYER={'WAIT_TIMEOUT': 0.05})
+    def test_waiter_computes_after_timeout(self):
+        """ Test a waiter stops waiting for a stuck lock holder"""
+        cache.add('slow:lock', 1, 60)
+
+        value = singleflight.get_or_compute('slow', lambda: 'mine')
+
+        self.assertEqual(value, 'mine')
+
+
+class HitRatioTests(SimpleTestCase):
+    """ Test hit and miss counting"""
+
+    def test_counted_per_namespace(self):
+        """ Test lookups are counted under the key namespace"""
+        before = cache_stats()['default']['namespaces'].get(
+            'ratio-test', {'hits': 0, 'misses': 0},
+        )
+        cache.set('ratio-test:a', 1)
+
+        cache.get('ratio-test:a')
+        cache.get_many(['ratio-test:a', 'ratio-test:b'])
+
+        counts = cache_stats()['default']['namespaces']['ratio-test']
+        self.assertEqual(counts['hits'] - before['hits'], 2)
+        self.assertEqual(counts['misses'] - before['misses'], 1)
+
+    def test_prometheus(self):
+        """ Test the counts and the ratio are exposed"""
+        cache.get('ratio-test:missing')
+
+        body = render_prometheus()
+
+        self.assertIn('# TYPE cache_hits_total counter', body)
+        self.assertIn(
+            'cache_misses_total{alias="default",namespace="ratio-test"}', body,
+        )
+        self.assertIn('cache_hit_ratio{alias="default"}', body)
+        self.assertIn('cache_single_flight_computes_total', body)
@@ -0,0 +1,99 @@
+"""
+Test the startup import profile and the api only settings.
+"""
+import importlib
+import os
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import NoReverseMatch, reverse
+
+from rest_framework.test import APIClient
+
+from core import importtime
+
+SAMPLE = '''\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _abc
+import time:       300 |        420 |   abc
+import time:        50 |         50 |   django.utils
+import time:      1000 |       1470 | django
+import time:       200 |        200 | article.views
+'''
+
+
+class ParseTests(SimpleTestCase):
+    """ Test reading -X importtime output"""
+
+    def test_modules_and_importers(self):
+        """ Test every module is read with the module importing it"""
+        modules = {m.name: m for m in importtime.parse_importtime(SAMPLE)}
+
+        self.assertEqual(set(modules), {
+            '_abc', 'abc', 'django.utils', 'django', 'article.views',
+        })
+        self.assertEqual(modules['_abc'].imported_by, 'abc')
+        self.assertEqual(modules['abc'].imported_by, 'django')
+        self.assertEqual(modules['django.utils'].imported_by, 'django')
+        self.assertIsNone(modules['django'].imported_by)
+        self.assertEqual(modules['django'].cumulative_us, 1470)
+
+    def test_by_package(self):
+        """ Test self times add up per top level package"""
+        packages = importtime.by_package(importtime.parse_importtime(SAMPLE))
+
+        self.assertEqual(packages[0], ('django', 1050, 2))
+        self.assertIn(('article', 200, 1), packages)
+
+
+class ProfileStartupTests(SimpleTestCase):
+    """ Test profiling a real boot"""
+
+    def test_profile_current_settings(self):
+        """ Test a boot of the current settings is profiled"""
+        report = importtime.profile_startup(
+            os.environ['DJANGO_SETTINGS_MODULE'], urls=False, repeat=1,
+        )
+
+        names = {module.name for module in report['modules']}
+        self.assertIn('django', names)
+        self.assertIn('django.db.models', names)
+        self.assertGreater(report['boot_ms'], 0)
+
+    def test_broken_settings_reported(self):
+        """ Test a settings module that cannot boot is a command error"""
+        with self.assertRaises(CommandError):
+            call_command(
+                'profile_startup', '--profiles', 'app.missing_settings',
+                '--repeat', '1', stdout=StringIO(),
+            )
+
+
+class ApiSettingsTests(TestCase):
+    """ Test the api only settings profile"""
+
+    def test_excludes_admin_and_schema(self):
+        """ Test the slim profile leaves out admin, schema and forms"""
+        slim = importlib.import_module('app.settings_api')
+
+        for app in slim.EXCLUDED_APPS:
+            self.assertNotIn(app, slim.INSTALLED_APPS)
+        self.assertEqual(slim.ROOT_URLCONF, 'app.urls_api')
+        self.assertEqual(slim.TEMPLATES, [])
+
+    @override_settings(ROOT_URLCONF='app.urls_api')
+    def test_api_urls_serve_articles(self):
+        """ Test the api URLconf serves the api and nothing else"""
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        ))
+
+        res = client.get(reverse('article:article-list'))
+
+        self.assertEqual(res.status_code, 200)
+        with self.assertRaises(NoReverseMatch):
+            reverse('api-schema')
@@ -0,0 +1,78 @@
+"""
+Test the concurrency benchmark client.
+"""
+import asyncio
+
+from django.test import SimpleTestCase
+
+from core import loadtest
+
+BODY = b'{"ok":true}'
+
+
+async def _serve(reader, writer, chunked):
+    try:
+        while True:
+            request = await reader.readuntil(b'\r\n\r\n')
+            if not request:
+                return
+            if chunked:
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+                    b'4\r\n{"ok\r\n7\r\n":true}\r\n0\r\n\r\n'
+                )
+            else:
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s'
+                    % (len(BODY), BODY)
+                )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+class LoadTests(SimpleTestCase):
+    """ Test run_load against a minimal keep-alive server"""
+
+    def run_against(self, chunked=False):
+        async def main():
+            server = await asyncio.start_server(
+                lambda r, w: _serve(r, w, chunked), '127.0.0.1', 0,
+            )
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await loadtest.run_load(
+                    f'http://127.0.0.1:{port}', ['/a/', '/b/'], 5, 0.3,
+                )
+        return asyncio.run(main())
+
+    def test_requests_counted(self):
+        """ Test responses are counted with their latency"""
+        result = self.run_against()
+
+        self.assertGreater(result['requests'], 0)
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(result['non_2xx'], 0)
+        self.assertEqual(result['concurrency'], 5)
+        self.assertEqual(result['bytes'], result['requests'] * len(BODY))
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_chunked_responses(self):
+        """ Test chunked bodies are read to the end"""
+        result = self.run_against(chunked=True)
+
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(result['bytes'], result['requests'] * len(BODY))
+
+    def test_server_command(self):
+        """ Test WSGI threads select gthread workers"""
+        command = loadtest.server_command(loadtest.WSGI, 8101, 2, threads=4)
+
+        self.assertIn('app.wsgi:application', command)
+        self.assertIn('gthread', command)
+        self.assertNotIn(
+            '--worker-class',
+            loadtest.server_command(loadtest.ASGI, 8102, 2),
+        )
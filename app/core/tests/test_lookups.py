@@ -0,0 +1,59 @@
+"""
+Tests for the trigram lookups.
+"""
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.test import TestCase
+
+from core.models import AttributeVariants
+
+
+class TrigramContainsTests(TestCase):
+    """ Test trigram_contains on and off PostgreSQL"""
+
+    def test_falls_back_to_icontains(self):
+        """ Test the lookup filters like icontains on other databases"""
+        AttributeVariants.objects.create(type='Color', name='Dark Red')
+        AttributeVariants.objects.create(type='Color', name='Blue')
+        AttributeVariants.objects.create(type='Size', name='100%')
+
+        names = AttributeVariants.objects.filter(
+            name__trigram_contains='red',
+        ).values_list('name', flat=True)
+        percent = AttributeVariants.objects.filter(
+            name__trigram_contains='%',
+        ).values_list('name', flat=True)
+
+        self.assertEqual(list(names), ['Dark Red'])
+        self.assertEqual(list(percent), ['100%'])
+
+    def test_compiles_to_ilike_on_postgresql(self):
+        """ Test PostgreSQL gets a plain column ILIKE a trigram index serves"""
+        postgres = DatabaseWrapper({
+            **connection.settings_dict, 'NAME': 'unused', 'OPTIONS': {},
+        })
+        queryset = AttributeVariants.objects.filter(
+            name__trigram_contains='50%',
+        )
+
+        sql, params = queryset.query.get_compiler(
+            connection=postgres,
+        ).as_sql()
+
+        self.assertIn('"core_attributevariants"."name" ILIKE %s', sql)
+        self.assertNotIn('UPPER', sql)
+        self.assertEqual(params[-1], '%50\\%%')
+
+    def test_explain_command(self):
+        """ Test the plan comparison runs on any database"""
+        out = StringIO()
+
+        call_command('explain_trigram', 'red', '--json', stdout=out)
+
+        results = json.loads(out.getvalue())
+        self.assertEqual(len(results), 4)
+        self.assertIn('before', results[0])
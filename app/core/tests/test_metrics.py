@@ -0,0 +1,171 @@
+"""
+Test the request metrics middleware and endpoints.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics, prefork
+from core.models import Article
+from user.authentication import token_cache
+
+ARTICLES_URL = reverse('article:article-list')
+METRICS_URL = reverse('core:metrics')
+SLOW_URL = reverse('core:slow-requests')
+
+ALWAYS_SAMPLE = {'SAMPLE_RATE': 1, 'SLOW_REQUEST_MS': 0}
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        Article.objects.create(user=self.user, title='Shirt')
+
+    def test_request_recorded_per_view_action(self):
+        """ Test requests are labelled with the viewset action"""
+        res = self.client.get(ARTICLES_URL)
+
+        entry = metrics.registry.snapshot()[('ArticleViewSet.list', 'GET')]
+        self.assertEqual(entry['count'], 1)
+        self.assertEqual(entry['statuses'], {200: 1})
+        self.assertGreater(entry['queries'], 0)
+        self.assertGreater(entry['query_seconds'], 0)
+        self.assertGreater(entry['serializer_seconds'], 0)
+        self.assertEqual(entry['response_bytes'], len(res.content))
+
+    def test_prometheus_exposition(self):
+        """ Test the metrics endpoint renders the Prometheus format"""
+        self.client.get(ARTICLES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res['Content-Type'], metrics.CONTENT_TYPE)
+        body = res.content.decode()
+        self.assertIn(
+            'http_requests_total{view="ArticleViewSet.list",method="GET",'
+            'status="200"} 1', body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{view="ArticleViewSet.list",'
+            'method="GET",le="+Inf"} 1', body,
+        )
+        self.assertIn('# TYPE token_cache_hits_total counter', body)
+
+    @override_settings(METRICS={'TOKEN': 'secret'})
+    def test_metrics_token_required(self):
+        """ Test a configured token protects the endpoint"""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(METRICS={**ALWAYS_SAMPLE, 'TOKEN': 'secret'})
+    def test_slow_request_captured(self):
+        """ Test sampled slow requests keep their SQL and profile"""
+        with self.assertLogs('core.metrics', 'WARNING'):
+            self.client.get(ARTICLES_URL)
+
+        sample = metrics.registry.slow_requests()[0]
+        self.assertEqual(sample['view'], 'ArticleViewSet.list')
+        self.assertEqual(len(sample['sql']), sample['queries'])
+        self.assertIn('core_article', sample['sql'][-1]['sql'])
+        self.assertIn('cumulative', sample['profile'])
+
+        with self.assertLogs('core.metrics', 'WARNING'):
+            forbidden = self.client.get(SLOW_URL)
+            res = self.client.get(SLOW_URL, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(forbidden.status_code, 403)
+        self.assertEqual(res.json()['results'][0]['path'], ARTICLES_URL)
+
+    @override_settings(METRICS={'SAMPLE_RATE': 0, 'SLOW_REQUEST_MS': 0})
+    def test_unsampled_requests_not_captured(self):
+        """ Test slow requests outside the sample only count as slow"""
+        self.client.get(ARTICLES_URL)
+
+        entry = metrics.registry.snapshot()[('ArticleViewSet.list', 'GET')]
+        self.assertEqual(entry['slow'], 1)
+        self.assertEqual(metrics.registry.slow_requests(), [])
+
+
+def exited_pid():
+    """ Return the pid of a process that has exited."""
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+class SharedMetricsTests(TestCase):
+    """ Test adding up the metrics of the workers of a server"""
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = self.settings(METRICS={'DIRECTORY': self.directory})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def write_worker(self, figures):
+        path = os.path.join(self.directory, f'metrics-{figures["pid"]}.json')
+        with open(path, 'w') as fileobj:
+            json.dump(figures, fileobj)
+
+    def test_scrape_adds_up_workers(self):
+        """ Test any worker answers with the counts of all of them"""
+        self.client.get(ARTICLES_URL)
+        other = metrics.process_figures()
+        other['pid'] = exited_pid()
+        other['token_cache']['size'] += 5
+        self.write_worker(other)
+
+        body = self.client.get(METRICS_URL).content.decode()
+
+        self.assertIn(
+            'http_requests_total{view="ArticleViewSet.list",method="GET",'
+            'status="200"} 2', body,
+        )
+        # Gauges of exited workers are left out.
+        self.assertIn(
+            f'token_cache_size {token_cache.stats()["size"]}\n', body,
+        )
+
+    def test_worker_exit_keeps_counts(self):
+        """ Test an exiting worker writes its figures for later scrapes"""
+        self.client.get(ARTICLES_URL)
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+
+        prefork.on_worker_exit(None, mock.Mock(pid=1, nr=1))
+
+        with open(path) as fileobj:
+            figures = json.load(fileobj)
+        self.assertEqual(
+            figures['views'][0][:2], ['ArticleViewSet.list', 'GET'],
+        )
+        metrics.clear_directory()
+        self.assertEqual(os.listdir(self.directory), [])
@@ -0,0 +1,135 @@
+"""
+Tests for the in-process connection pool.
+"""
+import threading
+from unittest.mock import patch
+
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase
+
+from core.db import pool as pool_module
+from core.db.backends.pooled_postgresql.base import DatabaseWrapper
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    isolation_level = None
+
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """ Test checkout, reuse, health checks and metrics"""
+
+    def make_pool(self, **kwargs):
+        self.opened = []
+
+        def connect():
+            conn = FakeConnection()
+            self.opened.append(conn)
+            return conn
+        return ConnectionPool(connect, **kwargs)
+
+    def test_connections_are_reused(self):
+        """ Test a returned connection is handed out again"""
+        pool = self.make_pool(max_size=2)
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(len(self.opened), 1)
+        stats = pool.stats()
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_checkout_times_out_when_exhausted(self):
+        """ Test waiting for a full pool raises and is counted"""
+        pool = self.make_pool(max_size=1, timeout=0.01)
+        pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        """ Test a blocked checkout resumes when a connection is returned"""
+        pool = self.make_pool(max_size=1, timeout=5)
+        conn = pool.getconn()
+        timer = threading.Timer(0.05, pool.putconn, args=(conn,))
+        timer.start()
+
+        self.assertIs(pool.getconn(), conn)
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['max_wait_seconds'], 0)
+
+    def test_failed_health_check_replaces_connection(self):
+        """ Test a stale connection that fails its check is discarded"""
+        def check(conn):
+            raise OperationalError('server closed the connection')
+        pool = self.make_pool(check=check, health_check_interval=0)
+        stale = pool.getconn()
+        pool.putconn(stale)
+
+        fresh = pool.getconn()
+
+        self.assertIsNot(fresh, stale)
+        self.assertTrue(stale.closed)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_closed_connection_is_not_pooled(self):
+        """ Test a connection closed by the server is dropped on return"""
+        pool = self.make_pool()
+        conn = pool.getconn()
+        conn.close()
+        pool.putconn(conn)
+
+        self.assertEqual(pool.stats()['idle'], 0)
+        self.assertIsNot(pool.getconn(), conn)
+
+    def test_fill_opens_min_size(self):
+        """ Test warming the pool opens min_size idle connections"""
+        pool = self.make_pool(min_size=3, max_size=5)
+        pool.fill()
+
+        self.assertEqual(pool.stats()['idle'], 3)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """ Test the pooled postgresql backend"""
+
+    def setUp(self):
+        self.settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': 'core.db.backends.pooled_postgresql',
+            'NAME': 'pooled',
+            'OPTIONS': {},
+            'POOL': {'MAX_SIZE': 1, 'TIMEOUT': 0.01},
+        }
+        self.addCleanup(pool_module.close_pool, 'pooled-test')
+
+    @patch('core.db.backends.pooled_postgresql.base._reset')
+    @patch('core.db.backends.pooled_postgresql.base._connect')
+    def test_close_returns_connection_to_pool(self, connect, reset):
+        """ Test closing a wrapper checks its connection back in"""
+        connect.side_effect = lambda params, options: FakeConnection()
+        first = DatabaseWrapper(self.settings_dict, alias='pooled-test')
+        second = DatabaseWrapper(self.settings_dict, alias='pooled-test')
+        params = first.get_connection_params()
+
+        first.connection = first.get_new_connection(params)
+        with self.assertRaises(OperationalError):
+            second.get_new_connection(params)
+        first._close()
+        second.connection = second.get_new_connection(params)
+
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(
+            pool_module.pool_stats()['pooled-test']['timeouts'], 1
+        )
@@ -0,0 +1,170 @@
+"""
+Test the prefork server support and the serve command.
+"""
+import os
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+
+from article.readonly import row_serializer_for
+from core import prefork
+
+SHARED_CACHES = {'default': {
+    'BACKEND': 'core.cache.backend.RedisCache',
+    'LOCATION': 'redis://cache:6379/0',
+}}
+LOCAL_CACHES = {'default': {
+    'BACKEND': 'core.cache.backend.RedisCache',
+    'LOCATION': 'memory://',
+}}
+
+
+class WarmUpTests(TestCase):
+    """ Test warming up the app before forking"""
+
+    def test_warm_up_without_queries(self):
+        """ Test resolvers and serializers are built without the database"""
+        row_serializer_for.cache_clear()
+
+        with self.assertNumQueries(0):
+            warmed = prefork.warm_up()
+
+        self.assertGreater(warmed['urls'], 0)
+        self.assertGreater(warmed['serializers'], 0)
+        self.assertEqual(
+            row_serializer_for.cache_info().currsize,
+            warmed['row_serializers'],
+        )
+        self.assertGreater(warmed['row_serializers'], 0)
+        self.assertTrue(warmed['schema'])
+
+    def test_memory_usage(self):
+        """ Test the memory of this process is reported"""
+        usage = prefork.memory_usage()
+
+        self.assertGreater(usage['rss'], 0)
+        self.assertGreater(prefork.rss_kb(), 0)
+
+
+class WarmPoolTests(TestCase):
+    """ Test filling the connection pools of a worker"""
+
+    def worker(self):
+        return SimpleNamespace(pid=1, cfg=SimpleNamespace(preload_app=True))
+
+    def test_pooled_databases_filled(self):
+        """ Test each worker opens the connections of its own pools"""
+        pooled = mock.Mock(alias='pooled')
+        plain = mock.Mock(spec=['alias'], alias='default')
+
+        with mock.patch('django.db.connections.all',
+                        return_value=[plain, pooled]):
+            prefork.on_worker_init(self.worker())
+
+        pooled.warm_pool.assert_called_once_with()
+
+    def test_unavailable_database_left_cold(self):
+        """ Test a database that is down does not stop the worker"""
+        pooled = mock.Mock(alias='pooled')
+        pooled.warm_pool.side_effect = OperationalError('down')
+
+        with mock.patch('django.db.connections.all', return_value=[pooled]):
+            with self.assertLogs('gunicorn.error', 'ERROR'):
+                self.assertEqual(prefork.warm_pools(), [])
+
+
+class RecycleTests(TestCase):
+    """ Test recycling workers by RSS"""
+
+    def worker(self, nr):
+        return SimpleNamespace(nr=nr, alive=True, pid=1)
+
+    def test_recycled_above_limit(self):
+        """ Test a worker past the limit stops after its request"""
+        worker = self.worker(prefork.RSS_CHECK_INTERVAL)
+
+        prefork.check_memory(worker, 1)
+
+        self.assertFalse(worker.alive)
+        self.assertTrue(worker.rss_limit_hit)
+
+    def test_checked_every_interval(self):
+        """ Test RSS is only read every RSS_CHECK_INTERVAL requests"""
+        worker = self.worker(prefork.RSS_CHECK_INTERVAL + 1)
+
+        with mock.patch.object(prefork, 'rss_kb') as rss_kb:
+            prefork.check_memory(worker, 1)
+
+        rss_kb.assert_not_called()
+        self.assertTrue(worker.alive)
+
+    def test_limit_disabled(self):
+        """ Test a limit of 0 never recycles"""
+        worker = self.worker(prefork.RSS_CHECK_INTERVAL)
+
+        prefork.check_memory(worker, 0)
+
+        self.assertTrue(worker.alive)
+
+
+@mock.patch('core.management.commands.serve.os.execvpe')
+@mock.patch(
+    'core.management.commands.serve.importlib.util.find_spec',
+    return_value=object(),
+)
+@override_settings(CACHES=SHARED_CACHES)
+class ServeCommandTests(TestCase):
+    """ Test the serve command starts gunicorn"""
+
+    def test_wsgi_options(self, find_spec, execvpe):
+        """ Test options reach the gunicorn config environment"""
+        call_command(
+            'serve', '--workers', '3', '--max-rss-mb', '256', '--no-preload',
+            stdout=mock.Mock(),
+        )
+
+        command, args, env = execvpe.call_args[0]
+        self.assertIn('app.wsgi:application', args)
+        self.assertIn('python:app.gunicorn_wsgi', args)
+        self.assertEqual(env['GUNICORN_WORKERS'], '3')
+        self.assertEqual(env['GUNICORN_MAX_RSS_MB'], '256')
+        self.assertEqual(env['GUNICORN_PRELOAD'], '0')
+
+    def test_asgi(self, find_spec, execvpe):
+        """ Test --asgi serves the ASGI application"""
+        call_command('serve', '--asgi', stdout=mock.Mock())
+
+        args = execvpe.call_args[0][1]
+        self.assertIn('app.asgi:application', args)
+        self.assertIn('python:app.gunicorn_asgi', args)
+
+    def test_gunicorn_missing(self, find_spec, execvpe):
+        """ Test a clear error without gunicorn"""
+        find_spec.return_value = None
+
+        with self.assertRaises(CommandError):
+            call_command('serve', stdout=mock.Mock())
+        execvpe.assert_not_called()
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_process_local_cache_starts_one_worker(self, find_spec, execvpe):
+        """ Test a memory:// cache is not split between workers"""
+        stderr = StringIO()
+
+        with mock.patch.dict(os.environ, {'GUNICORN_WORKERS': ''}):
+            call_command('serve', stdout=mock.Mock(), stderr=stderr)
+
+        self.assertEqual(execvpe.call_args[0][2]['GUNICORN_WORKERS'], '1')
+        self.assertIn('memory://', stderr.getvalue())
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_process_local_cache_refuses_workers(self, find_spec, execvpe):
+        """ Test asking for several workers needs a shared cache"""
+        with self.assertRaises(CommandError):
+            call_command('serve', '--workers', '3', stdout=mock.Mock())
+        execvpe.assert_not_called()
@@ -0,0 +1,75 @@
+"""
+Test the api JSON renderers.
+"""
+import datetime
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.renderers import FastJSONRenderer, stream_json_array
+
+PAYLOAD = OrderedDict([
+    ('id', 1),
+    ('title', 'Röd tröja \u2028 "quoted" \u2029'),
+    ('price', Decimal('12.50')),
+    ('rank', 0.25),
+    ('created', datetime.datetime(
+        2021, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc,
+    )),
+    ('day', datetime.date(2021, 5, 1)),
+    ('key', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('label', gettext_lazy('Invalid cursor')),
+    ('image', 'http://testserver/static/media/uploads/a.jpg'),
+    ('counts', {1: 2}),
+    ('tags', ('a', None, True)),
+    ('nested', [OrderedDict([('id', 2), ('name', 'L')])]),
+])
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_same_bytes_as_json_renderer(self):
+        """ Test orjson output matches the stdlib renderer"""
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD),
+        )
+
+    def test_line_separators_escaped(self):
+        """ Test U+2028 and U+2029 are escaped"""
+        body = FastJSONRenderer().render({'text': '\u2028\u2029'})
+
+        self.assertEqual(body, b'{"text":"\\u2028\\u2029"}')
+
+    def test_without_orjson(self):
+        """ Test the renderer falls back to the stdlib"""
+        with mock.patch.object(renderers, 'orjson', None):
+            body = FastJSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(body, JSONRenderer().render(PAYLOAD))
+
+    def test_indented_output(self):
+        """ Test indented output is rendered by the stdlib"""
+        body = FastJSONRenderer().render(
+            PAYLOAD, 'application/json; indent=4',
+        )
+
+        self.assertEqual(
+            body, JSONRenderer().render(PAYLOAD, 'application/json; indent=4'),
+        )
+
+    def test_stream_matches_rendered_list(self):
+        """ Test streamed chunks concatenate to the rendered list"""
+        items = [{'id': i, 'price': Decimal(i)} for i in range(5)]
+
+        body = b''.join(stream_json_array([items[:2], [], items[2:]]))
+
+        self.assertEqual(body, JSONRenderer().render(items))
+        self.assertEqual(b''.join(stream_json_array([])), b'[]')
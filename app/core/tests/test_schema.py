@@ -0,0 +1,154 @@
+"""
+Test the pre-rendered OpenAPI schema.
+"""
+import gzip
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import schema
+
+SCHEMA_URL = reverse('api-schema')
+
+JSON = 'application/vnd.oai.openapi+json'
+
+
+class SchemaCacheTestCase(TestCase):
+    """ Run with an empty schema directory and no schema in memory"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(SCHEMA_CACHE={
+            'DIRECTORY': directory.name, 'VERSION': None,
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schema.clear()
+        self.addCleanup(schema.clear)
+
+
+class CachedSchemaViewTests(SchemaCacheTestCase):
+    """ Test serving the schema from memory"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_generated_once(self):
+        """ Test the schema is generated on the first request only"""
+        with mock.patch.object(
+            schema, 'generate', wraps=schema.generate,
+        ) as generate:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL, HTTP_ACCEPT=JSON)
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['Content-Type'].startswith(
+            'application/vnd.oai.openapi'
+        ))
+        self.assertIn(b'openapi:', first.content)
+        self.assertEqual(second['Content-Type'], JSON)
+        self.assertIn(
+            '/api/article/articles/', json.loads(second.content)['paths'],
+        )
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_matches_spectacular_command(self):
+        """ Test the cached schema is the one the spectacular command writes"""
+        path = self.directory / 'spectacular.json'
+        call_command(
+            'spectacular', '--format', 'openapi-json', '--file', str(path),
+        )
+
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT=JSON)
+
+        self.assertEqual(
+            json.loads(res.content), json.loads(path.read_bytes()),
+        )
+
+    def test_lang_generated(self):
+        """ Test a translated schema is generated for the request"""
+        with mock.patch.object(schema, 'documents') as documents:
+            res = self.client.get(SCHEMA_URL, {'lang': 'en-us'})
+
+        documents.assert_not_called()
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(res.has_header('ETag'))
+
+    def test_not_modified(self):
+        """ Test a matching If-None-Match gets a 304"""
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+
+    def test_gzip(self):
+        """ Test clients accepting gzip get the compressed schema"""
+        plain = self.client.get(SCHEMA_URL, HTTP_ACCEPT=JSON)
+
+        res = self.client.get(
+            SCHEMA_URL, HTTP_ACCEPT=JSON, HTTP_ACCEPT_ENCODING='gzip, br',
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertNotEqual(res['ETag'], plain['ETag'])
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+
+class PrerenderTests(SchemaCacheTestCase):
+    """ Test pre-rendering the schema to files"""
+
+    def test_command_writes_files(self):
+        """ Test the renderings of the code version are written"""
+        stale = self.directory / 'openapi-old.json'
+        stale.write_bytes(b'{}')
+
+        call_command('prerender_schema', stdout=StringIO())
+
+        version = schema.code_version()
+        self.assertEqual(
+            sorted(path.name for path in self.directory.iterdir()),
+            sorted(
+                f'openapi-{version}.{ext}'
+                for ext in ('json', 'json.gz', 'yaml', 'yaml.gz')
+            ),
+        )
+
+    def test_files_served_without_generating(self):
+        """ Test a process with the files of its version reads them"""
+        schema.prerender()
+        path = schema.schema_path('json')
+        path.write_bytes(b'{"openapi": "prerendered"}')
+        schema.clear()
+
+        with mock.patch.object(schema, 'generate') as generate:
+            res = APIClient().get(SCHEMA_URL, HTTP_ACCEPT=JSON)
+
+        generate.assert_not_called()
+        self.assertEqual(res.content, b'{"openapi": "prerendered"}')
+
+    def test_version_setting(self):
+        """ Test a configured code version is used as is"""
+        with override_settings(SCHEMA_CACHE={
+            'DIRECTORY': str(self.directory), 'VERSION': 'v1.2.3',
+        }):
+            schema.clear()
+            self.assertEqual(schema.code_version(), 'v1.2.3')
+            self.assertEqual(
+                schema.schema_path('yaml').name, 'openapi-v1.2.3.yaml',
+            )
@@ -0,0 +1,12 @@
+""" URL mapping for the core app"""
+
+from django.urls import path
+
+from core import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('', views.prometheus_metrics, name='metrics'),
+    path('slow/', views.slow_requests, name='slow-requests'),
+]
@@ -0,0 +1,41 @@
+"""
+Views of the core app.
+"""
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from core import metrics
+
+
+def _has_token(request):
+    token = metrics.get_setting('TOKEN')
+    return bool(token) and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}',
+    )
+
+
+@require_GET
+def prometheus_metrics(request):
+    """ Serve the metrics of this process in the Prometheus format.
+
+    Open unless METRICS['TOKEN'] is set, then scrapers need it as a
+    bearer token.
+    """
+    if metrics.get_setting('TOKEN') and not _has_token(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render_prometheus(), content_type=metrics.CONTENT_TYPE,
+    )
+
+
+@require_GET
+def slow_requests(request):
+    """ Serve the captured slow requests to staff or token holders.
+
+    Samples hold SQL parameters, so this is never open.
+    """
+    user = getattr(request, 'user', None)
+    if not _has_token(request) and not (user and user.is_staff):
+        return HttpResponseForbidden()
+    return JsonResponse({'results': metrics.registry.slow_requests()})
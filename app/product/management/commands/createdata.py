@@ -1,8 +1,84 @@
-from typing import Any, Optional
-from django.core.management.base import BaseCommand
+"""
+Django command generating a large, deterministic catalog.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from product.seeding import SeedPlan, seed
+
 
 class Command(BaseCommand):
-    help= "Command information"
+    """ django command seeding users, articles and products"""
+    help = (
+        'Generate a production shaped catalog. The same options and seed '
+        'always produce the same rows, whatever the number of workers.'
+    )
+
+    def add_arguments(self, parser):
+        defaults = SeedPlan()
+        counts = (
+            ('users', 'users'),
+            ('categories', 'categories per user'),
+            ('variants', 'attribute variants per user'),
+            ('attributes', 'attributes'),
+            ('articles', 'articles, spread over the users'),
+            ('values-per-article', 'attribute values per article'),
+            ('images-per-article', 'most images per article'),
+            ('product-categories', 'product categories'),
+            ('product-attributes', 'product attributes'),
+            ('products', 'products'),
+            ('attributes-per-product', 'attribute values per product'),
+        )
+        for name, description in counts:
+            default = getattr(defaults, name.replace('-', '_'))
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Number of {description} (default {default})',
+            )
+        parser.add_argument('--seed', type=int, default=defaults.seed)
+        parser.add_argument(
+            '--chunk-size', type=int, default=defaults.chunk_size,
+            help='Rows built and inserted per chunk',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=defaults.workers,
+            help='Worker processes writing chunks (PostgreSQL only)',
+        )
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Insert with COPY instead of bulk_create (PostgreSQL only)',
+        )
+
+    def handle(self, *args, **options):
+        fields = SeedPlan.__dataclass_fields__
+        plan = SeedPlan(**{
+            name: options[name] for name in fields if name in options
+        })
+        if plan.users < 1 or plan.chunk_size < 1 or plan.workers < 1:
+            raise CommandError(
+                'users, chunk-size and workers must be at least 1.'
+            )
+        if (plan.copy or plan.workers > 1) and \
+                connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                'COPY and parallel workers need PostgreSQL, using '
+                'bulk_create in this process.'
+            ))
+
+        started = time.monotonic()
+        last = [started]
+
+        def report(table, rows):
+            now = time.monotonic()
+            self.stdout.write(
+                f'{table:<20}{rows:>12} rows {now - last[0]:>8.2f}s'
+            )
+            last[0] = now
 
-    def handle(self, *args, **kwargs):
-        print("Hello")
\ No newline at end of file
+        written = seed(plan, report=report)
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {sum(written.values())} rows in '
+            f'{time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,484 @@
+"""
+Deterministic large catalog generator behind the createdata command.
+
+Every table is produced in fixed size chunks. A chunk only depends on
+the seed, the table and its index range, and foreign keys are derived
+arithmetically from explicit id ranges, so the same options always give
+the same data however many worker processes write the chunks.
+"""
+import io
+import json
+import multiprocessing
+import random
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from faker import Faker
+from PIL import Image
+
+from article.caching import bump_user_version
+from article.facets import refresh_facet_counts
+from article.search import index_articles
+from core.models import (
+    Article,
+    ArticleImage,
+    Attribute,
+    AttributeValue,
+    AttributeVariants,
+    Category,
+    PAttribute,
+    Product,
+    ProductAttribute,
+    ProductCategory,
+    User,
+)
+
+PLACEHOLDER_IMAGE = 'uploads/article/seed-placeholder.jpg'
+PASSWORD = 'seedpass123'
+VARIANT_TYPES = ('Size', 'Color', 'Material')
+SIZES = ('XS', 'S', 'M', 'L', 'XL', 'XXL')
+
+
+@dataclass
+class SeedPlan:
+    """ Row counts, id ranges and options of one createdata run"""
+    users: int = 10
+    categories: int = 20
+    variants: int = 30
+    attributes: int = 20
+    articles: int = 10000
+    values_per_article: int = 2
+    images_per_article: int = 1
+    product_categories: int = 20
+    product_attributes: int = 30
+    products: int = 1000
+    attributes_per_product: int = 3
+    seed: int = 0
+    chunk_size: int = 5000
+    workers: int = 1
+    copy: bool = False
+    # First explicit id of every table written with explicit ids.
+    bases: dict = field(default_factory=dict)
+
+
+# Tables in dependency order: (name, model, row count, explicit ids).
+def stages(plan):
+    return [
+        ('users', User, plan.users, True),
+        ('categories', Category, plan.users * plan.categories, True),
+        ('variants', AttributeVariants, plan.users * plan.variants, True),
+        ('attributes', Attribute, plan.attributes, True),
+        ('articles', Article, plan.articles, True),
+        ('article_categories', Article.categories.through,
+         plan.articles, False),
+        ('article_attributes', Article.attributes.through,
+         plan.articles, False),
+        ('attribute_values', AttributeValue, plan.articles, False),
+        ('images', ArticleImage, plan.articles, False),
+        ('product_categories', ProductCategory,
+         plan.product_categories, True),
+        ('product_attributes', PAttribute, plan.product_attributes, True),
+        ('products', Product, plan.products, True),
+        ('product_values', ProductAttribute, plan.products, False),
+    ]
+
+
+class Vocabulary:
+    """ Word pools drawn from Faker once per seed"""
+
+    def __init__(self, seed):
+        fake = Faker()
+        fake.seed_instance(seed)
+        self.words = sorted({fake.word() for _ in range(3000)})
+        self.colors = sorted({fake.color_name() for _ in range(200)})
+        self.nouns = sorted({
+            fake.word().capitalize() for _ in range(800)
+        })
+        self.sentences = [fake.sentence(nb_words=12) for _ in range(500)]
+        self.companies = sorted({fake.company() for _ in range(300)})
+
+
+class ChunkWriter:
+    """ Build and write the rows of one chunk of a table"""
+
+    def __init__(self, plan, vocabulary=None):
+        self.plan = plan
+        self.vocabulary = vocabulary or Vocabulary(plan.seed)
+        self.password = None
+
+    def rng(self, table, start):
+        return random.Random(f'{self.plan.seed}:{table}:{start}')
+
+    def id(self, table, index):
+        return self.plan.bases[table] + index
+
+    def user_of(self, index, per_user):
+        """ Return the user index owning the index-th per-user row."""
+        return index // per_user
+
+    def build(self, table, start, stop):
+        rng = self.rng(table, start)
+        return getattr(self, f'build_{table}')(rng, start, stop)
+
+    def build_users(self, rng, start, stop):
+        if self.password is None:
+            self.password = make_password(
+                PASSWORD, salt=f'seed{self.plan.seed}',
+            )
+        return [
+            User(
+                id=self.id('users', i),
+                email=f'seed{self.id("users", i)}@example.com',
+                name=f'Seed user {i}',
+                password=self.password,
+            )
+            for i in range(start, stop)
+        ]
+
+    def build_categories(self, rng, start, stop):
+        words = self.vocabulary.words
+        return [
+            Category(
+                id=self.id('categories', i),
+                user_id=self.id(
+                    'users', self.user_of(i, self.plan.categories)
+                ),
+                name=f'{rng.choice(words).capitalize()} {i}'[:50],
+            )
+            for i in range(start, stop)
+        ]
+
+    def build_variants(self, rng, start, stop):
+        rows = []
+        for i in range(start, stop):
+            kind = VARIANT_TYPES[i % len(VARIANT_TYPES)]
+            if kind == 'Size':
+                name = SIZES[rng.randrange(len(SIZES))]
+            elif kind == 'Color':
+                name = rng.choice(self.vocabulary.colors)
+            else:
+                name = rng.choice(self.vocabulary.words)
+            rows.append(AttributeVariants(
+                id=self.id('variants', i),
+                user_id=self.id('users', self.user_of(i, self.plan.variants)),
+                type=kind,
+                name=name[:32],
+                price=Decimal(rng.randrange(0, 2000)) / 100,
+            ))
+        return rows
+
+    def build_attributes(self, rng, start, stop):
+        return [
+            Attribute(
+                id=self.id('attributes', i),
+                name=f'{rng.choice(self.vocabulary.words)} {i}',
+            )
+            for i in range(start, stop)
+        ]
+
+    def article_user(self, i):
+        return i % self.plan.users
+
+    def build_articles(self, rng, start, stop):
+        vocabulary = self.vocabulary
+        rows = []
+        for i in range(start, stop):
+            title = ' '.join((
+                rng.choice(vocabulary.colors),
+                rng.choice(vocabulary.words),
+                rng.choice(vocabulary.nouns),
+            ))
+            rows.append(Article(
+                id=self.id('articles', i),
+                user_id=self.id('users', self.article_user(i)),
+                title=title[:255],
+                short_description=rng.choice(vocabulary.sentences)[:255],
+                description=' '.join(rng.sample(vocabulary.sentences, 4)),
+                price=Decimal(rng.randrange(100, 99999)) / 100,
+                stock=str(rng.randrange(0, 500)),
+                variant=rng.choice(
+                    [choice for choice, _ in Article.VARIANTS]
+                ),
+                image=PLACEHOLDER_IMAGE if i % 3 == 0 else None,
+            ))
+        return rows
+
+    def _linked(self, rng, i, per_user, table, most):
+        user = self.article_user(i)
+        count = rng.randint(0, min(most, per_user))
+        picks = rng.sample(range(per_user), count)
+        return [self.id(table, user * per_user + pick) for pick in picks]
+
+    def build_article_categories(self, rng, start, stop):
+        through = Article.categories.through
+        return [
+            through(
+                article_id=self.id('articles', i), category_id=category_id,
+            )
+            for i in range(start, stop)
+            for category_id in self._linked(
+                rng, i, self.plan.categories, 'categories', 3,
+            )
+        ]
+
+    def build_article_attributes(self, rng, start, stop):
+        through = Article.attributes.through
+        return [
+            through(
+                article_id=self.id('articles', i),
+                attributevariants_id=variant_id,
+            )
+            for i in range(start, stop)
+            for variant_id in self._linked(
+                rng, i, self.plan.variants, 'variants', 4,
+            )
+        ]
+
+    def build_attribute_values(self, rng, start, stop):
+        if not self.plan.attributes:
+            return []
+        return [
+            AttributeValue(
+                article_id=self.id('articles', i),
+                attribute_id=self.id(
+                    'attributes', rng.randrange(self.plan.attributes)
+                ),
+                value=rng.choice(self.vocabulary.words),
+            )
+            for i in range(start, stop)
+            for _ in range(self.plan.values_per_article)
+        ]
+
+    def build_images(self, rng, start, stop):
+        return [
+            ArticleImage(
+                article_id=self.id('articles', i), image=PLACEHOLDER_IMAGE,
+            )
+            for i in range(start, stop)
+            for _ in range(rng.randint(0, self.plan.images_per_article))
+        ]
+
+    def build_product_categories(self, rng, start, stop):
+        return [
+            ProductCategory(
+                id=self.id('product_categories', i),
+                name=f'{rng.choice(self.vocabulary.nouns)} {i}'[:100],
+                description=rng.choice(self.vocabulary.sentences),
+            )
+            for i in range(start, stop)
+        ]
+
+    def build_product_attributes(self, rng, start, stop):
+        return [
+            PAttribute(
+                id=self.id('product_attributes', i),
+                name=f'{rng.choice(self.vocabulary.words)} {i}'[:100],
+            )
+            for i in range(start, stop)
+        ]
+
+    def build_products(self, rng, start, stop):
+        vocabulary = self.vocabulary
+        return [
+            Product(
+                id=self.id('products', i),
+                title=(
+                    f'{rng.choice(vocabulary.companies)} '
+                    f'{rng.choice(vocabulary.nouns)}'
+                )[:100],
+                description=' '.join(rng.sample(vocabulary.sentences, 3)),
+                price=Decimal(rng.randrange(100, 999999)) / 100,
+                category_id=self.id(
+                    'product_categories',
+                    rng.randrange(self.plan.product_categories),
+                ),
+            )
+            for i in range(start, stop)
+        ]
+
+    def build_product_values(self, rng, start, stop):
+        count = min(
+            self.plan.attributes_per_product, self.plan.product_attributes
+        )
+        return [
+            ProductAttribute(
+                product_id=self.id('products', i),
+                attribute_id=self.id('product_attributes', pick),
+                value=rng.choice(self.vocabulary.words),
+            )
+            for i in range(start, stop)
+            for pick in rng.sample(range(self.plan.product_attributes), count)
+        ]
+
+    def write(self, table, model, start, stop):
+        """ Build and insert rows [start, stop) of table."""
+        rows = self.build(table, start, stop)
+        if not rows:
+            return 0
+        with transaction.atomic():
+            if self.plan.copy:
+                copy_rows(model, rows)
+            else:
+                model.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+def _copy_value(value):
+    """ Return value in the text format of COPY."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return str(value).translate(COPY_ESCAPES)
+
+
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r',
+})
+
+
+def copy_rows(model, rows):
+    """ Write model instances with PostgreSQL COPY FROM STDIN."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key and getattr(rows[0], field.attname) is None)
+        and field.column != 'search_vector'
+    ]
+    buffer = io.StringIO()
+    for row in rows:
+        # pre_save fills auto_now fields like bulk_create does.
+        buffer.write('\t'.join(
+            _copy_value(field.get_db_prep_save(
+                field.pre_save(row, True), connection,
+            ))
+            for field in fields
+        ))
+        buffer.write('\n')
+    buffer.seek(0)
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+            f'({columns}) FROM STDIN',
+            buffer,
+        )
+
+
+def _init_worker():
+    # Forked workers must not share the parent's database connections.
+    connections.close_all()
+
+
+_worker_writer = None
+
+
+def _write_chunk(args):
+    global _worker_writer
+    plan_data, table, start, stop = args
+    if _worker_writer is None:
+        _worker_writer = ChunkWriter(SeedPlan(**plan_data))
+    model = next(
+        model for name, model, _, _ in stages(_worker_writer.plan)
+        if name == table
+    )
+    return _worker_writer.write(table, model, start, stop)
+
+
+def next_ids(plan):
+    """ Return the first free id of every table written with ids."""
+    return {
+        table: (model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0) + 1
+        for table, model, _, explicit in stages(plan) if explicit
+    }
+
+
+def ensure_placeholder_image():
+    if not default_storage.exists(PLACEHOLDER_IMAGE):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), (200, 200, 200)).save(buffer, 'JPEG')
+        default_storage.save(PLACEHOLDER_IMAGE, ContentFile(buffer.getvalue()))
+
+
+def reset_sequences(models):
+    """ Move id sequences past the explicitly inserted ids."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def seed(plan, report=None):
+    """ Write the whole catalog described by plan.
+
+    report(table, rows) is called after every table. Returns the number
+    of rows written per table.
+    """
+    plan.bases = next_ids(plan)
+    if plan.copy and connection.vendor != 'postgresql':
+        plan.copy = False
+    if connection.vendor != 'postgresql':
+        # Concurrent writers would only contend for SQLite's write lock.
+        plan.workers = 1
+    ensure_placeholder_image()
+
+    writer = ChunkWriter(plan)
+    written = {}
+    pool = None
+    if plan.workers > 1:
+        connections.close_all()
+        pool = multiprocessing.get_context('fork').Pool(
+            plan.workers, initializer=_init_worker,
+        )
+    try:
+        for table, model, count, _ in stages(plan):
+            ranges = [
+                (start, min(start + plan.chunk_size, count))
+                for start in range(0, count, plan.chunk_size)
+            ]
+            if pool is not None:
+                data = asdict(plan)
+                rows = sum(pool.map(_write_chunk, [
+                    (data, table, start, stop) for start, stop in ranges
+                ]))
+            else:
+                rows = sum(
+                    writer.write(table, model, start, stop)
+                    for start, stop in ranges
+                )
+            written[table] = rows
+            if report is not None:
+                report(table, rows)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    reset_sequences([
+        model for _, model, _, explicit in stages(plan) if explicit
+    ])
+    _refresh_derived(plan)
+    return written
+
+
+def _refresh_derived(plan):
+    """ Update what model signals maintain for rows written in bulk."""
+    first = plan.bases['articles']
+    for start in range(0, plan.articles, plan.chunk_size):
+        stop = min(start + plan.chunk_size, plan.articles)
+        with transaction.atomic():
+            index_articles(list(range(first + start, first + stop)))
+    for index in range(plan.users):
+        user_id = plan.bases['users'] + index
+        with transaction.atomic():
+            refresh_facet_counts(user_id)
+        bump_user_version(user_id)
@@ -0,0 +1,91 @@
+"""
+Test the createdata seeding command.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from core.models import (
+    Article,
+    ArticleSearchTerm,
+    AttributeValue,
+    Category,
+    Product,
+    ProductAttribute,
+    User,
+)
+
+SMALL = [
+    '--users', '3', '--categories', '4', '--variants', '5',
+    '--attributes', '6', '--articles', '25', '--product-categories', '2',
+    '--product-attributes', '4', '--products', '10', '--chunk-size', '7',
+]
+
+
+@override_settings(MEDIA_ROOT='/tmp/createdata-tests')
+class CreateDataTests(TestCase):
+    """ Test generating a small catalog"""
+
+    def createdata(self, *args):
+        call_command('createdata', *SMALL, *args, stdout=StringIO())
+
+    def snapshot(self):
+        return (
+            list(Article.objects.order_by('id').values_list(
+                'title', 'price', 'user__name',
+            )),
+            list(Article.categories.through.objects.order_by(
+                'article__title', 'category__name',
+            ).values_list('article__title', 'category__name')),
+            list(Product.objects.order_by('id').values_list(
+                'title', 'category__name',
+            )),
+        )
+
+    def test_creates_requested_rows(self):
+        """ Test every table gets the requested number of rows"""
+        self.createdata()
+
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Category.objects.count(), 12)
+        self.assertEqual(Article.objects.count(), 25)
+        self.assertEqual(AttributeValue.objects.count(), 50)
+        self.assertEqual(Product.objects.count(), 10)
+        self.assertEqual(ProductAttribute.objects.count(), 30)
+
+    def test_links_stay_within_user(self):
+        """ Test articles only link the categories of their user"""
+        self.createdata()
+
+        self.assertFalse(Article.categories.through.objects.exclude(
+            article__user=F('category__user'),
+        ).exists())
+
+    def test_same_seed_same_data(self):
+        """ Test a seed always generates the same catalog"""
+        self.createdata('--seed', '7')
+        first = self.snapshot()
+        User.objects.all().delete()
+        Product.objects.all().delete()
+
+        self.createdata('--seed', '7')
+
+        self.assertEqual(self.snapshot(), first)
+        self.createdata('--seed', '8')
+        self.assertNotEqual(self.snapshot()[0][-25:], first[0])
+
+    def test_new_rows_get_fresh_ids(self):
+        """ Test seeding twice appends and later inserts still work"""
+        self.createdata()
+        self.createdata()
+
+        self.assertEqual(User.objects.count(), 6)
+        Category.objects.create(user=User.objects.first(), name='manual')
+
+    def test_articles_are_searchable(self):
+        """ Test seeded articles are added to the search index"""
+        self.createdata()
+
+        self.assertTrue(ArticleSearchTerm.objects.exists())
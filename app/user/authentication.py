@@ -0,0 +1,191 @@
+"""
+Cached token authentication for the api
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+from core.cache.versions import bump_version, get_version
+
+DEFAULTS = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+    'SHARED_CACHE': None,
+    'KEY_PREFIX': 'authtoken:',
+}
+
+
+def get_setting(name):
+    """ Return a TOKEN_AUTH_CACHE setting, falling back to the default."""
+    return getattr(settings, 'TOKEN_AUTH_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class TokenCache:
+    """ Process local LRU of token key -> (user, token) with a TTL.
+
+    Entries can optionally be shared between processes through a Django
+    cache alias. Each user then has a revocation version in the shared
+    cache, bumped when its tokens are dropped; a local entry stored
+    under an older version is a miss, so deleting a token or
+    deactivating a user takes effect in every process at once.
+    """
+
+    def __init__(self, max_size=None, ttl=None, shared_cache=None):
+        self.max_size = max_size or get_setting('MAX_SIZE')
+        self.ttl = ttl if ttl is not None else get_setting('TTL')
+        self.shared_alias = shared_cache or get_setting('SHARED_CACHE')
+        self.prefix = get_setting('KEY_PREFIX')
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _version_key(self, user_pk):
+        return f'{self.prefix}user:{user_pk}:version'
+
+    def user_version(self, user_pk):
+        """ Return the revocation version of a user, if shared."""
+        if self.shared is None:
+            return None
+        return get_version(self._version_key(user_pk), self.shared)
+
+    def get(self, key):
+        """ Return a copy of the cached (user, token) or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._discard(key)
+                entry = None
+
+        if entry is not None and (
+                entry[3] == self.user_version(entry[1].pk)):
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            return copy.copy(entry[1]), copy.copy(entry[2])
+        if entry is not None:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._discard(key)
+
+        if self.shared is not None:
+            value = self.shared.get(self.prefix + key)
+            if value is not None:
+                self._store(key, *value, self.user_version(value[0].pk))
+                with self._lock:
+                    self.hits += 1
+                return copy.copy(value[0]), copy.copy(value[1])
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, user, token):
+        """ Cache the user and token for key."""
+        self._store(key, user, token, self.user_version(user.pk))
+        if self.shared is not None:
+            self.shared.set(self.prefix + key, (user, token), self.ttl)
+
+    def _store(self, key, user, token, version):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (
+                time.monotonic() + self.ttl, user, token, version,
+            )
+            self._user_keys.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._user_keys.get(entry[1].pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[entry[1].pk]
+
+    def _revoke(self, user_pk):
+        # After the shared entries are gone, so no process reads one
+        # back under the new version.
+        if self.shared is not None and user_pk is not None:
+            bump_version(self._version_key(user_pk), self.shared)
+
+    def delete(self, key, user_pk=None):
+        """ Drop a token key from the local and shared cache.
+
+        With the pk of the token's user, the entries other processes
+        hold locally are dropped as well.
+        """
+        with self._lock:
+            self._discard(key)
+        if self.shared is not None:
+            self.shared.delete(self.prefix + key)
+        self._revoke(user_pk)
+
+    def delete_user(self, user_pk, keys=()):
+        """ Drop every cached token of a user, in every process.
+
+        keys lists token keys held by other processes that should be
+        removed from the shared cache as well.
+        """
+        with self._lock:
+            local = self._user_keys.pop(user_pk, set())
+            for key in local:
+                self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete_many(
+                [self.prefix + key for key in set(keys) | local]
+            )
+        self._revoke(user_pk)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """ Return the hit/miss counters of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """ TokenAuthentication that caches token lookups per process"""
+    cache = token_cache
+
+    def authenticate_credentials(self, key):
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        user, token = super().authenticate_credentials(key)
+        self.cache.set(key, user, token)
+        return user, token
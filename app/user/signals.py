@@ -0,0 +1,25 @@
+"""
+Signal handlers keeping the token cache consistent
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    """ Forget a token as soon as it is deleted."""
+    token_cache.delete(instance.key, user_pk=instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def drop_user_tokens(sender, instance, **kwargs):
+    """ Forget cached tokens of a changed, deactivated or deleted user."""
+    keys = Token.objects.filter(user_id=instance.pk).values_list(
+        'key', flat=True
+    ) if token_cache.shared is not None else ()
+    token_cache.delete_user(instance.pk, keys=list(keys))
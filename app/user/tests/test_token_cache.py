@@ -0,0 +1,159 @@
+"""
+Test the cached token authentication.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import TokenCache, token_cache
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """ Test authenticating api requests through the token cache"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_second_request_skips_token_query(self):
+        """ Test a cached token does not query the token table"""
+        self.client.get(ME_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertFalse(
+            any('authtoken_token' in q['sql'] for q in ctx.captured_queries)
+        )
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_deleted_token_is_rejected(self):
+        """ Test deleting a token invalidates the cached entry"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        """ Test deactivating a user invalidates its cached tokens"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(TOKEN_AUTH_CACHE={})
+class TokenCacheTests(TestCase):
+    """ Test the token LRU"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+
+    def test_least_recently_used_entry_evicted(self):
+        """ Test the cache keeps at most max_size entries"""
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', self.user, None)
+        cache.set('b', self.user, None)
+        cache.get('a')
+        cache.set('c', self.user, None)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    @patch('user.authentication.time.monotonic')
+    def test_entries_expire(self, patched_monotonic):
+        """ Test entries are dropped once the TTL has passed"""
+        cache = TokenCache(ttl=10)
+        patched_monotonic.return_value = 100
+        cache.set('a', self.user, None)
+
+        patched_monotonic.return_value = 105
+        self.assertIsNotNone(cache.get('a'))
+        patched_monotonic.return_value = 111
+        self.assertIsNone(cache.get('a'))
+
+    def test_cached_user_is_a_copy(self):
+        """ Test callers can not mutate the cached user"""
+        cache = TokenCache(ttl=60)
+        cache.set('a', self.user, None)
+
+        user, _ = cache.get('a')
+        user.name = 'Changed'
+
+        self.assertNotEqual(cache.get('a')[0].name, 'Changed')
+
+
+class SharedTokenCacheTests(TestCase):
+    """ Test revoking tokens cached by other processes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        # Two caches on one shared alias stand in for two workers.
+        self.worker = TokenCache(ttl=60, shared_cache='default')
+        self.other = TokenCache(ttl=60, shared_cache='default')
+        self.worker.set(self.token.key, self.user, self.token)
+        self.other.get(self.token.key)
+
+    def test_local_entry_served_until_revoked(self):
+        """ Test a local entry is a hit while its user is unchanged"""
+        self.assertIsNotNone(self.other.get(self.token.key))
+        self.assertEqual(self.other.stats()['size'], 1)
+
+    def test_user_revoked_in_other_process(self):
+        """ Test dropping a user's tokens reaches other local caches"""
+        self.worker.delete_user(self.user.pk, keys=[self.token.key])
+
+        self.assertIsNone(self.other.get(self.token.key))
+        self.assertEqual(self.other.stats()['size'], 0)
+
+    def test_token_revoked_in_other_process(self):
+        """ Test deleting a token reaches other local caches"""
+        self.worker.delete(self.token.key, user_pk=self.user.pk)
+
+        self.assertIsNone(self.other.get(self.token.key))
+
+    def test_signals_revoke_everywhere(self):
+        """ Test deactivating a user misses in every process"""
+        with patch('user.signals.token_cache', self.worker):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertIsNone(self.other.get(self.token.key))